@@ -0,0 +1,191 @@
+"""Time the dashboard's data path on seeded databases of increasing size.
+
+Seeds one scratch database per size with synthetic evaluations and
+question_results, then replays the data fetches and aggregations that
+generate_dashboard performs, section by section, for each data source
+(daily rollups, fact frames, direct SQL, and with --parquet the Parquet export)
+and filter combination. Nothing is
+rendered, Streamlit is not running, and the query cache is off so every
+section hits the database. Timings are written to a JSON file so runs can be
+compared across commits.
+
+    python bench_dashboard.py --sizes 10k 100k 1M --repeat 3 --output bench_dashboard.json
+"""
+import argparse
+import functools
+import json
+import os
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+
+from chart_summaries import distribution_figure, distribution_summaries, downsample_history, points_per_user
+from dashboard import DashboardDBManager, add_item_indices, classify_score
+from dashboard_data import (ALL_ITEMS, ALL_QUESTIONS, ALL_USERS, FactFrameDashboardData, ParquetDashboardData,
+                            RollupDashboardData, SqlDashboardData)
+from db_pool import ConnectionPool
+from question_bank import load_question_bank, question_hash
+from seed_data import scratch_database, seed
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+DATA_SOURCES = {'rollups': RollupDashboardData, 'fact_frames': FactFrameDashboardData, 'sql': SqlDashboardData}
+THRESHOLDS = {'bien': 75, 'moyen': 50}
+
+
+class SectionTimer:
+    """Collects wall-clock seconds per named section"""
+    def __init__(self):
+        self.sections = {}
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - start
+
+
+def render(data, timer, selected_user, selected_item, selected_question):
+    """The data calls of generate_dashboard for one set of filters, in page order"""
+    with timer.section('filters'):
+        data.usernames()
+        data.items(selected_user)
+        if selected_item != ALL_ITEMS:
+            data.questions(selected_item)
+
+    with timer.section('item_performance'):
+        item_perf_df = data.item_performance(selected_user, selected_item, selected_question)
+        if not item_perf_df.empty:
+            item_perf_df['average_score'].apply(lambda x: classify_score(x, THRESHOLDS))
+
+    if selected_user == ALL_USERS and selected_item != ALL_ITEMS:
+        with timer.section('score_distribution'):
+            summaries = distribution_summaries(data.score_counts(selected_item))
+            per_user = points_per_user(len(summaries))
+            if per_user:
+                distribution_figure(summaries, data.score_distribution(selected_item, per_user), selected_item)
+
+        with timer.section('item_analysis'):
+            item_stats_df = data.question_statistics(selected_item)
+            if not item_stats_df.empty:
+                add_item_indices(item_stats_df)
+                data.question_success_history(selected_item, selected_question)
+            if selected_question != ALL_QUESTIONS:
+                data.option_selections(selected_item, question_hash(selected_question))
+
+    if selected_user != ALL_USERS:
+        with timer.section('user_scores'):
+            user_scores_df = data.user_scores(selected_user)
+            if not user_scores_df.empty:
+                user_scores_df['average_score'].apply(lambda x: classify_score(x, THRESHOLDS))
+
+    if selected_user != ALL_USERS and selected_item != ALL_ITEMS:
+        with timer.section('user_item_detail'):
+            if selected_question == ALL_QUESTIONS:
+                data.question_success(selected_user, selected_item)
+            downsample_history(data.score_history(selected_user, selected_item))
+            data.answer_split(selected_user, selected_item)
+
+
+def scenarios(username, item_name, question_text):
+    """Filter combinations benchmarked: (name, user, item, question)"""
+    return [
+        ('all_users_all_items', ALL_USERS, ALL_ITEMS, ALL_QUESTIONS),
+        ('one_user', username, ALL_ITEMS, ALL_QUESTIONS),
+        ('one_user_one_item', username, item_name, ALL_QUESTIONS),
+        ('one_question', ALL_USERS, item_name, question_text),
+    ]
+
+
+def bench_size(label, evaluations, args, bank):
+    """Seed the database of one size and time every data source and scenario on it"""
+    database = f"{args.database}_{label.lower()}"
+    db = scratch_database(database)
+    db.connect()
+    cursor = db.connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM evaluations")
+        existing = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        db.disconnect()
+    if existing < evaluations:
+        start = time.perf_counter()
+        seed(db, bank, evaluations - existing, users=max(50, evaluations // 200))
+        print(f"[{label}] {evaluations - existing} évaluations générées en {time.perf_counter() - start:.1f}s")
+
+    db.connect()
+    cursor = db.connection.cursor()
+    try:
+        cursor.execute("SELECT username FROM users ORDER BY total_evaluations DESC LIMIT 1")
+        username = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        db.disconnect()
+
+    sources = dict(DATA_SOURCES)
+    if args.parquet:
+        from parquet_export import export_parquet
+        directory = os.path.join('data', f'parquet_{database}')
+        export_parquet(db, directory)
+        sources['parquet'] = functools.partial(ParquetDashboardData, directory=directory)
+
+    item = bank.items[0]
+    pool = ConnectionPool({**db.config, 'pool_size': 2})
+    results = []
+    for source, data_class in sources.items():
+        for scenario, user, item_name, question in scenarios(username, item['item'], item['questions'][0]['question']):
+            runs = []
+            for _ in range(args.repeat):
+                timer = SectionTimer()
+                # No query cache: every repeat measures the database and pandas work
+                with timer.section('load'):
+                    data = data_class(DashboardDBManager(db.config, pool))
+                render(data, timer, user, item_name, question)
+                runs.append(timer.sections)
+
+            sections = {name: round(statistics.median(run[name] for run in runs), 4) for name in runs[0]}
+            results.append({'size': label, 'evaluations': evaluations, 'source': source, 'scenario': scenario,
+                            'sections': sections, 'total': round(sum(sections.values()), 4)})
+            print(f"[{label}] {source:<12} {scenario:<20} {results[-1]['total'] * 1000:9.1f} ms")
+    return results
+
+
+def current_commit():
+    """HEAD of the working tree, or None outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['10k', '100k'], choices=list(SIZES))
+    parser.add_argument('--repeat', type=int, default=3, help="runs per scenario, the median is kept")
+    parser.add_argument('--database', default='quiz_bench', help="prefix of the scratch databases")
+    parser.add_argument('--output', default='bench_dashboard.json')
+    parser.add_argument('--parquet', action='store_true', help="also export and time the Parquet mode")
+    args = parser.parse_args()
+
+    bank = load_question_bank()
+    report = {
+        'commit': current_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'bank_version': bank.version,
+        'repeat': args.repeat,
+        'results': [],
+    }
+    for label in args.sizes:
+        report['results'].extend(bench_size(label, SIZES[label], args, bank))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
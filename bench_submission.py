@@ -0,0 +1,241 @@
+"""Measure the database cost of quiz submissions.
+
+By default, compares the historical per-question INSERT loop ("before") with the
+current DatabaseManager.save_evaluation_results path ("after"), reporting round
+trips and latency per submission.
+
+With --operators N, runs a load test instead: N simulated operators in parallel
+threads each pick random items, answer every question with a random but
+well-formed answer, grade it like QuizApp and save it through a shared
+connection pool. It reports p50/p95/p99 latency, throughput and round trips per
+submission.
+
+Runs against a scratch database, never quiz_db2.
+
+    python bench_submission.py --runs 100 --item 1 --database quiz_bench
+    python bench_submission.py --operators 20 --submissions 50 --think-ms 200 --database quiz_bench
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+import mysql.connector
+
+from db_pool import STORAGE_KEYS, ConnectionPool
+from main_sql import DB_CONFIG, DatabaseManager
+from question_bank import grade, load_question_bank
+
+
+def random_answer(question_data, rng=random):
+    """Random but well-formed answer for a question"""
+    q_type = question_data['type']
+    if q_type == 'multiple_choice':
+        return rng.randint(1, 4)
+    if q_type == 'multiple_select':
+        options = range(1, len(question_data['options']) + 1)
+        return sorted(rng.sample(options, rng.randint(1, len(options))))
+    if q_type == 'matching':
+        categories = list(set(question_data['correct_answers'].values()))
+        return {option: rng.choice(categories) for option in question_data['options']}
+    if q_type == 'true_false':
+        return rng.choice([True, False])
+    if q_type == 'range_input':
+        return {material: {'min': r['min'] + rng.randint(-10, 10), 'max': r['max'] + rng.randint(-10, 10)}
+                for material, r in question_data['correct_ranges'].items()}
+    if q_type == 'calculation':
+        return question_data['correct_answer'] * rng.uniform(0.9, 1.1)
+    return None
+
+
+def legacy_save(db, user_id, item_name, questions_data, user_answers, results):
+    """The pre-batching save path: one INSERT round trip per question"""
+    db.connect()
+    cursor = db.connection.cursor()
+    # Today's schema stores dimension keys; they are cached after the first submission
+    item_id, question_ids = db.dimension_keys(cursor, item_name, questions_data)
+    total_questions = len(questions_data)
+    correct_count = sum(1 for r in results if r['correct'])
+    score_percentage = sum(r['score'] for r in results) / total_questions * 100
+    cursor.execute("""
+        INSERT INTO evaluations (user_id, item_id, total_questions, correct_answers, score_percentage)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (user_id, item_id, total_questions, correct_count, score_percentage))
+    evaluation_id = cursor.lastrowid
+    for i, (question_data, result) in enumerate(zip(questions_data, results)):
+        cursor.execute("""
+            INSERT INTO question_results
+            (evaluation_id, question_number, question_id, question_type, is_correct,
+             user_answer, correct_answer, score_points)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (evaluation_id, i + 1, question_ids[i], question_data['type'],
+              result['correct'], str(user_answers.get(i, "Non répondu")),
+              str(db.get_correct_answer_string(question_data)), result['score']))
+    db.update_item_statistics(item_name, total_questions, correct_count, score_percentage)
+    db.connection.commit()
+    cursor.close()
+    db.disconnect()
+    return True
+
+
+def statements_sent(pool):
+    """Statements sent so far on the (single) pooled connection"""
+    conn = pool.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SHOW SESSION STATUS LIKE 'Questions'")
+    value = int(cursor.fetchone()[1])
+    cursor.close()
+    pool.release(conn)
+    return value
+
+
+def run(label, save, db, pool, user_id, item, specs, runs):
+    """Time `runs` submissions and count their round trips"""
+    questions = item['questions']
+    latencies = []
+    round_trips = []
+    for _ in range(runs):
+        answers = {i: random_answer(q) for i, q in enumerate(questions)}
+        results = [grade(spec, answers[i]) for i, spec in enumerate(specs)]
+
+        before_statements = statements_sent(pool)
+        before_checkouts = pool.stats()['checkouts']
+        start = time.perf_counter()
+        save(db, user_id, item['item'], questions, answers, results)
+        latencies.append((time.perf_counter() - start) * 1000)
+        # The status probe itself is one statement; each checkout costs one ping
+        statements = statements_sent(pool) - before_statements - 1
+        pings = pool.stats()['checkouts'] - before_checkouts - 1
+        round_trips.append(statements + pings)
+
+    latencies.sort()
+    print(f"{label:<8} round trips/submission: {statistics.mean(round_trips):5.1f}   "
+          f"latency p50: {statistics.median(latencies):7.2f} ms   "
+          f"p95: {latencies[int(len(latencies) * 0.95) - 1]:7.2f} ms")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+def global_statements(conn):
+    """Statements sent so far by every client of the server"""
+    cursor = conn.cursor()
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+    value = int(cursor.fetchone()[1])
+    cursor.close()
+    return value
+
+
+def operator(number, db, bank, submissions, think_seconds, latencies, failures, lock):
+    """One simulated operator: log in, then answer and submit random items back to back"""
+    rng = random.Random(number)
+    user_id = db.get_or_create_user(f"operator{number:04d}")
+    for _ in range(submissions):
+        index = rng.randrange(len(bank.items))
+        questions = bank.items[index]['questions']
+        answers = {i: random_answer(q, rng) for i, q in enumerate(questions)}
+        # Same grading call as QuizApp.calculate_score
+        results = [grade(spec, answers[i]) for i, spec in enumerate(bank.specs[index])]
+
+        start = time.perf_counter()
+        saved = db.save_evaluation_results(user_id, bank.items[index]['item'], questions, answers, results,
+                                           bank.version)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            if saved:
+                latencies.append(elapsed)
+            else:
+                failures.append(elapsed)
+        if think_seconds:
+            time.sleep(rng.expovariate(1 / think_seconds))
+
+
+def load_test(args, server_config):
+    """Run --operators concurrent operators and report latency, throughput and round trips"""
+    config = {**DB_CONFIG, 'database': args.database, 'pool_size': args.pool_size or args.operators}
+    pool = ConnectionPool(config)
+    # Shared caches, as in the Streamlit process
+    user_ids = {}
+    dimension_ids = {}
+    setup = DatabaseManager(config, pool, user_ids, dimension_ids)
+    setup.create_tables()
+    bank = load_question_bank()
+    setup.sync_question_bank(bank)
+
+    # Server-wide counter read on a connection of its own, outside the pool
+    probe = mysql.connector.connect(**server_config)
+    latencies, failures, lock = [], [], threading.Lock()
+    threads = [
+        threading.Thread(target=operator, args=(n, DatabaseManager(config, pool, user_ids, dimension_ids), bank,
+                                                args.submissions, args.think_ms / 1000, latencies, failures, lock))
+        for n in range(args.operators)
+    ]
+
+    before_statements = global_statements(probe)
+    before = pool.stats()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    after = pool.stats()
+    statements = global_statements(probe) - before_statements - 1
+    probe.close()
+
+    submitted = len(latencies) + len(failures)
+    if not latencies:
+        print(f"Aucune soumission réussie sur {submitted}.")
+        return
+    latencies.sort()
+    # Each checkout costs one ping; the operators' logins are included
+    checkouts = after['checkouts'] - before['checkouts']
+    print(f"{args.operators} opérateurs, {submitted} soumissions ({len(failures)} échecs) en {wall:.1f}s, "
+          f"pool de {config['pool_size']} connexions")
+    print(f"throughput: {len(latencies) / wall:7.1f} soumissions/s   "
+          f"round trips/soumission: {(statements + checkouts) / submitted:5.1f}")
+    print(f"latency p50: {percentile(latencies, 0.50):7.2f} ms   p95: {percentile(latencies, 0.95):7.2f} ms   "
+          f"p99: {percentile(latencies, 0.99):7.2f} ms   max: {latencies[-1]:7.2f} ms")
+    print(f"pool wait avg: {(after['wait_time_total'] - before['wait_time_total']) / max(checkouts, 1) * 1000:6.2f} ms   "
+          f"max: {after['wait_time_max'] * 1000:6.2f} ms   épuisé: {after['exhausted'] - before['exhausted']} fois")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--item', type=int, default=1, help="index of the item in questions.json")
+    parser.add_argument('--database', default='quiz_bench')
+    parser.add_argument('--operators', type=int, default=0, help="run the concurrent load test with N operators")
+    parser.add_argument('--submissions', type=int, default=20, help="submissions per operator")
+    parser.add_argument('--think-ms', type=float, default=0, help="mean pause between submissions of an operator")
+    parser.add_argument('--pool-size', type=int, default=0, help="defaults to one connection per operator")
+    args = parser.parse_args()
+
+    server_config = {k: v for k, v in DB_CONFIG.items()
+                     if not k.startswith('pool_') and k not in ('database', *STORAGE_KEYS)}
+    conn = mysql.connector.connect(**server_config)
+    conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    conn.close()
+
+    if args.operators:
+        load_test(args, server_config)
+        return
+
+    # A single connection so that session counters see every statement
+    pool = ConnectionPool({**DB_CONFIG, 'database': args.database, 'pool_size': 1})
+    db = DatabaseManager(DB_CONFIG, pool)
+    db.create_tables()
+    user_id = db.get_or_create_user("bench")
+
+    bank = load_question_bank()
+    item = bank.items[args.item]
+    specs = bank.specs[args.item]
+    print(f"{item['item']} ({len(item['questions'])} questions), {args.runs} submissions")
+    run("before", legacy_save, db, pool, user_id, item, specs, args.runs)
+    run("after", DatabaseManager.save_evaluation_results, db, pool, user_id, item, specs, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Payload budgets: the chart JSON depends on these and on the number of users, never on the attempts
+HISTORY_POINTS = 300
+KDE_GRID_POINTS = 64
+SCORE_BINS = 200
+DISTRIBUTION_POINTS = 1000
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Positions kept by Largest-Triangle-Three-Buckets downsampling of a series sorted on x.
+
+    The first and last points are kept. Every bucket in between keeps the point that makes
+    the largest triangle with the point kept before it and the mean of the next bucket, so
+    peaks and dips survive where a plain stride would skip them.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = x.astype(float)
+    y = y.astype(float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        kept[bucket + 1] = previous
+    return kept
+
+
+def downsample_history(time_df: pd.DataFrame, threshold: int = HISTORY_POINTS) -> pd.DataFrame:
+    """Score history cut to at most threshold points with LTTB."""
+    if len(time_df) <= threshold:
+        return time_df
+    dates = pd.to_datetime(time_df['evaluation_date']).to_numpy(dtype='datetime64[ns]').astype('int64')
+    scores = time_df['score_percentage'].to_numpy(dtype=float)
+    return time_df.iloc[lttb_indices(dates, scores, threshold)]
+
+
+def weighted_quantiles(values: np.ndarray, weights: np.ndarray, quantiles) -> np.ndarray:
+    """Linear-interpolation quantiles of values repeated weights times, without repeating them."""
+    order = np.argsort(values)
+    values, cumulative = values[order], np.cumsum(weights[order])
+    positions = np.asarray(quantiles) * (cumulative[-1] - 1)
+    below = values[np.searchsorted(cumulative, np.floor(positions), side='right')]
+    above = values[np.searchsorted(cumulative, np.ceil(positions), side='right')]
+    return below + (above - below) * (positions - np.floor(positions))
+
+
+def distribution_summaries(counts_df: pd.DataFrame, grid_points: int = KDE_GRID_POINTS,
+                           bins: int = SCORE_BINS) -> List[Dict]:
+    """Box plot statistics and a KDE outline per user, from (username, score_percentage, attempts) counts.
+
+    Quartiles and fences are exact. The density is a Gaussian KDE (Silverman bandwidth, like
+    Plotly's violins) over the scores binned on [0, 100], evaluated on grid_points heights.
+    """
+    summaries = []
+    for username, counts in counts_df.groupby('username', sort=True, observed=True):
+        values = counts['score_percentage'].to_numpy(dtype=float)
+        weights = counts['attempts'].to_numpy(dtype=float)
+        n = weights.sum()
+        q1, median, q3 = weighted_quantiles(values, weights, [0.25, 0.5, 0.75])
+        mean = np.average(values, weights=weights)
+        std = np.sqrt(np.average((values - mean) ** 2, weights=weights))
+        lower = values[values >= q1 - 1.5 * (q3 - q1)].min()
+        upper = values[values <= q3 + 1.5 * (q3 - q1)].max()
+
+        histogram, edges = np.histogram(values, bins=bins, range=(0, 100), weights=weights)
+        centers = ((edges[:-1] + edges[1:]) / 2)[histogram > 0]
+        histogram = histogram[histogram > 0]
+        spread = min(std, (q3 - q1) / 1.349) or std
+        bandwidth = 0.9 * spread * n ** -0.2 if spread > 0 else 1.0
+        grid = np.linspace(values.min() - 2 * bandwidth, values.max() + 2 * bandwidth, grid_points)
+        kernel = np.exp(-0.5 * ((grid[:, None] - centers[None, :]) / bandwidth) ** 2)
+        density = kernel @ histogram / (n * bandwidth * np.sqrt(2 * np.pi))
+
+        summaries.append({
+            'username': str(username), 'count': int(n), 'mean': mean,
+            'q1': q1, 'median': median, 'q3': q3, 'lowerfence': lower, 'upperfence': upper,
+            'grid': grid, 'density': density,
+        })
+    return summaries
+
+
+def points_per_user(user_count: int, point_budget: int = DISTRIBUTION_POINTS) -> int:
+    """Sampled scores drawn for each user so the chart holds at most point_budget points."""
+    return point_budget // max(1, user_count)
+
+
+def distribution_figure(summaries: List[Dict], points_df: pd.DataFrame, title: str,
+                        point_budget: int = DISTRIBUTION_POINTS) -> go.Figure:
+    """Violin chart drawn from precomputed summaries, with at most point_budget sampled scores."""
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    per_user = points_per_user(len(summaries), point_budget)
+    # Fixed jitter, so reruns draw the points at the same places
+    jitter = np.random.default_rng(0)
+    for position, summary in enumerate(summaries):
+        color = colors[position % len(colors)]
+        half_width = 0.4 * summary['density'] / summary['density'].max()
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([position - half_width, (position + half_width)[::-1]]).round(3),
+            y=np.concatenate([summary['grid'], summary['grid'][::-1]]).round(2),
+            fill='toself', mode='lines', line=dict(color=color, width=1), opacity=0.6,
+            name=summary['username'], hoverinfo='skip'
+        ))
+        fig.add_trace(go.Box(
+            x=[position], q1=[summary['q1']], median=[summary['median']], q3=[summary['q3']],
+            lowerfence=[summary['lowerfence']], upperfence=[summary['upperfence']], mean=[summary['mean']],
+            width=0.1, marker_color=color, name=summary['username'],
+            hovertemplate=f"{summary['username']} ({summary['count']} scores)<extra></extra>"
+        ))
+        if per_user and not points_df.empty:
+            # The reservoir keeps rows in arrival order (by score within a user): draw a random subset
+            scores = points_df.loc[points_df['username'] == summary['username'], 'score_percentage']
+            scores = scores.sample(min(per_user, len(scores)), random_state=0)
+            if len(scores):
+                fig.add_trace(go.Scatter(
+                    x=(position + jitter.uniform(-0.25, 0.25, len(scores))).round(3), y=scores,
+                    mode='markers', marker=dict(color=color, size=4, opacity=0.5), name=summary['username'],
+                    hovertemplate="%{y:.1f}%<extra></extra>"
+                ))
+
+    fig.update_layout(
+        title=title, showlegend=False,
+        xaxis=dict(title="Utilisateur", tickmode='array', tickvals=list(range(len(summaries))),
+                   ticktext=[summary['username'] for summary in summaries]),
+        yaxis=dict(title="Score (%)")
+    )
+    return fig
@@ -1,48 +1,217 @@
 import streamlit as st
 import mysql.connector
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import json
+import threading
+import time
+from collections import OrderedDict
+from chart_summaries import (DISTRIBUTION_POINTS, distribution_figure, distribution_summaries, downsample_history,
+                             points_per_user)
+from dashboard_data import (ALL_ITEMS, ALL_QUESTIONS, ALL_USERS, FactFrameDashboardData, ParquetDashboardData,
+                            RollupDashboardData, SqlDashboardData)
+from db_pool import open_pool
+from question_bank import correct_option_numbers, load_question_bank, option_labels, question_hash
 
 # Database configuration
 DB_CONFIG = {
+    # 'mysql', 'sqlite' (the quiz's embedded file at sqlite_path) or 'duckdb' (same file, read by DuckDB)
+    'backend': 'mysql',
+    'sqlite_path': 'data/quiz.sqlite3',
     'host': '127.0.0.1',
     'user': 'root',
     'password': 'root123',
     'database': 'quiz_db2',
     'charset': 'utf8mb4',
-    'collation': 'utf8mb4_unicode_ci'
+    'collation': 'utf8mb4_unicode_ci',
+    # Connection pool shared by every dashboard session of this process
+    'pool_size': 5,
+    'pool_timeout': 10
 }
 
+# Rows read from the server per round trip by the streaming queries
+STREAM_CHUNK_ROWS = 10000
+
+class QueryCache:
+    """TTL + LRU cache of query results shared by every dashboard session."""
+    def __init__(self, max_entries=128, ttl_seconds=600, token_ttl_seconds=5):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.token_ttl_seconds = token_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._token = None
+        self._token_checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def change_token(self, fetch_token):
+        """Returns the data version, asking the database at most every token_ttl_seconds."""
+        now = time.monotonic()
+        if now - self._token_checked_at > self.token_ttl_seconds:
+            token = fetch_token()
+            if token is not None:
+                with self._lock:
+                    self._token = token
+                    self._token_checked_at = now
+        return self._token
+
+    def get(self, key, token, max_age=None):
+        """Returns the cached DataFrame for key if it is fresh and from the same data version.
+
+        With max_age, the entry is fresh for max_age seconds whatever the data version.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_token, stored_at, df = entry
+                age = time.monotonic() - stored_at
+                if (age <= max_age) if max_age is not None else (entry_token == token and age <= self.ttl_seconds):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return df
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, token, df):
+        """Stores a result, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._entries[key] = (token, time.monotonic(), df)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def get_dashboard_pool():
+    """Connection pool shared by every dashboard session."""
+    return open_pool(DB_CONFIG)
+
+@st.cache_resource
+def get_query_cache():
+    """Query result cache shared by every dashboard session."""
+    return QueryCache()
+
 class DashboardDBManager:
     """Manages database connections and queries for the dashboard."""
-    def __init__(self, config):
+    def __init__(self, config, pool=None, cache=None):
         self.config = config
+        self.pool = pool if pool is not None else open_pool(config)
+        self.cache = cache
 
     def connect(self):
-        """Establishes a database connection."""
+        """Checks out a database connection from the pool."""
         try:
-            return mysql.connector.connect(**self.config)
+            return self.pool.get_connection()
         except mysql.connector.Error as err:
             st.error(f"Erreur de connexion à la base de données : {err}")
             return None
 
-    def fetch_data_to_df(self, query: str, params=None) -> pd.DataFrame:
-        """Fetches data from the database and returns it as a Pandas DataFrame."""
+    def run_query(self, query: str, params=None):
+        """Runs a query and returns a DataFrame, or None if the database reported an error."""
         conn = self.connect()
         if conn is None:
-            return pd.DataFrame()
+            return None
         
         try:
-            df = pd.read_sql(query, conn, params=params)
-            return df
+            # DuckDB hands back whole columns instead of going through the DB-API row by row
+            if hasattr(conn, 'read_frame'):
+                return conn.read_frame(query, params)
+            return pd.read_sql(query, conn, params=params)
         except mysql.connector.Error as err:
             st.error(f"Erreur lors de l'exécution de la requête : {err}")
-            return pd.DataFrame()
+            return None
         finally:
-            if conn and conn.is_connected():
-                conn.close()
+            self.pool.release(conn)
+
+    def stream_query(self, conn, query: str, params=None, chunksize=STREAM_CHUNK_ROWS):
+        """Yields the result of a query as DataFrames of at most chunksize rows."""
+        if hasattr(conn, 'read_chunks'):
+            yield from conn.read_chunks(query, params, chunksize)
+            return
+
+        # Unbuffered: rows stay on the server and are read off the socket one chunk at a time
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(query, params or ())
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        finally:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                # Rows left unread after an error; the pool drops the connection on release
+                pass
+
+    def run_reduced(self, query: str, params, reducer):
+        """Streams a query through reducer.add chunk by chunk and returns reducer.result(), or None on error."""
+        conn = self.connect()
+        if conn is None:
+            return None
+
+        try:
+            for chunk in self.stream_query(conn, query, params):
+                reducer.add(chunk)
+            return reducer.result()
+        except mysql.connector.Error as err:
+            st.error(f"Erreur lors de l'exécution de la requête : {err}")
+            return None
+        finally:
+            self.pool.release(conn)
+
+    def fetch_change_token(self):
+        """Cheap fingerprint of the data: changes whenever an evaluation is saved or statistics are rebuilt."""
+        token_df = self.run_query("""
+        SELECT
+            (SELECT MAX(evaluation_id) FROM evaluations) AS last_evaluation,
+            (SELECT MAX(last_updated) FROM item_statistics) AS last_stats_update;
+        """)
+        if token_df is None:
+            return None
+        return tuple(str(value) for value in token_df.iloc[0])
+
+    def cached(self, key, build, max_age=None):
+        """Returns build() through the query cache. build returns None on failure, which is not cached.
+
+        A result is rebuilt after each save, unless max_age is given: it is then kept for max_age
+        seconds, for results too expensive to rebuild on every submission.
+        """
+        if self.cache is None:
+            return build()
+
+        token = self.cache.change_token(self.fetch_change_token) if max_age is None else None
+        value = self.cache.get(key, token, max_age)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.cache.put(key, token, value)
+        return value
+
+    def fetch_data_to_df(self, query: str, params=None) -> pd.DataFrame:
+        """Fetches data from the database (or the query cache) and returns it as a Pandas DataFrame."""
+        key = (query, tuple(params) if params else ())
+        df = self.cached(key, lambda: self.run_query(query, params))
+        if df is None:
+            return pd.DataFrame()
+        # Callers add columns to the frames they get, the cached copy must stay untouched
+        return df.copy()
+
+    def fetch_reduced(self, query: str, params, reducer) -> pd.DataFrame:
+        """Like fetch_data_to_df, but the rows are streamed through a reducer and only its result is kept.
+
+        Memory stays bounded by the reducer, whatever the size of the result set.
+        """
+        key = (query, tuple(params) if params else (), reducer.key)
+        df = self.cached(key, lambda: self.run_reduced(query, params, reducer))
+        if df is None:
+            return pd.DataFrame()
+        return df.copy()
 
 def classify_score(score, thresholds):
     """Classifies a score into 'faible', 'moyen', or 'bien' based on thresholds."""
@@ -53,6 +222,29 @@ def classify_score(score, thresholds):
     else:
         return 'Faible'
 
+def add_item_indices(stats_df):
+    """Adds difficulty and point-biserial discrimination to question_statistics rows."""
+    n = stats_df['attempts'].astype(float)
+    sx = stats_df['correct'].astype(float)
+    sy = stats_df['total_sum'].astype(float)
+    syy = stats_df['total_sq_sum'].astype(float)
+    sxy = stats_df['correct_total_sum'].astype(float)
+
+    # Correct answers are 0/1, so sum(x^2) == sum(x) and Pearson's r reduces to these sums
+    denominator = np.sqrt((n * sx - sx ** 2) * (n * syy - sy ** 2))
+    stats_df['difficulty'] = sx / n * 100
+    stats_df['discrimination'] = ((n * sxy - sx * sy) / denominator).where(denominator > 0)
+    return stats_df
+
+def find_question(item_name, question_text):
+    """Returns the questions.json entry for a question, or None if it was removed."""
+    for item in load_question_bank().items:
+        if item['item'] == item_name:
+            for question_data in item['questions']:
+                if question_data['question'] == question_text:
+                    return question_data
+    return None
+
 def generate_dashboard():
     """Main function to generate the Streamlit dashboard."""
     st.set_page_config(
@@ -64,43 +256,45 @@ def generate_dashboard():
     st.title("📊 Tableau de Bord d'Analyse des Compétences")
     st.markdown("---")
 
-    db_manager = DashboardDBManager(DB_CONFIG)
+    # Reruns that only move a slider or change a chart option are served from the shared cache
+    db_manager = DashboardDBManager(DB_CONFIG, get_dashboard_pool(), get_query_cache())
 
     # --- Sidebar Filters ---
     st.sidebar.header("Filtres")
+
+    # Rollups read the daily aggregates, fact frames slice the raw facts in memory,
+    # plain SQL queries the fact tables for every chart, Parquet reads the exported history
+    data_sources = {
+        "Agrégats journaliers": RollupDashboardData,
+        "Analyse en mémoire (fact frames)": FactFrameDashboardData,
+        "Requêtes SQL directes": SqlDashboardData,
+        "Historique Parquet (export)": ParquetDashboardData,
+    }
+    data_source = st.sidebar.radio("Source des données :", list(data_sources))
+    data = data_sources[data_source](db_manager)
+    if isinstance(data, ParquetDashboardData):
+        if data.exported_at is None:
+            st.sidebar.warning("Aucun export Parquet : lancez `python manage.py export-parquet`.")
+            st.stop()
+        st.sidebar.caption(f"Export Parquet du {data.exported_at}")
     
     # User Filter
-    users_df = db_manager.fetch_data_to_df("SELECT username FROM users ORDER BY username")
-    if users_df.empty:
+    usernames = data.usernames()
+    if not usernames:
         st.sidebar.warning("Aucun utilisateur trouvé.")
         st.stop()
-    usernames = users_df['username'].tolist()
-    selected_user = st.sidebar.selectbox("Sélectionner un utilisateur :", ["Tous les utilisateurs"] + usernames)
+    selected_user = st.sidebar.selectbox("Sélectionner un utilisateur :", [ALL_USERS] + usernames)
 
     # Evaluation Item Filter
-    item_query = f"""
-    SELECT DISTINCT item_name FROM evaluations
-    WHERE user_id = (SELECT user_id FROM users WHERE username = %s) OR 'Tous les utilisateurs' = %s
-    ORDER BY item_name;
-    """
-    item_df = db_manager.fetch_data_to_df(item_query, (selected_user, selected_user))
-    items = item_df['item_name'].tolist()
-    selected_item = st.sidebar.selectbox("Sélectionner un domaine d'évaluation :", ["Tous les domaines"] + items)
+    items = data.items(selected_user)
+    selected_item = st.sidebar.selectbox("Sélectionner un domaine d'évaluation :", [ALL_ITEMS] + items)
 
     # Question Filter (depends on selected item)
-    if selected_item != "Tous les domaines":
-        question_query = f"""
-        SELECT DISTINCT qr.question_text
-        FROM question_results qr
-        JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
-        WHERE e.item_name = %s
-        ORDER BY qr.question_text;
-        """
-        question_df = db_manager.fetch_data_to_df(question_query, (selected_item,))
-        questions = question_df['question_text'].tolist()
-        selected_question = st.sidebar.selectbox("Sélectionner une question :", ["Toutes les questions"] + questions)
+    if selected_item != ALL_ITEMS:
+        questions = data.questions(selected_item)
+        selected_question = st.sidebar.selectbox("Sélectionner une question :", [ALL_QUESTIONS] + questions)
     else:
-        selected_question = "Toutes les questions"
+        selected_question = ALL_QUESTIONS
     
     # Dynamic Scoring Sliders
     st.sidebar.markdown("---")
@@ -115,50 +309,15 @@ def generate_dashboard():
         st.sidebar.error("Le seuil 'Moyen' doit être inférieur au seuil 'Bien'.")
         return # Stop execution if invalid
 
-    # Build dynamic WHERE clause
-    where_clauses = []
-    query_params = []
-    
-    if selected_user != "Tous les utilisateurs":
-        where_clauses.append("u.username = %s")
-        query_params.append(selected_user)
-    
-    if selected_item != "Tous les domaines":
-        where_clauses.append("e.item_name = %s")
-        query_params.append(selected_item)
-    
-    if selected_question != "Toutes les questions":
-        where_clauses.append("qr.question_text = %s")
-        query_params.append(selected_question)
-    
-    where_clause_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-    
     # --- Performance by Evaluation Item (with categories) ---
     st.header("Performance par Domaine d'Évaluation")
     
-    # Conditionally add the JOIN for question_results
-    join_qr_clause = ""
-    if selected_question != "Toutes les questions":
-        join_qr_clause = "JOIN question_results qr ON e.evaluation_id = qr.evaluation_id"
-
-    item_perf_query = f"""
-    SELECT
-        e.item_name,
-        AVG(e.score_percentage) AS average_score,
-        COUNT(e.evaluation_id) AS total_attempts
-    FROM evaluations e
-    JOIN users u ON e.user_id = u.user_id
-    {join_qr_clause}
-    {where_clause_str}
-    GROUP BY e.item_name
-    ORDER BY average_score DESC;
-    """
-    item_perf_df = db_manager.fetch_data_to_df(item_perf_query, tuple(query_params))
+    item_perf_df = data.item_performance(selected_user, selected_item, selected_question)
 
     if not item_perf_df.empty:
         
         # --- NOUVEAU: Radar Chart pour la performance globale ---
-        if selected_user == "Tous les utilisateurs" and selected_item == "Tous les domaines":
+        if selected_user == ALL_USERS and selected_item == ALL_ITEMS:
             st.subheader("Performance Globale par Domaine (Radar Chart)")
             
             fig_global_radar = go.Figure()
@@ -206,63 +365,116 @@ def generate_dashboard():
     st.markdown("---")
 
     # --- Distribution des scores pour tous les utilisateurs dans un domaine
-    if selected_user == "Tous les utilisateurs" and selected_item != "Tous les domaines":
+    if selected_user == ALL_USERS and selected_item != ALL_ITEMS:
         st.header(f"📈 Distribution des Scores pour tous les utilisateurs dans le domaine : '{selected_item}'")
         
-        distribution_query = f"""
-        SELECT
-            u.username,
-            e.score_percentage
-        FROM evaluations e
-        JOIN users u ON e.user_id = u.user_id
-        WHERE e.item_name = %s
-        ORDER BY u.username;
-        """
-        distribution_df = db_manager.fetch_data_to_df(distribution_query, (selected_item,))
+        counts_df = data.score_counts(selected_item)
         
-        if not distribution_df.empty:
-            fig_violin = px.violin(
-                distribution_df,
-                y="score_percentage",
-                x="username",
-                color="username",
-                box=True, # Display a box plot inside the violin
-                points="all", # Display all points
-                title=f"Forme de distribution des scores pour tous les utilisateurs dans '{selected_item}'",
-                labels={"score_percentage": "Score (%)", "username": "Utilisateur"}
+        if not counts_df.empty:
+            # Shapes, boxes and points are computed here, so the chart size does not grow with the attempts
+            summaries = distribution_summaries(counts_df)
+            # The reservoir is sized to what the chart draws, not to every score of every user
+            per_user = points_per_user(len(summaries))
+            fig_violin = distribution_figure(
+                summaries,
+                data.score_distribution(selected_item, per_user) if per_user else pd.DataFrame(),
+                title=f"Forme de distribution des scores pour tous les utilisateurs dans '{selected_item}'"
             )
-            fig_violin.update_layout(showlegend=False)
             st.plotly_chart(fig_violin, use_container_width=True)
             st.markdown(
-                """
+                f"""
                 **Interprétation du graphique :**
                 * **La forme du violon** montre la densité des scores. Une forme large indique une forte concentration de scores à ce niveau.
-                * **La boîte à moustaches (box plot)** à l'intérieur montre les quartiles (25%, 50% et 75%) et la médiane.
-                * **Les points** représentent chaque score individuel.
+                * **La boîte à moustaches (box plot)** à l'intérieur montre les quartiles (25%, 50% et 75%) et la médiane, calculés sur tous les scores.
+                * **Les points** représentent des scores individuels tirés au hasard (au plus {DISTRIBUTION_POINTS} au total).
                 """
             )
         else:
             st.info(f"Aucune donnée d'évaluation disponible pour le domaine '{selected_item}'.")
     
+    # --- Item analysis: difficulty and discrimination of each question ---
+    if selected_user == ALL_USERS and selected_item != ALL_ITEMS:
+        st.header(f"🔍 Analyse des Items pour le domaine : '{selected_item}'")
+
+        item_stats_df = data.question_statistics(selected_item)
+
+        if not item_stats_df.empty:
+            item_stats_df = add_item_indices(item_stats_df)
+
+            fig_items = px.scatter(
+                item_stats_df,
+                x="difficulty",
+                y="discrimination",
+                size="attempts",
+                hover_name="question_text",
+                title="Difficulté et discrimination par question",
+                labels={"difficulty": "Taux de réussite (%)", "discrimination": "Discrimination (point-bisériale)"}
+            )
+            fig_items.add_hline(y=0.2, line_dash="dash", line_color="orange", annotation_text="Discrimination faible", annotation_position="bottom right")
+            st.plotly_chart(fig_items, use_container_width=True)
+            st.markdown(
+                """
+                **Interprétation :**
+                * **Le taux de réussite** mesure la facilité d'une question : proche de 100 %, elle est réussie par presque tous.
+                * **La discrimination** est la corrélation entre la réussite à la question et le score global : sous 0,2 la question distingue mal les opérateurs forts des faibles.
+                """
+            )
+
+            # Daily trend, read from the (question, day) rollup in the rollup mode
+            history_df = data.question_success_history(selected_item, selected_question)
+            if not history_df.empty:
+                subject = f"la question '{selected_question}'" if selected_question != ALL_QUESTIONS else "le domaine"
+                fig_success = px.line(
+                    history_df,
+                    x="day",
+                    y="success_rate",
+                    markers=True,
+                    hover_data=["attempts"],
+                    title=f"Évolution du taux de réussite pour {subject} (tous les utilisateurs)",
+                    labels={"day": "Date", "success_rate": "Taux de réussite (%)", "attempts": "Réponses"}
+                )
+                st.plotly_chart(fig_success, use_container_width=True)
+
+            # Distractor analysis for the selected question
+            if selected_question != ALL_QUESTIONS:
+                question_data = find_question(selected_item, selected_question)
+                labels = option_labels(question_data) if question_data else ()
+                if labels:
+                    selections_df = data.option_selections(selected_item, question_hash(selected_question))
+                    attempts = item_stats_df.loc[item_stats_df['question_text'] == selected_question, 'attempts'].sum()
+                    correct_options = correct_option_numbers(question_data)
+
+                    options_df = pd.DataFrame({
+                        'option_number': range(1, len(labels) + 1),
+                        'Option': labels
+                    })
+                    options_df = options_df.merge(selections_df, on='option_number', how='left').fillna({'selections': 0})
+                    options_df['Taux de sélection'] = options_df['selections'] / attempts * 100 if attempts else 0
+                    options_df['Réponse'] = options_df['option_number'].apply(
+                        lambda n: 'Bonne réponse' if n in correct_options else 'Distracteur'
+                    )
+
+                    fig_options = px.bar(
+                        options_df,
+                        x="Taux de sélection",
+                        y="Option",
+                        color="Réponse",
+                        orientation="h",
+                        color_discrete_map={'Bonne réponse': 'green', 'Distracteur': 'red'},
+                        title="Fréquence de sélection de chaque option",
+                        labels={"Taux de sélection": "Sélectionnée (%)"}
+                    )
+                    st.plotly_chart(fig_options, use_container_width=True)
+        else:
+            st.info(f"Aucune statistique de question disponible pour le domaine '{selected_item}'.")
+
     st.markdown("---")
 
     # --- User-specific performance and classification ---
-    if selected_user != "Tous les utilisateurs":
+    if selected_user != ALL_USERS:
         st.header(f"Performance Détaillée de l'Utilisateur: {selected_user}")
         
-        # Query for user's all evaluation scores
-        user_scores_query = f"""
-        SELECT
-            e.item_name,
-            AVG(e.score_percentage) as average_score,
-            COUNT(e.evaluation_id) as total_attempts
-        FROM evaluations e
-        JOIN users u ON e.user_id = u.user_id
-        WHERE u.username = %s
-        GROUP BY e.item_name
-        ORDER BY average_score DESC;
-        """
-        user_scores_df = db_manager.fetch_data_to_df(user_scores_query, (selected_user,))
+        user_scores_df = data.user_scores(selected_user)
         
         if not user_scores_df.empty:
             
@@ -311,25 +523,14 @@ def generate_dashboard():
     st.markdown("---")
 
     # --- Performance Over Time, Correct/Incorrect Pie Chart, and NEW Question Radar ---
-    if selected_user != "Tous les utilisateurs" and selected_item != "Tous les domaines":
+    if selected_user != ALL_USERS and selected_item != ALL_ITEMS:
         st.header(f"📈 Analyse Détaillée pour {selected_user} - {selected_item}")
 
         # --- Radar Chart for questions ---
-        if selected_question == "Toutes les questions":
+        if selected_question == ALL_QUESTIONS:
             st.subheader("Performance par Question (Radar Chart)")
             
-            question_radar_query = """
-            SELECT
-                qr.question_text,
-                (SUM(qr.is_correct) * 100.0 / COUNT(qr.is_correct)) AS success_rate
-            FROM question_results qr
-            JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
-            JOIN users u ON e.user_id = u.user_id
-            WHERE u.username = %s AND e.item_name = %s
-            GROUP BY qr.question_text
-            ORDER BY qr.question_text;
-            """
-            question_radar_df = db_manager.fetch_data_to_df(question_radar_query, (selected_user, selected_item))
+            question_radar_df = data.question_success(selected_user, selected_item)
 
             if not question_radar_df.empty:
                 fig_radar_questions = go.Figure()
@@ -367,14 +568,8 @@ def generate_dashboard():
 
         with col1:
             st.subheader("Évolution du Score")
-            time_query = """
-            SELECT evaluation_date, score_percentage
-            FROM evaluations e
-            JOIN users u ON e.user_id = u.user_id
-            WHERE u.username = %s AND e.item_name = %s
-            ORDER BY evaluation_date;
-            """
-            time_df = db_manager.fetch_data_to_df(time_query, (selected_user, selected_item))
+            # LTTB keeps the shape of long histories within HISTORY_POINTS points
+            time_df = downsample_history(data.score_history(selected_user, selected_item))
 
             if not time_df.empty:
                 fig_time = px.line(
@@ -393,21 +588,12 @@ def generate_dashboard():
         
         with col2:
             st.subheader("Répartition des Réponses")
-            answers_query = """
-            SELECT
-                SUM(is_correct) AS correct,
-                COUNT(is_correct) - SUM(is_correct) AS incorrect
-            FROM question_results qr
-            JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
-            JOIN users u ON e.user_id = u.user_id
-            WHERE u.username = %s AND e.item_name = %s;
-            """
-            answers_df = db_manager.fetch_data_to_df(answers_query, (selected_user, selected_item))
-
-            if not answers_df.empty and answers_df.iloc[0]['correct'] is not None:
+            answer_split = data.answer_split(selected_user, selected_item)
+
+            if answer_split is not None:
                 answers_data = pd.DataFrame({
                     'Réponses': ['Correctes', 'Incorrectes'],
-                    'Nombre': [answers_df.iloc[0]['correct'], answers_df.iloc[0]['incorrect']]
+                    'Nombre': list(answer_split)
                 })
                 fig_pie = px.pie(
                     answers_data,
@@ -1,57 +1,12 @@
 import streamlit as st
-import mysql.connector
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import json
-
-# Database configuration
-DB_CONFIG = {
-    'host': '127.0.0.1',
-    'user': 'root',
-    'password': 'root123',
-    'database': 'quiz_db2',
-    'charset': 'utf8mb4',
-    'collation': 'utf8mb4_unicode_ci'
-}
-
-class DashboardDBManager:
-    """Manages database connections and queries for the dashboard."""
-    def __init__(self, config):
-        self.config = config
-
-    def connect(self):
-        """Establishes a database connection."""
-        try:
-            return mysql.connector.connect(**self.config)
-        except mysql.connector.Error as err:
-            st.error(f"Erreur de connexion à la base de données : {err}")
-            return None
-
-    def fetch_data_to_df(self, query: str, params=None) -> pd.DataFrame:
-        """Fetches data from the database and returns it as a Pandas DataFrame."""
-        conn = self.connect()
-        if conn is None:
-            return pd.DataFrame()
-        
-        try:
-            df = pd.read_sql(query, conn, params=params)
-            return df
-        except mysql.connector.Error as err:
-            st.error(f"Erreur lors de l'exécution de la requête : {err}")
-            return pd.DataFrame()
-        finally:
-            if conn and conn.is_connected():
-                conn.close()
-
-def classify_score(score, thresholds):
-    """Classifies a score into 'faible', 'moyen', or 'bien' based on thresholds."""
-    if score >= thresholds['bien']:
-        return 'Bien'
-    elif score >= thresholds['moyen']:
-        return 'Moyen'
-    else:
-        return 'Faible'
+from chart_summaries import (DISTRIBUTION_POINTS, distribution_figure, distribution_summaries, downsample_history,
+                             points_per_user)
+from dashboard import DB_CONFIG, DashboardDBManager, classify_score, get_dashboard_pool, get_query_cache
+from dashboard_data import ALL_ITEMS, ALL_QUESTIONS, ALL_USERS, SqlDashboardData
 
 def generate_dashboard():
     """Main function to generate the Streamlit dashboard."""
@@ -64,43 +19,29 @@ def generate_dashboard():
     st.title("📊 Tableau de Bord d'Analyse des Compétences")
     st.markdown("---")
 
-    db_manager = DashboardDBManager(DB_CONFIG)
+    db_manager = DashboardDBManager(DB_CONFIG, get_dashboard_pool(), get_query_cache())
+    data = SqlDashboardData(db_manager)
 
     # --- Sidebar Filters ---
     st.sidebar.header("Filtres")
     
     # User Filter
-    users_df = db_manager.fetch_data_to_df("SELECT username FROM users ORDER BY username")
-    if users_df.empty:
+    usernames = data.usernames()
+    if not usernames:
         st.sidebar.warning("Aucun utilisateur trouvé.")
         st.stop()
-    usernames = users_df['username'].tolist()
-    selected_user = st.sidebar.selectbox("Sélectionner un utilisateur :", ["Tous les utilisateurs"] + usernames)
+    selected_user = st.sidebar.selectbox("Sélectionner un utilisateur :", [ALL_USERS] + usernames)
 
     # Evaluation Item Filter
-    item_query = f"""
-    SELECT DISTINCT item_name FROM evaluations
-    WHERE user_id = (SELECT user_id FROM users WHERE username = %s) OR 'Tous les utilisateurs' = %s
-    ORDER BY item_name;
-    """
-    item_df = db_manager.fetch_data_to_df(item_query, (selected_user, selected_user))
-    items = item_df['item_name'].tolist()
-    selected_item = st.sidebar.selectbox("Sélectionner un domaine d'évaluation :", ["Tous les domaines"] + items)
+    items = data.items(selected_user)
+    selected_item = st.sidebar.selectbox("Sélectionner un domaine d'évaluation :", [ALL_ITEMS] + items)
 
     # Question Filter (depends on selected item)
-    if selected_item != "Tous les domaines":
-        question_query = f"""
-        SELECT DISTINCT qr.question_text
-        FROM question_results qr
-        JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
-        WHERE e.item_name = %s
-        ORDER BY qr.question_text;
-        """
-        question_df = db_manager.fetch_data_to_df(question_query, (selected_item,))
-        questions = question_df['question_text'].tolist()
-        selected_question = st.sidebar.selectbox("Sélectionner une question :", ["Toutes les questions"] + questions)
+    if selected_item != ALL_ITEMS:
+        questions = data.questions(selected_item)
+        selected_question = st.sidebar.selectbox("Sélectionner une question :", [ALL_QUESTIONS] + questions)
     else:
-        selected_question = "Toutes les questions"
+        selected_question = ALL_QUESTIONS
     
     # Dynamic Scoring Sliders
     st.sidebar.markdown("---")
@@ -115,55 +56,17 @@ def generate_dashboard():
         st.sidebar.error("Le seuil 'Moyen' doit être inférieur au seuil 'Bien'.")
         return # Stop execution if invalid
 
-    # Build dynamic WHERE clause
-    where_clauses = []
-    query_params = []
-    
-    if selected_user != "Tous les utilisateurs":
-        where_clauses.append("u.username = %s")
-        query_params.append(selected_user)
-    
-    if selected_item != "Tous les domaines":
-        where_clauses.append("e.item_name = %s")
-        query_params.append(selected_item)
-    
-    if selected_question != "Toutes les questions":
-        where_clauses.append("qr.question_text = %s")
-        query_params.append(selected_question)
-    
-    where_clause_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-    
     # --- Performance by Evaluation Item (with categories) ---
     st.header("Performance par Domaine d'Évaluation")
     
-    # Conditionally add the JOIN for question_results
-    join_qr_clause = ""
-    if selected_question != "Toutes les questions":
-        join_qr_clause = "JOIN question_results qr ON e.evaluation_id = qr.evaluation_id"
-
-    # --- UPDATED QUERY: This query now gets the score of the latest evaluation for each item
-    # for the selected user, or for each item across all users if "Tous les utilisateurs" is selected.
-    item_perf_query = f"""
-    SELECT
-        e.item_name,
-        e.score_percentage
-    FROM evaluations e
-    JOIN (
-        SELECT user_id, item_name, MAX(evaluation_date) AS latest_date
-        FROM evaluations
-        GROUP BY user_id, item_name
-    ) AS latest_eval ON e.user_id = latest_eval.user_id AND e.item_name = latest_eval.item_name AND e.evaluation_date = latest_eval.latest_date
-    JOIN users u ON e.user_id = u.user_id
-    {join_qr_clause}
-    {where_clause_str}
-    ORDER BY e.score_percentage DESC;
-    """
-    item_perf_df = db_manager.fetch_data_to_df(item_perf_query, tuple(query_params))
+    # Score of the latest evaluation for each item for the selected user,
+    # or for each item across all users if "Tous les utilisateurs" is selected.
+    item_perf_df = data.latest_scores(selected_user, selected_item, selected_question)
 
     if not item_perf_df.empty:
         
         # --- NOUVEAU: Radar Chart pour la performance globale ---
-        if selected_user == "Tous les utilisateurs" and selected_item == "Tous les domaines":
+        if selected_user == ALL_USERS and selected_item == ALL_ITEMS:
             st.subheader("Performance Globale par Domaine (Radar Chart)")
             
             fig_global_radar = go.Figure()
@@ -211,39 +114,28 @@ def generate_dashboard():
     st.markdown("---")
 
     # --- Distribution des scores pour tous les utilisateurs dans un domaine
-    if selected_user == "Tous les utilisateurs" and selected_item != "Tous les domaines":
+    if selected_user == ALL_USERS and selected_item != ALL_ITEMS:
         st.header(f"📈 Distribution des Scores pour tous les utilisateurs dans le domaine : '{selected_item}'")
         
-        distribution_query = f"""
-        SELECT
-            u.username,
-            e.score_percentage
-        FROM evaluations e
-        JOIN users u ON e.user_id = u.user_id
-        WHERE e.item_name = %s
-        ORDER BY u.username;
-        """
-        distribution_df = db_manager.fetch_data_to_df(distribution_query, (selected_item,))
+        counts_df = data.score_counts(selected_item)
         
-        if not distribution_df.empty:
-            fig_violin = px.violin(
-                distribution_df,
-                y="score_percentage",
-                x="username",
-                color="username",
-                box=True, # Display a box plot inside the violin
-                points="all", # Display all points
-                title=f"Forme de distribution des scores pour tous les utilisateurs dans '{selected_item}'",
-                labels={"score_percentage": "Score (%)", "username": "Utilisateur"}
+        if not counts_df.empty:
+            # Shapes, boxes and points are computed here, so the chart size does not grow with the attempts
+            summaries = distribution_summaries(counts_df)
+            # The reservoir is sized to what the chart draws, not to every score of every user
+            per_user = points_per_user(len(summaries))
+            fig_violin = distribution_figure(
+                summaries,
+                data.score_distribution(selected_item, per_user) if per_user else pd.DataFrame(),
+                title=f"Forme de distribution des scores pour tous les utilisateurs dans '{selected_item}'"
             )
-            fig_violin.update_layout(showlegend=False)
             st.plotly_chart(fig_violin, use_container_width=True)
             st.markdown(
-                """
+                f"""
                 **Interprétation du graphique :**
                 * **La forme du violon** montre la densité des scores. Une forme large indique une forte concentration de scores à ce niveau.
-                * **La boîte à moustaches (box plot)** à l'intérieur montre les quartiles (25%, 50% et 75%) et la médiane.
-                * **Les points** représentent chaque score individuel.
+                * **La boîte à moustaches (box plot)** à l'intérieur montre les quartiles (25%, 50% et 75%) et la médiane, calculés sur tous les scores.
+                * **Les points** représentent des scores individuels tirés au hasard (au plus {DISTRIBUTION_POINTS} au total).
                 """
             )
         else:
@@ -252,22 +144,11 @@ def generate_dashboard():
     st.markdown("---")
 
     # --- User-specific performance and classification ---
-    if selected_user != "Tous les utilisateurs":
+    if selected_user != ALL_USERS:
         st.header(f"Performance Détaillée de l'Utilisateur: {selected_user}")
         
         # Query for user's all evaluation scores
-        user_scores_query = f"""
-        SELECT
-            e.item_name,
-            AVG(e.score_percentage) as average_score,
-            COUNT(e.evaluation_id) as total_attempts
-        FROM evaluations e
-        JOIN users u ON e.user_id = u.user_id
-        WHERE u.username = %s
-        GROUP BY e.item_name
-        ORDER BY average_score DESC;
-        """
-        user_scores_df = db_manager.fetch_data_to_df(user_scores_query, (selected_user,))
+        user_scores_df = data.user_scores(selected_user)
         
         if not user_scores_df.empty:
             
@@ -316,25 +197,14 @@ def generate_dashboard():
     st.markdown("---")
 
     # --- Performance Over Time, Correct/Incorrect Pie Chart, and NEW Question Radar ---
-    if selected_user != "Tous les utilisateurs" and selected_item != "Tous les domaines":
+    if selected_user != ALL_USERS and selected_item != ALL_ITEMS:
         st.header(f"📈 Analyse Détaillée pour {selected_user} - {selected_item}")
 
         # --- Radar Chart for questions ---
-        if selected_question == "Toutes les questions":
+        if selected_question == ALL_QUESTIONS:
             st.subheader("Performance par Question (Radar Chart)")
             
-            question_radar_query = """
-            SELECT
-                qr.question_text,
-                (SUM(qr.is_correct) * 100.0 / COUNT(qr.is_correct)) AS success_rate
-            FROM question_results qr
-            JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
-            JOIN users u ON e.user_id = u.user_id
-            WHERE u.username = %s AND e.item_name = %s
-            GROUP BY qr.question_text
-            ORDER BY qr.question_text;
-            """
-            question_radar_df = db_manager.fetch_data_to_df(question_radar_query, (selected_user, selected_item))
+            question_radar_df = data.question_success(selected_user, selected_item)
 
             if not question_radar_df.empty:
                 fig_radar_questions = go.Figure()
@@ -372,14 +242,8 @@ def generate_dashboard():
 
         with col1:
             st.subheader("Évolution du Score")
-            time_query = """
-            SELECT evaluation_date, score_percentage
-            FROM evaluations e
-            JOIN users u ON e.user_id = u.user_id
-            WHERE u.username = %s AND e.item_name = %s
-            ORDER BY evaluation_date;
-            """
-            time_df = db_manager.fetch_data_to_df(time_query, (selected_user, selected_item))
+            # LTTB keeps the shape of long histories within HISTORY_POINTS points
+            time_df = downsample_history(data.score_history(selected_user, selected_item))
 
             if not time_df.empty:
                 fig_time = px.line(
@@ -398,21 +262,12 @@ def generate_dashboard():
         
         with col2:
             st.subheader("Répartition des Réponses")
-            answers_query = """
-            SELECT
-                SUM(is_correct) AS correct,
-                COUNT(is_correct) - SUM(is_correct) AS incorrect
-            FROM question_results qr
-            JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
-            JOIN users u ON e.user_id = u.user_id
-            WHERE u.username = %s AND e.item_name = %s;
-            """
-            answers_df = db_manager.fetch_data_to_df(answers_query, (selected_user, selected_item))
+            answer_split = data.answer_split(selected_user, selected_item)
 
-            if not answers_df.empty and answers_df.iloc[0]['correct'] is not None:
+            if answer_split is not None:
                 answers_data = pd.DataFrame({
                     'Réponses': ['Correctes', 'Incorrectes'],
-                    'Nombre': [answers_df.iloc[0]['correct'], answers_df.iloc[0]['incorrect']]
+                    'Nombre': list(answer_split)
                 })
                 fig_pie = px.pie(
                     answers_data,
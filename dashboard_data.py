@@ -0,0 +1,708 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from question_bank import question_hash
+
+ALL_USERS = "Tous les utilisateurs"
+ALL_ITEMS = "Tous les domaines"
+ALL_QUESTIONS = "Toutes les questions"
+# Points drawn for each user in the score distribution, whatever the number of evaluations
+DISTRIBUTION_POINTS_PER_USER = 500
+# The fact frames read whole tables: reloaded at most this often, not on every submission
+FACT_FRAMES_MAX_AGE_SECONDS = 60
+
+
+class ReservoirSample:
+    """Uniform random sample of at most size rows per group, fed one chunk at a time.
+
+    Vectorized Algorithm R: the t-th row of a group replaces a random slot of its
+    reservoir with probability size/t, so memory is bounded by groups * size however
+    many rows are streamed. The seed is fixed so a redraw shows the same points.
+    """
+    def __init__(self, group, size, seed=0):
+        self.group = group
+        self.size = size
+        self.key = ('reservoir', group, size, seed)
+        self.rng = np.random.default_rng(seed)
+        self.seen = {}
+        self.samples = {}
+
+    def add(self, chunk):
+        """Feeds the next rows of the stream."""
+        for name, rows in chunk.groupby(self.group, sort=False, observed=True):
+            seen = self.seen.get(name, 0)
+            sample = self.samples.get(name, rows.iloc[:0])
+            self.seen[name] = seen + len(rows)
+
+            # Fill the reservoir first, then each following row may replace a slot
+            fill = max(0, self.size - seen)
+            if fill:
+                sample = pd.concat([sample, rows.iloc[:fill]], ignore_index=True)
+                seen, rows = seen + fill, rows.iloc[fill:]
+            if len(rows):
+                slots = self.rng.integers(0, seen + np.arange(1, len(rows) + 1))
+                accepted = np.flatnonzero(slots < self.size)
+                # When a slot is hit twice in the chunk, the later row wins, as in the sequential algorithm
+                slots, first = np.unique(slots[accepted][::-1], return_index=True)
+                keep = np.ones(len(sample), dtype=bool)
+                keep[slots] = False
+                sample = pd.concat([sample[keep], rows.iloc[accepted[::-1][first]]], ignore_index=True)
+            self.samples[name] = sample
+
+    def result(self):
+        """The sampled rows of every group, sorted by group."""
+        if not self.samples:
+            return pd.DataFrame()
+        return pd.concat(self.samples.values(), ignore_index=True).sort_values(self.group, kind='stable')
+
+
+
+class SqlDashboardData:
+    """Dashboard datasets computed by MySQL, one query per chart."""
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def usernames(self):
+        """All usernames, sorted."""
+        users_df = self.db_manager.fetch_data_to_df("SELECT username FROM users ORDER BY username")
+        return users_df['username'].tolist() if not users_df.empty else []
+
+    def items(self, selected_user):
+        """Evaluation items attempted by the selected user (or by anyone)."""
+        # One query per case: an "OR 'all' = %s" filter would keep MySQL from using the user index
+        if selected_user == ALL_USERS:
+            item_query = """
+            SELECT i.item_name FROM items i
+            WHERE EXISTS (SELECT 1 FROM evaluations e WHERE e.item_id = i.item_id)
+            ORDER BY i.item_name;
+            """
+            query_params = ()
+        else:
+            item_query = """
+            SELECT i.item_name FROM items i
+            WHERE i.item_id IN (
+                SELECT e.item_id FROM evaluations e
+                JOIN users u ON e.user_id = u.user_id
+                WHERE u.username = %s
+            )
+            ORDER BY i.item_name;
+            """
+            query_params = (selected_user,)
+        item_df = self.db_manager.fetch_data_to_df(item_query, query_params)
+        return item_df['item_name'].tolist() if not item_df.empty else []
+
+    def questions(self, selected_item):
+        """Questions answered at least once for an item."""
+        question_query = """
+        SELECT q.question_text
+        FROM questions q
+        JOIN items i ON q.item_id = i.item_id
+        WHERE i.item_name = %s
+          AND EXISTS (SELECT 1 FROM question_results qr WHERE qr.question_id = q.question_id)
+        ORDER BY q.question_text;
+        """
+        question_df = self.db_manager.fetch_data_to_df(question_query, (selected_item,))
+        return question_df['question_text'].tolist() if not question_df.empty else []
+
+    def item_performance(self, selected_user, selected_item, selected_question):
+        """Average score and attempts per item for the current filters."""
+        where_clauses = []
+        query_params = []
+
+        if selected_user != ALL_USERS:
+            where_clauses.append("u.username = %s")
+            query_params.append(selected_user)
+
+        if selected_item != ALL_ITEMS:
+            where_clauses.append("i.item_name = %s")
+            query_params.append(selected_item)
+
+        # Conditionally add the JOIN for question_results, matched on the question key
+        join_qr_clause = ""
+        if selected_question != ALL_QUESTIONS:
+            join_qr_clause = """JOIN question_results qr ON e.evaluation_id = qr.evaluation_id
+        JOIN questions q ON qr.question_id = q.question_id"""
+            where_clauses.append("q.item_id = i.item_id AND q.question_hash = %s")
+            query_params.append(question_hash(selected_question))
+
+        where_clause_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+
+        item_perf_query = f"""
+        SELECT
+            i.item_name,
+            AVG(e.score_percentage) AS average_score,
+            COUNT(e.evaluation_id) AS total_attempts
+        FROM evaluations e
+        JOIN users u ON e.user_id = u.user_id
+        JOIN items i ON e.item_id = i.item_id
+        {join_qr_clause}
+        {where_clause_str}
+        GROUP BY i.item_id
+        ORDER BY average_score DESC;
+        """
+        return self.db_manager.fetch_data_to_df(item_perf_query, tuple(query_params))
+
+    def latest_scores(self, selected_user, selected_item, selected_question):
+        """Score of the latest evaluation of each user on each item for the current filters."""
+        where_clauses = []
+        query_params = []
+
+        join_qr_clause = ""
+        if selected_question != ALL_QUESTIONS:
+            join_qr_clause = """JOIN question_results qr ON l.evaluation_id = qr.evaluation_id
+        JOIN questions q ON qr.question_id = q.question_id AND q.question_hash = %s"""
+            query_params.append(question_hash(selected_question))
+
+        # latest_evaluations is keyed by (user_id, item_id): both filters are primary key ranges
+        if selected_user != ALL_USERS:
+            where_clauses.append("l.user_id = (SELECT user_id FROM users WHERE username = %s)")
+            query_params.append(selected_user)
+
+        if selected_item != ALL_ITEMS:
+            where_clauses.append("l.item_id = (SELECT item_id FROM items WHERE item_name = %s)")
+            query_params.append(selected_item)
+
+        where_clause_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+
+        latest_query = f"""
+        SELECT
+            i.item_name,
+            l.score_percentage
+        FROM latest_evaluations l
+        JOIN items i ON l.item_id = i.item_id
+        {join_qr_clause}
+        {where_clause_str}
+        ORDER BY l.score_percentage DESC;
+        """
+        return self.db_manager.fetch_data_to_df(latest_query, tuple(query_params))
+
+    def score_distribution(self, selected_item, points_per_user=DISTRIBUTION_POINTS_PER_USER):
+        """Scores of every user for one item, sampled to points_per_user per user."""
+        # Streamed and sampled as it arrives; no ORDER BY, the sample is sorted instead of every row
+        distribution_query = """
+        SELECT
+            u.username,
+            e.score_percentage
+        FROM evaluations e
+        JOIN users u ON e.user_id = u.user_id
+        JOIN items i ON e.item_id = i.item_id
+        WHERE i.item_name = %s;
+        """
+        return self.db_manager.fetch_reduced(distribution_query, (selected_item,),
+                                             ReservoirSample('username', points_per_user))
+
+    def score_counts(self, selected_item):
+        """Number of attempts at each distinct score of each user for one item."""
+        # Scores take few distinct values, so this stays small however many evaluations there are
+        counts_query = """
+        SELECT
+            u.username,
+            e.score_percentage,
+            COUNT(*) AS attempts
+        FROM evaluations e
+        JOIN users u ON e.user_id = u.user_id
+        JOIN items i ON e.item_id = i.item_id
+        WHERE i.item_name = %s
+        GROUP BY u.username, e.score_percentage;
+        """
+        return self.db_manager.fetch_data_to_df(counts_query, (selected_item,))
+
+    def user_scores(self, selected_user):
+        """Average score and attempts per item for one user."""
+        user_scores_query = """
+        SELECT
+            i.item_name,
+            AVG(e.score_percentage) as average_score,
+            COUNT(e.evaluation_id) as total_attempts
+        FROM evaluations e
+        JOIN users u ON e.user_id = u.user_id
+        JOIN items i ON e.item_id = i.item_id
+        WHERE u.username = %s
+        GROUP BY i.item_id
+        ORDER BY average_score DESC;
+        """
+        return self.db_manager.fetch_data_to_df(user_scores_query, (selected_user,))
+
+    def question_success(self, selected_user, selected_item):
+        """Success rate per question for one user and item."""
+        question_radar_query = """
+        SELECT
+            q.question_text,
+            s.success_rate
+        FROM (
+            SELECT qr.question_id, SUM(qr.is_correct) * 100.0 / COUNT(qr.is_correct) AS success_rate
+            FROM question_results qr
+            JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
+            JOIN users u ON e.user_id = u.user_id
+            JOIN items i ON e.item_id = i.item_id
+            WHERE u.username = %s AND i.item_name = %s
+            GROUP BY qr.question_id
+        ) s
+        JOIN questions q ON s.question_id = q.question_id
+        ORDER BY q.question_text;
+        """
+        return self.db_manager.fetch_data_to_df(question_radar_query, (selected_user, selected_item))
+
+    def score_history(self, selected_user, selected_item):
+        """Scores of one user on one item in chronological order."""
+        time_query = """
+        SELECT evaluation_date, score_percentage
+        FROM evaluations e
+        JOIN users u ON e.user_id = u.user_id
+        JOIN items i ON e.item_id = i.item_id
+        WHERE u.username = %s AND i.item_name = %s
+        ORDER BY evaluation_date;
+        """
+        return self.db_manager.fetch_data_to_df(time_query, (selected_user, selected_item))
+
+    def answer_split(self, selected_user, selected_item):
+        """Number of correct and incorrect answers of one user on one item, or None."""
+        answers_query = """
+        SELECT
+            SUM(is_correct) AS correct,
+            COUNT(is_correct) - SUM(is_correct) AS incorrect
+        FROM question_results qr
+        JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
+        JOIN users u ON e.user_id = u.user_id
+        JOIN items i ON e.item_id = i.item_id
+        WHERE u.username = %s AND i.item_name = %s;
+        """
+        answers_df = self.db_manager.fetch_data_to_df(answers_query, (selected_user, selected_item))
+        if answers_df.empty or answers_df.iloc[0]['correct'] is None:
+            return None
+        return answers_df.iloc[0]['correct'], answers_df.iloc[0]['incorrect']
+
+    def question_statistics(self, selected_item):
+        """Item analysis counters of every question of an item."""
+        item_stats_query = """
+        SELECT q.question_hash, q.question_text, s.attempts, s.correct, s.total_sum, s.total_sq_sum, s.correct_total_sum
+        FROM question_statistics s
+        JOIN questions q ON s.question_id = q.question_id
+        JOIN items i ON q.item_id = i.item_id
+        WHERE i.item_name = %s
+        ORDER BY q.question_text;
+        """
+        return self.db_manager.fetch_data_to_df(item_stats_query, (selected_item,))
+
+    def question_success_history(self, selected_item, selected_question):
+        """Daily success rate across all users of the questions of an item, or of one of them."""
+        question_clause = ""
+        query_params = [selected_item]
+        if selected_question != ALL_QUESTIONS:
+            question_clause = "AND q.question_hash = %s"
+            query_params.append(question_hash(selected_question))
+
+        history_query = f"""
+        SELECT
+            DATE(e.evaluation_date) AS day,
+            COUNT(*) AS attempts,
+            SUM(qr.is_correct) * 100.0 / COUNT(*) AS success_rate
+        FROM question_results qr
+        JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
+        JOIN questions q ON qr.question_id = q.question_id
+        JOIN items i ON q.item_id = i.item_id
+        WHERE i.item_name = %s {question_clause}
+        GROUP BY DATE(e.evaluation_date)
+        ORDER BY day;
+        """
+        return self.db_manager.fetch_data_to_df(history_query, tuple(query_params))
+
+    def option_selections(self, selected_item, q_hash):
+        """Selection counts of each option of one question."""
+        options_query = """
+        SELECT o.option_number, o.selections
+        FROM option_selections o
+        JOIN questions q ON o.question_id = q.question_id
+        JOIN items i ON q.item_id = i.item_id
+        WHERE i.item_name = %s AND q.question_hash = %s;
+        """
+        return self.db_manager.fetch_data_to_df(options_query, (selected_item, q_hash))
+
+
+class FactFrameDashboardData(SqlDashboardData):
+    """Dashboard datasets sliced in memory from two fact frames reloaded every FACT_FRAMES_MAX_AGE_SECONDS.
+
+    Evaluation-level and question-level facts are read with one query each, stored with
+    categorical dtypes in the shared query cache, and every chart is a pandas groupby over them.
+    The item analysis counters are already aggregated and still come from SQL.
+    """
+    def __init__(self, db_manager):
+        super().__init__(db_manager)
+        facts = db_manager.cached(('fact_frames',), self.load_fact_frames, max_age=FACT_FRAMES_MAX_AGE_SECONDS)
+        if facts is None:
+            facts = (pd.DataFrame(columns=['evaluation_id', 'username', 'item_name', 'score_percentage', 'evaluation_date']),
+                     pd.DataFrame(columns=['evaluation_id', 'question_text', 'is_correct', 'username', 'item_name']))
+        self.evaluations, self.answers = facts
+
+    def load_fact_frames(self):
+        """Reads the evaluation and question facts, or None if the database failed."""
+        evaluations = self.db_manager.run_query("""
+        SELECT e.evaluation_id, u.username, e.item_id, e.score_percentage, e.evaluation_date
+        FROM evaluations e
+        JOIN users u ON e.user_id = u.user_id;
+        """)
+        answers = self.db_manager.run_query("""
+        SELECT qr.evaluation_id, qr.question_id, qr.is_correct
+        FROM question_results qr;
+        """)
+        item_names = self.db_manager.run_query("SELECT item_id, item_name FROM items;")
+        question_texts = self.db_manager.run_query("SELECT question_id, question_text FROM questions;")
+        if evaluations is None or answers is None or item_names is None or question_texts is None:
+            return None
+
+        # Names are attached from the dimension tables instead of being read once per fact row
+        evaluations['item_name'] = evaluations.pop('item_id').map(item_names.set_index('item_id')['item_name'])
+        answers['question_text'] = answers.pop('question_id').map(question_texts.set_index('question_id')['question_text'])
+        evaluations = evaluations.astype({
+            'evaluation_id': 'int32',
+            'username': 'category',
+            'item_name': 'category',
+            'score_percentage': 'float32'
+        })
+        answers = answers.astype({
+            'evaluation_id': 'int32',
+            'question_text': 'category',
+            'is_correct': 'int8'
+        })
+        # Carry the user and item of each answer so question-level filters need no join later
+        answers = answers.merge(evaluations[['evaluation_id', 'username', 'item_name']], on='evaluation_id')
+        return evaluations, answers
+
+    def filter(self, frame, selected_user=ALL_USERS, selected_item=ALL_ITEMS):
+        """Rows of a fact frame matching the user and item filters."""
+        mask = pd.Series(True, index=frame.index)
+        if selected_user != ALL_USERS:
+            mask &= frame['username'] == selected_user
+        if selected_item != ALL_ITEMS:
+            mask &= frame['item_name'] == selected_item
+        return frame[mask]
+
+    def evaluation_facts(self, selected_user=ALL_USERS, selected_item=ALL_ITEMS):
+        """Evaluation facts for the user and item filters."""
+        return self.filter(self.evaluations, selected_user, selected_item)
+
+    def answer_facts(self, selected_user=ALL_USERS, selected_item=ALL_ITEMS):
+        """Question-level facts for the user and item filters."""
+        return self.filter(self.answers, selected_user, selected_item)
+
+    def items(self, selected_user):
+        """Evaluation items attempted by the selected user (or by anyone)."""
+        evaluations = self.evaluation_facts(selected_user)
+        return sorted(evaluations['item_name'].unique().tolist())
+
+    def questions(self, selected_item):
+        """Questions answered at least once for an item."""
+        answers = self.answer_facts(selected_item=selected_item)
+        return sorted(answers['question_text'].unique().tolist())
+
+    def item_performance(self, selected_user, selected_item, selected_question):
+        """Average score and attempts per item for the current filters."""
+        evaluations = self.evaluation_facts(selected_user, selected_item)
+        if selected_question != ALL_QUESTIONS:
+            answers = self.answer_facts(selected_item=selected_item)
+            answered = answers.loc[answers['question_text'] == selected_question, 'evaluation_id']
+            evaluations = evaluations[evaluations['evaluation_id'].isin(answered)]
+
+        item_perf_df = (
+            evaluations.groupby('item_name', observed=True)['score_percentage']
+            .agg(average_score='mean', total_attempts='count')
+            .reset_index()
+            .sort_values('average_score', ascending=False)
+        )
+        item_perf_df['item_name'] = item_perf_df['item_name'].astype(str)
+        return item_perf_df
+
+    def score_distribution(self, selected_item, points_per_user=DISTRIBUTION_POINTS_PER_USER):
+        """Scores of every user for one item, sampled to points_per_user per user."""
+        evaluations = self.evaluation_facts(selected_item=selected_item)
+        sample = ReservoirSample('username', points_per_user)
+        sample.add(evaluations[['username', 'score_percentage']])
+        distribution_df = sample.result()
+        if not distribution_df.empty:
+            distribution_df['username'] = distribution_df['username'].astype(str)
+        return distribution_df
+
+    def score_counts(self, selected_item):
+        """Number of attempts at each distinct score of each user for one item."""
+        evaluations = self.evaluation_facts(selected_item=selected_item)
+        counts_df = (
+            evaluations.groupby(['username', 'score_percentage'], observed=True)
+            .size()
+            .rename('attempts')
+            .reset_index()
+        )
+        counts_df['username'] = counts_df['username'].astype(str)
+        return counts_df
+
+    def user_scores(self, selected_user):
+        """Average score and attempts per item for one user."""
+        return self.item_performance(selected_user, ALL_ITEMS, ALL_QUESTIONS)
+
+    def question_success(self, selected_user, selected_item):
+        """Success rate per question for one user and item."""
+        answers = self.answer_facts(selected_user, selected_item)
+        success_df = (
+            answers.groupby('question_text', observed=True)['is_correct']
+            .mean()
+            .mul(100)
+            .rename('success_rate')
+            .reset_index()
+            .sort_values('question_text')
+        )
+        success_df['question_text'] = success_df['question_text'].astype(str)
+        return success_df
+
+    def score_history(self, selected_user, selected_item):
+        """Scores of one user on one item in chronological order."""
+        evaluations = self.evaluation_facts(selected_user, selected_item)
+        return evaluations[['evaluation_date', 'score_percentage']].sort_values('evaluation_date')
+
+    def question_success_history(self, selected_item, selected_question):
+        """Daily success rate across all users of the questions of an item, or of one of them."""
+        answers = self.answer_facts(selected_item=selected_item)
+        if selected_question != ALL_QUESTIONS:
+            answers = answers[answers['question_text'] == selected_question]
+        dates = self.evaluation_facts(selected_item=selected_item)[['evaluation_id', 'evaluation_date']]
+        facts = answers[['evaluation_id', 'is_correct']].merge(dates, on='evaluation_id')
+        day = pd.to_datetime(facts['evaluation_date']).dt.normalize().rename('day')
+        history_df = facts.groupby(day)['is_correct'].agg(attempts='size', success_rate='mean').reset_index()
+        history_df['success_rate'] *= 100
+        return history_df
+
+    def answer_split(self, selected_user, selected_item):
+        """Number of correct and incorrect answers of one user on one item, or None."""
+        answers = self.answer_facts(selected_user, selected_item)
+        if answers.empty:
+            return None
+        correct = int(answers['is_correct'].sum())
+        return correct, len(answers) - correct
+
+
+class RollupDashboardData(SqlDashboardData):
+    """Dashboard datasets read from the daily rollup tables maintained on every submission.
+
+    Charts that only need per-item or per-day aggregates scan one row per (user, item, day)
+    instead of every evaluation, and the question success trend one row per (question, day)
+    instead of every answer. The score history becomes a daily average. Filters the
+    rollups cannot answer (a single question) fall back to the SQL queries on the fact tables.
+    """
+    def item_performance(self, selected_user, selected_item, selected_question):
+        """Average score and attempts per item for the current filters."""
+        if selected_question != ALL_QUESTIONS:
+            return super().item_performance(selected_user, selected_item, selected_question)
+
+        where_clauses = []
+        query_params = []
+
+        if selected_user != ALL_USERS:
+            where_clauses.append("u.username = %s")
+            query_params.append(selected_user)
+
+        if selected_item != ALL_ITEMS:
+            where_clauses.append("i.item_name = %s")
+            query_params.append(selected_item)
+
+        where_clause_str = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+
+        item_perf_query = f"""
+        SELECT
+            i.item_name,
+            SUM(d.score_sum) / SUM(d.attempts) AS average_score,
+            SUM(d.attempts) AS total_attempts
+        FROM daily_user_item_scores d
+        JOIN users u ON d.user_id = u.user_id
+        JOIN items i ON d.item_id = i.item_id
+        {where_clause_str}
+        GROUP BY i.item_id
+        ORDER BY average_score DESC;
+        """
+        return self.db_manager.fetch_data_to_df(item_perf_query, tuple(query_params))
+
+    def user_scores(self, selected_user):
+        """Average score and attempts per item for one user."""
+        return self.item_performance(selected_user, ALL_ITEMS, ALL_QUESTIONS)
+
+    def score_history(self, selected_user, selected_item):
+        """Daily average score of one user on one item in chronological order."""
+        time_query = """
+        SELECT d.day AS evaluation_date, d.score_sum / d.attempts AS score_percentage
+        FROM daily_user_item_scores d
+        JOIN users u ON d.user_id = u.user_id
+        JOIN items i ON d.item_id = i.item_id
+        WHERE u.username = %s AND i.item_name = %s
+        ORDER BY d.day;
+        """
+        return self.db_manager.fetch_data_to_df(time_query, (selected_user, selected_item))
+
+    def answer_split(self, selected_user, selected_item):
+        """Number of correct and incorrect answers of one user on one item, or None."""
+        answers_query = """
+        SELECT
+            SUM(d.correct_answers) AS correct,
+            SUM(d.questions_attempted) - SUM(d.correct_answers) AS incorrect
+        FROM daily_user_item_scores d
+        JOIN users u ON d.user_id = u.user_id
+        JOIN items i ON d.item_id = i.item_id
+        WHERE u.username = %s AND i.item_name = %s;
+        """
+        answers_df = self.db_manager.fetch_data_to_df(answers_query, (selected_user, selected_item))
+        if answers_df.empty or answers_df.iloc[0]['correct'] is None:
+            return None
+        return answers_df.iloc[0]['correct'], answers_df.iloc[0]['incorrect']
+
+    def question_success_history(self, selected_item, selected_question):
+        """Daily success rate across all users of the questions of an item, or of one of them."""
+        question_clause = ""
+        query_params = [selected_item]
+        if selected_question != ALL_QUESTIONS:
+            question_clause = "AND q.question_hash = %s"
+            query_params.append(question_hash(selected_question))
+
+        # One row per (question, day): the item's questions are primary key ranges of the rollup
+        history_query = f"""
+        SELECT
+            d.day,
+            SUM(d.attempts) AS attempts,
+            SUM(d.correct) * 100.0 / SUM(d.attempts) AS success_rate
+        FROM daily_question_scores d
+        JOIN questions q ON d.question_id = q.question_id
+        JOIN items i ON q.item_id = i.item_id
+        WHERE i.item_name = %s {question_clause}
+        GROUP BY d.day
+        ORDER BY d.day;
+        """
+        return self.db_manager.fetch_data_to_df(history_query, tuple(query_params))
+
+
+class ParquetDashboardData(FactFrameDashboardData):
+    """Dashboard datasets read from the Parquet snapshot written by parquet_export.py.
+
+    Historical views never query the database. Facts are read per filter: the item filter
+    prunes the month/item partition directories, the user filter is pushed down to the
+    row-group statistics, only the needed columns are decoded and the files are memory-mapped.
+    Results are cached per export watermark. Option selections still come from SQL.
+    """
+    def __init__(self, db_manager, directory=None):
+        # Skips the fact frame load of the parent: each filter reads only its own partitions
+        SqlDashboardData.__init__(self, db_manager)
+        from parquet_export import PARQUET_DIR, read_state
+
+        self.directory = directory or PARQUET_DIR
+        state = read_state(self.directory)
+        self.exported_at = state['exported_at']
+        # A full re-export ends on the same evaluation_id, but not at the same time
+        self.token = (state['last_evaluation_id'], state['exported_at'])
+        users, items, questions = self.cached(('dimensions',), self.load_dimensions)
+        self.user_names = users.set_index('user_id')['username']
+        self.user_ids = users.set_index('username')['user_id']
+        self.item_names = items.set_index('item_id')['item_name']
+        self.item_ids = items.set_index('item_name')['item_id']
+        self.question_dimension = questions.set_index('question_id')
+
+    def cached(self, key, build):
+        """Returns build() through the shared query cache, keyed on the export watermark."""
+        cache = getattr(self.db_manager, 'cache', None)
+        if cache is None:
+            return build()
+        key = ('parquet', self.directory) + key
+        value = cache.get(key, self.token)
+        if value is None:
+            value = build()
+            cache.put(key, self.token, value)
+        return value
+
+    def load_dimensions(self):
+        """Users, items and questions of the last export, empty before the first one."""
+        frames = []
+        for table, columns in (('users', ['user_id', 'username']),
+                               ('items', ['item_id', 'item_name']),
+                               ('questions', ['question_id', 'item_id', 'question_hash', 'question_text'])):
+            path = os.path.join(self.directory, f"{table}.parquet")
+            frames.append(pd.read_parquet(path, memory_map=True) if os.path.exists(path)
+                          else pd.DataFrame(columns=columns))
+        return tuple(frames)
+
+    def read_facts(self, table, columns, selected_user, selected_item):
+        """Columns of a fact table for the filters, with the filters pushed down to Parquet."""
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+
+        path = os.path.join(self.directory, table)
+        condition = None
+        if selected_item != ALL_ITEMS:
+            if selected_item not in self.item_ids.index:
+                return pd.DataFrame(columns=columns)
+            condition = ds.field('item_id') == int(self.item_ids[selected_item])
+        if selected_user != ALL_USERS:
+            if selected_user not in self.user_ids.index:
+                return pd.DataFrame(columns=columns)
+            user_condition = ds.field('user_id') == int(self.user_ids[selected_user])
+            condition = user_condition if condition is None else condition & user_condition
+        if not os.path.isdir(path):
+            return pd.DataFrame(columns=columns)
+
+        dataset = ds.dataset(path, format='parquet', partitioning='hive',
+                             filesystem=fs.LocalFileSystem(use_mmap=True))
+        return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+    def evaluation_facts(self, selected_user=ALL_USERS, selected_item=ALL_ITEMS):
+        """Evaluation facts for the user and item filters."""
+        def build():
+            facts = self.read_facts('evaluations',
+                                    ['evaluation_id', 'user_id', 'item_id', 'score_percentage', 'evaluation_date'],
+                                    selected_user, selected_item)
+            facts['username'] = facts.pop('user_id').map(self.user_names)
+            facts['item_name'] = facts.pop('item_id').map(self.item_names)
+            return facts.astype({'username': 'category', 'item_name': 'category'})
+        return self.cached(('evaluations', selected_user, selected_item), build)
+
+    def answer_facts(self, selected_user=ALL_USERS, selected_item=ALL_ITEMS):
+        """Question-level facts for the user and item filters."""
+        def build():
+            facts = self.read_facts('question_results',
+                                    ['evaluation_id', 'question_id', 'is_correct', 'user_id', 'item_id'],
+                                    selected_user, selected_item)
+            facts['question_text'] = facts['question_id'].map(self.question_dimension['question_text'])
+            facts['username'] = facts.pop('user_id').map(self.user_names)
+            facts['item_name'] = facts.pop('item_id').map(self.item_names)
+            return facts.astype({'question_text': 'category', 'username': 'category', 'item_name': 'category'})
+        return self.cached(('answers', selected_user, selected_item), build)
+
+    def usernames(self):
+        """All usernames, sorted."""
+        return sorted(self.user_ids.index.tolist())
+
+    def latest_scores(self, selected_user, selected_item, selected_question):
+        """Score of the latest evaluation of each user on each item for the current filters."""
+        evaluations = self.evaluation_facts(selected_user, selected_item)
+        latest = (evaluations.sort_values(['evaluation_date', 'evaluation_id'])
+                  .drop_duplicates(['username', 'item_name'], keep='last'))
+        if selected_question != ALL_QUESTIONS:
+            answers = self.answer_facts(selected_user, selected_item)
+            answered = answers.loc[answers['question_text'] == selected_question, 'evaluation_id']
+            latest = latest[latest['evaluation_id'].isin(answered)]
+
+        latest_df = latest[['item_name', 'score_percentage']].sort_values('score_percentage', ascending=False)
+        latest_df['item_name'] = latest_df['item_name'].astype(str)
+        return latest_df
+
+    def question_statistics(self, selected_item):
+        """Item analysis counters of every question of an item, summed from the exported facts."""
+        answers = self.answer_facts(selected_item=selected_item)
+        scores = self.evaluation_facts(selected_item=selected_item)[['evaluation_id', 'score_percentage']]
+        facts = answers[['evaluation_id', 'question_id', 'is_correct']].merge(scores, on='evaluation_id')
+        total = facts['score_percentage'].astype(float)
+        facts = facts.assign(total_sum=total, total_sq_sum=total * total,
+                             correct_total_sum=facts['is_correct'] * total)
+
+        stats_df = facts.groupby('question_id').agg(
+            attempts=('is_correct', 'size'),
+            correct=('is_correct', 'sum'),
+            total_sum=('total_sum', 'sum'),
+            total_sq_sum=('total_sq_sum', 'sum'),
+            correct_total_sum=('correct_total_sum', 'sum'),
+        )
+        stats_df = self.question_dimension[['question_hash', 'question_text']].join(stats_df, how='inner')
+        return stats_df.sort_values('question_text').reset_index(drop=True)
@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+import mysql.connector
+from mysql.connector import errors
+
+
+STORAGE_KEYS = ('backend', 'sqlite_path')
+
+
+def open_pool(config):
+    """Connection pool of the storage backend named by config['backend']
+
+    'mysql' (the default) connects to the server in config, 'sqlite' uses the
+    embedded file at config['sqlite_path'], 'duckdb' reads that same file with
+    DuckDB and is meant for the dashboards only.
+    """
+    backend = config.get('backend', 'mysql')
+    if backend == 'mysql':
+        return ConnectionPool(config)
+
+    from embedded_db import DuckDBPool, SQLitePool
+    if backend == 'sqlite':
+        return SQLitePool(config)
+    if backend == 'duckdb':
+        return DuckDBPool(config)
+    raise ValueError(f"Moteur de stockage inconnu: {backend}")
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections shared by every Streamlit session"""
+    backend = 'mysql'
+
+    def __init__(self, config):
+        config = {k: v for k, v in config.items() if k not in STORAGE_KEYS}
+        self.size = config.pop('pool_size', 5)
+        self.timeout = config.pop('pool_timeout', 10)
+        self.recycle = config.pop('pool_recycle', 3600)
+        self.config = config
+
+        self._idle = queue.LifoQueue()
+        self._born = {}
+        self._created = 0
+        self._lock = threading.Lock()
+        self._metrics = {
+            'checkouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'exhausted': 0,
+            'reconnects': 0,
+            'connections_opened': 0,
+        }
+
+    def _open(self):
+        """Open a new physical connection"""
+        conn = mysql.connector.connect(**self.config)
+        with self._lock:
+            self._born[id(conn)] = time.monotonic()
+            self._metrics['connections_opened'] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection and free its slot in the pool"""
+        with self._lock:
+            self._born.pop(id(conn), None)
+            self._created -= 1
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _ensure_alive(self, conn):
+        """Health check a connection, replacing it if it went stale"""
+        born = self._born.get(id(conn), 0)
+        if not self.recycle or time.monotonic() - born <= self.recycle:
+            try:
+                conn.ping(reconnect=True, attempts=1, delay=0)
+                return conn
+            except mysql.connector.Error:
+                pass
+
+        # Too old or unreachable: keep the slot reserved and open a fresh connection
+        self._discard(conn)
+        with self._lock:
+            self._created += 1
+            self._metrics['reconnects'] += 1
+        return self._open_or_release_slot()
+
+    def _open_or_release_slot(self):
+        """Open a connection for an already reserved slot, freeing it on failure"""
+        try:
+            return self._open()
+        except mysql.connector.Error:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def get_connection(self):
+        """Check out a healthy connection, waiting up to pool_timeout seconds"""
+        start = time.monotonic()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+
+            if can_create:
+                conn = self._open_or_release_slot()
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._metrics['exhausted'] += 1
+                    raise errors.PoolError(
+                        f"Aucune connexion disponible après {self.timeout}s ({self.size} connexions occupées)"
+                    )
+
+        conn = self._ensure_alive(conn)
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._metrics['checkouts'] += 1
+            self._metrics['wait_time_total'] += waited
+            self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], waited)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, dropping it if it is broken"""
+        if conn is None:
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except mysql.connector.Error:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def stats(self):
+        """Snapshot of the pool metrics"""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot['size'] = self.size
+            snapshot['open'] = self._created
+        snapshot['idle'] = self._idle.qsize()
+        snapshot['in_use'] = snapshot['open'] - snapshot['idle']
+        checkouts = snapshot['checkouts']
+        snapshot['wait_time_avg'] = snapshot['wait_time_total'] / checkouts if checkouts else 0.0
+        return snapshot
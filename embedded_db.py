@@ -0,0 +1,316 @@
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+from mysql.connector import errorcode, errors
+
+DEFAULT_SQLITE_PATH = os.path.join("data", "quiz.sqlite3")
+
+# MySQL syntax of the CREATE TABLE and upsert statements that SQLite does not parse
+_AUTO_INCREMENT_KEY = re.compile(r"\b(?:SMALLINT|INT)(?: UNSIGNED)? AUTO_INCREMENT PRIMARY KEY", re.I)
+_TABLE_OPTIONS = re.compile(r"\)\s*ENGINE=[^;]*;?\s*$", re.I)
+_INLINE_INDEX = re.compile(r",\s*(UNIQUE KEY|INDEX) (\w+) (\([^)]*\))", re.I)
+_CREATE_TABLE = re.compile(r"CREATE TABLE IF NOT EXISTS (\w+)", re.I)
+_UPSERT_ID = re.compile(r"ON DUPLICATE KEY UPDATE\s+(\w+) = LAST_INSERT_ID\(\1\)", re.I)
+_UPSERT = re.compile(r"ON DUPLICATE KEY UPDATE", re.I)
+_UPSERT_VALUE = re.compile(r"\bVALUES\((\w+)\)", re.I)
+# A JSON column would get NUMERIC affinity and turn the answer "2" into the integer 2
+_JSON_COLUMN = re.compile(r"(?<=\w) JSON\b", re.I)
+
+
+@lru_cache(maxsize=512)
+def sqlite_statements(sql):
+    """Rewrite one statement of the MySQL dialect used in this repo into SQLite statements.
+
+    Covers what DatabaseManager and the dashboards issue: %s placeholders,
+    INSERT IGNORE, ON DUPLICATE KEY UPDATE with VALUES() (and the
+    LAST_INSERT_ID(id) idiom, rewritten to RETURNING), IF(), CURRENT_DATE(),
+    JSON columns, stored as TEXT, and CREATE TABLE with inline indexes, which
+    become CREATE INDEX statements.
+    Timestamps are local time, like the MySQL server's.
+    """
+    sql = sql.strip().replace("%s", "?").replace("%%", "%")
+    sql = re.sub(r"\bINSERT IGNORE\b", "INSERT OR IGNORE", sql, flags=re.I)
+    sql = re.sub(r"\bIF\(", "IIF(", sql)
+    sql = re.sub(r"\bCURRENT_DATE\(\)", "date('now', 'localtime')", sql, flags=re.I)
+    sql = re.sub(r"\bCURRENT_TIMESTAMP\b", "(datetime('now', 'localtime'))", sql, flags=re.I)
+    sql = re.sub(r" AFTER \w+$", "", sql)
+    if re.match(r"(?:CREATE|ALTER) TABLE", sql, re.I):
+        sql = _JSON_COLUMN.sub(" TEXT", sql)
+
+    sql, returning = _UPSERT_ID.subn(r"ON CONFLICT DO UPDATE SET \1 = \1 RETURNING \1", sql)
+    if not returning:
+        match = _UPSERT.search(sql)
+        if match:
+            # Unqualified columns of a DO UPDATE are the existing row, VALUES(x) is excluded.x
+            sql = sql[:match.start()] + "ON CONFLICT DO UPDATE SET" + \
+                _UPSERT_VALUE.sub(r"excluded.\1", sql[match.end():])
+
+    table = _CREATE_TABLE.match(sql)
+    if not table:
+        return (sql,)
+    indexes = [
+        f"CREATE {'UNIQUE ' if kind.upper().startswith('UNIQUE') else ''}INDEX IF NOT EXISTS "
+        f"{name} ON {table.group(1)} {columns}"
+        for kind, name, columns in _INLINE_INDEX.findall(sql)
+    ]
+    sql = _INLINE_INDEX.sub("", sql)
+    sql = _TABLE_OPTIONS.sub(")", sql)
+    sql = _AUTO_INCREMENT_KEY.sub("INTEGER PRIMARY KEY AUTOINCREMENT", sql)
+    sql = re.sub(r" UNSIGNED\b", "", sql)
+    sql = re.sub(r" ON UPDATE \(datetime\('now', 'localtime'\)\)", "", sql)
+    return (sql, *indexes)
+
+
+def mysql_error(err):
+    """The mysql.connector error matching a sqlite3 error, so callers handle both backends alike"""
+    message = str(err)
+    if isinstance(err, sqlite3.IntegrityError):
+        errno = errorcode.ER_DUP_ENTRY if message.startswith("UNIQUE") else None
+        return errors.IntegrityError(msg=message, errno=errno)
+    if isinstance(err, sqlite3.OperationalError):
+        return errors.OperationalError(msg=message)
+    if isinstance(err, sqlite3.ProgrammingError):
+        return errors.ProgrammingError(msg=message)
+    return errors.DatabaseError(msg=message)
+
+
+class EmbeddedCursor:
+    """DB-API cursor over sqlite3 that accepts the MySQL statements of this repo"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self.lastrowid = None
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, sql, params=()):
+        statements = sqlite_statements(sql)
+        try:
+            for statement in statements:
+                self._cursor.execute(statement, tuple(params) if statement is statements[0] else ())
+            self.lastrowid = self._cursor.lastrowid
+            if " RETURNING " in statements[0]:
+                # The id of the inserted or existing row, like LAST_INSERT_ID(id) on MySQL
+                returned = self._cursor.fetchall()
+                if returned:
+                    self.lastrowid = returned[0][0]
+        except sqlite3.Error as err:
+            raise mysql_error(err) from err
+
+    def executemany(self, sql, rows):
+        try:
+            self._cursor.executemany(sqlite_statements(sql)[0], [tuple(row) for row in rows])
+        except sqlite3.Error as err:
+            raise mysql_error(err) from err
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        return [self._row(row) for row in rows]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class EmbeddedConnection:
+    """sqlite3 connection with the parts of the mysql.connector API this repo uses"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def cursor(self, dictionary=False, buffered=None):
+        # sqlite3 cursors step through the result lazily, so every cursor is unbuffered
+        return EmbeddedCursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        try:
+            self._conn.commit()
+        except sqlite3.Error as err:
+            raise mysql_error(err) from err
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLitePool:
+    """Embedded backend: a small pool of connections to one SQLite file in WAL mode.
+
+    Same interface as db_pool.ConnectionPool, so DatabaseManager and
+    DashboardDBManager run unchanged on a single machine without a server.
+    WAL lets the dashboard read while the quiz writes; writers queue on
+    busy_timeout.
+    """
+    backend = 'sqlite'
+
+    def __init__(self, config):
+        self.path = config.get('sqlite_path', DEFAULT_SQLITE_PATH)
+        self.size = config.get('pool_size', 5)
+        self.timeout = config.get('pool_timeout', 10)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._metrics = {'checkouts': 0, 'wait_time_total': 0.0, 'wait_time_max': 0.0, 'exhausted': 0,
+                         'reconnects': 0, 'connections_opened': 0}
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               isolation_level='IMMEDIATE')
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        with self._lock:
+            self._metrics['connections_opened'] += 1
+        return EmbeddedConnection(conn)
+
+    def get_connection(self):
+        """Check out a connection, waiting up to pool_timeout seconds"""
+        start = time.monotonic()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._open()
+                except (sqlite3.Error, errors.Error) as err:
+                    with self._lock:
+                        self._created -= 1
+                    raise mysql_error(err) if isinstance(err, sqlite3.Error) else err
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._metrics['exhausted'] += 1
+                    raise errors.PoolError(
+                        f"Aucune connexion disponible après {self.timeout}s ({self.size} connexions occupées)"
+                    )
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._metrics['checkouts'] += 1
+            self._metrics['wait_time_total'] += waited
+            self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], waited)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back what its user left open"""
+        if conn is None:
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def stats(self):
+        """Snapshot of the pool metrics"""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot['size'] = self.size
+            snapshot['open'] = self._created
+        snapshot['idle'] = self._idle.qsize()
+        snapshot['in_use'] = snapshot['open'] - snapshot['idle']
+        checkouts = snapshot['checkouts']
+        snapshot['wait_time_avg'] = snapshot['wait_time_total'] / checkouts if checkouts else 0.0
+        return snapshot
+
+
+class DuckDBConnection:
+    """Read-only DuckDB connection over the SQLite file, for the dashboard's scans"""
+
+    def __init__(self, conn, error_class):
+        self._conn = conn
+        self._error_class = error_class
+        self.in_transaction = False
+
+    def cursor(self, dictionary=False, buffered=None):
+        return self._conn.cursor()
+
+    def read_frame(self, query, params=None):
+        """Result of a dashboard query as a DataFrame, built column-wise by DuckDB"""
+        try:
+            return self._conn.execute(query.replace("%s", "?"), list(params or ())).df()
+        except self._error_class as err:
+            raise errors.DatabaseError(msg=str(err)) from err
+
+    def read_chunks(self, query, params=None, chunksize=10000):
+        """Result of a dashboard query as DataFrames of about chunksize rows, for streaming readers"""
+        # DuckDB produces vectors of 2048 rows, chunks are a whole number of them
+        vectors = max(1, chunksize // 2048)
+        try:
+            result = self._conn.execute(query.replace("%s", "?"), list(params or ()))
+            while True:
+                chunk = result.fetch_df_chunk(vectors)
+                if chunk.empty:
+                    break
+                yield chunk
+        except self._error_class as err:
+            raise errors.DatabaseError(msg=str(err)) from err
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+class DuckDBPool(SQLitePool):
+    """Dashboard backend: DuckDB attached read-only to the SQLite file the quiz writes.
+
+    Aggregations run in DuckDB's vectorized engine and come back as columns
+    instead of rows. Needs the duckdb package and its sqlite extension.
+    """
+    backend = 'duckdb'
+
+    def _open(self):
+        try:
+            import duckdb
+        except ImportError as err:
+            raise errors.DatabaseError(msg="Le moteur duckdb n'est pas installé (pip install duckdb)") from err
+
+        try:
+            conn = duckdb.connect()
+            conn.execute("INSTALL sqlite")
+            conn.execute("LOAD sqlite")
+            conn.execute(f"ATTACH '{self.path}' AS quiz (TYPE SQLITE, READ_ONLY)")
+            conn.execute("USE quiz")
+        except duckdb.Error as err:
+            raise errors.DatabaseError(msg=str(err)) from err
+        with self._lock:
+            self._metrics['connections_opened'] += 1
+        return DuckDBConnection(conn, duckdb.Error)
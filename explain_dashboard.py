@@ -0,0 +1,159 @@
+"""Query-plan regression check for the dashboard SQL.
+
+Collects every query the dashboard datasets issue (SqlDashboardData and
+RollupDashboardData, for each combination of filters), runs EXPLAIN on each
+against a seeded scratch database and exits with status 1 if any of them reads
+a fact table (evaluations, question_results) with a full table scan, or if a
+query on a fact table gets a plan without any of them. EXPLAIN names tables by
+their alias, so each query's aliases are mapped back to their tables. Full
+scans of the dimension tables (users, items, questions) and of the
+pre-aggregated tables are allowed. A full scan of a covering index is reported
+but allowed, because the unfiltered "all users, all items" views have to
+aggregate every row. The fact frame mode loads whole tables by design and is
+not checked.
+
+    python explain_dashboard.py --database quiz_bench --min-evaluations 20000 [--verbose]
+"""
+import argparse
+import re
+import sys
+
+import pandas as pd
+
+from dashboard_data import ALL_ITEMS, ALL_QUESTIONS, ALL_USERS, RollupDashboardData, SqlDashboardData
+from question_bank import load_question_bank, question_hash
+from seed_data import scratch_database, seed
+
+FACT_TABLES = {'evaluations', 'question_results'}
+# A table named after FROM or JOIN, with its alias unless the next word is a keyword
+TABLE_REFERENCE = re.compile(
+    r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|USING|GROUP|ORDER|HAVING|LIMIT|UNION|"
+    r"LEFT|RIGHT|INNER|CROSS|STRAIGHT_JOIN)\b)(\w+))?",
+    re.I
+)
+
+
+class RecordingDBManager:
+    """Stands in for DashboardDBManager and records the SQL of each dataset instead of running it"""
+    def __init__(self):
+        self.queries = []
+
+    def fetch_data_to_df(self, query, params=None):
+        self.queries.append((query, tuple(params or ())))
+        return pd.DataFrame()
+
+    def fetch_reduced(self, query, params, reducer):
+        return self.fetch_data_to_df(query, params)
+
+
+def dashboard_queries(username, item_name, question_text):
+    """Every (label, query, params) the dashboards can issue for the given sample filters"""
+    collected = []
+    for data_class in (SqlDashboardData, RollupDashboardData):
+        for user in (ALL_USERS, username):
+            for item in (ALL_ITEMS, item_name):
+                for question in ((ALL_QUESTIONS, question_text) if item != ALL_ITEMS else (ALL_QUESTIONS,)):
+                    recorder = RecordingDBManager()
+                    data = data_class(recorder)
+                    data.usernames()
+                    data.items(user)
+                    data.item_performance(user, item, question)
+                    data.latest_scores(user, item, question)
+                    if item != ALL_ITEMS:
+                        data.questions(item)
+                        data.score_distribution(item)
+                        data.score_counts(item)
+                        data.question_statistics(item)
+                        data.question_success_history(item, question)
+                        data.option_selections(item, question_hash(question_text))
+                    if user != ALL_USERS:
+                        data.user_scores(user)
+                    if user != ALL_USERS and item != ALL_ITEMS:
+                        data.question_success(user, item)
+                        data.score_history(user, item)
+                        data.answer_split(user, item)
+                    label = f"{data_class.__name__} user={user != ALL_USERS:d} item={item != ALL_ITEMS:d} " \
+                            f"question={question != ALL_QUESTIONS:d}"
+                    collected.extend((label, query, params) for query, params in recorder.queries)
+
+    seen = set()
+    unique = []
+    for label, query, params in collected:
+        if (query, params) not in seen:
+            seen.add((query, params))
+            unique.append((label, query, params))
+    return unique
+
+
+def table_aliases(query):
+    """Base table of every name EXPLAIN can show for a query: its alias, or the table itself"""
+    return {alias or table: table for table, alias in TABLE_REFERENCE.findall(query)}
+
+
+def explain(cursor, query, params):
+    """EXPLAIN rows of a query as dictionaries"""
+    cursor.execute("EXPLAIN " + query.strip().rstrip(';'), params)
+    return cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default='quiz_bench')
+    parser.add_argument('--min-evaluations', type=int, default=20000,
+                        help="seed the scratch database up to this many evaluations")
+    parser.add_argument('--verbose', action='store_true', help="print every plan, not only the failures")
+    args = parser.parse_args()
+
+    db = scratch_database(args.database)
+    bank = load_question_bank()
+    db.connect()
+    cursor = db.connection.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT COUNT(*) AS n FROM evaluations")
+        existing = cursor.fetchone()['n']
+    finally:
+        cursor.close()
+        db.disconnect()
+    if existing < args.min_evaluations:
+        seed(db, bank, args.min_evaluations - existing)
+
+    item = bank.items[0]
+    db.connect()
+    cursor = db.connection.cursor(dictionary=True)
+    failures = 0
+    try:
+        cursor.execute("SELECT username FROM users ORDER BY total_evaluations DESC LIMIT 1")
+        username = cursor.fetchone()['username']
+        queries = dashboard_queries(username, item['item'], item['questions'][0]['question'])
+
+        for label, query, params in queries:
+            plan = explain(cursor, query, params)
+            # EXPLAIN names tables by their alias (evaluations e -> e)
+            aliases = table_aliases(query)
+            fact_rows = [row for row in plan if aliases.get(row['table']) in FACT_TABLES]
+            full_scans = [row for row in fact_rows if row['type'] == 'ALL']
+            index_scans = [row for row in fact_rows if row['type'] == 'index']
+            # A query on the fact tables whose plan shows none of them cannot be checked
+            unchecked = FACT_TABLES.intersection(aliases.values()) and not fact_rows
+            failed = bool(full_scans) or bool(unchecked)
+            failures += failed
+
+            if failed or args.verbose:
+                status = "FULL SCAN" if full_scans else ("NON VÉRIFIÉE" if unchecked else
+                                                         "index scan" if index_scans else "ok")
+                print(f"[{status}] {label}")
+                print("    " + " ".join(query.split())[:160])
+                for row in plan:
+                    print(f"    {row['table']:<24} type={str(row['type']):<7} key={row['key']} rows={row['rows']} "
+                          f"{row.get('Extra') or ''}")
+    finally:
+        cursor.close()
+        db.disconnect()
+
+    print(f"{len(queries)} requêtes vérifiées, {failures} avec un parcours complet d'une table de faits "
+          f"ou un plan sans table de faits.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
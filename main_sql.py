@@ -1,13 +1,19 @@
 import streamlit as st
-import json
 from typing import Dict, List, Any, Union
 import random
 import mysql.connector
+from mysql.connector import errorcode
 from datetime import datetime
 import hashlib
-
-# Sample quiz data with all question types
-SAMPLE_QUIZ_DATA = json.load(open("questions.json", "r", encoding="utf-8"))
+import logging
+import sqlite3
+from db_pool import open_pool
+from thumbnails import ThumbnailCache
+from offline_journal import OfflineJournal
+from quiz_session import QuizSession
+from submission_queue import SubmissionQueue, make_submission, save_submission
+from question_bank import (GradingSpec, encode_answer, grade, get_question_bank, load_question_bank,
+                           parse_stored_answer, question_hash, selected_options)
 
 # Default images for each item (you can replace these with your actual image URLs)
 DEFAULT_IMAGES = [
@@ -19,34 +25,102 @@ DEFAULT_IMAGES = [
     "qualite.png"
 ]
 
+logger = logging.getLogger(__name__)
+
 # Database configuration
 DB_CONFIG = {
+    # 'mysql', or 'sqlite' for a single machine without a server (file at sqlite_path)
+    'backend': 'mysql',
+    'sqlite_path': 'data/quiz.sqlite3',
     'host': '127.0.0.1',
     'user': 'root',
     'password': 'root123',
     'database': 'quiz_db2',
     'charset': 'utf8mb4',
-    'collation': 'utf8mb4_unicode_ci'
+    'collation': 'utf8mb4_unicode_ci',
+    # Connection pool shared by every session of this process
+    'pool_size': 10,
+    'pool_timeout': 10,
+    'pool_recycle': 3600
 }
 
+# Finished quizzes are journaled locally and saved to MySQL in the background
+# (see submission_queue.py); False saves them synchronously on the click, and only
+# hands them to the queue while MySQL is unreachable. The queue is the authoritative
+# store of unsaved submissions; the offline journal only backs it up when its file
+# cannot be written.
+WRITE_BEHIND = True
+
+@st.cache_resource
+def get_connection_pool():
+    """Process-wide connection pool shared by all sessions"""
+    return open_pool(DB_CONFIG)
+
+@st.cache_resource
+def get_user_id_cache():
+    """Process-wide username -> user_id cache shared by all sessions"""
+    return {}
+
+@st.cache_resource
+def get_dimension_cache():
+    """Process-wide item_name -> (item_id, {question_hash: question_id}) cache shared by all sessions"""
+    return {}
+
+@st.cache_resource
+def get_thumbnail_cache():
+    """Process-wide item image thumbnails, built once at startup"""
+    thumbnails = ThumbnailCache()
+    thumbnails.warm(f"images/{name}" for name in DEFAULT_IMAGES)
+    return thumbnails
+
+@st.cache_resource
+def get_submission_queue():
+    """Process-wide write-behind queue, flushed by its own DatabaseManager in a background thread"""
+    # The worker thread has no page to show errors on: they go to the log
+    db = DatabaseManager(DB_CONFIG, get_connection_pool(), get_user_id_cache(), get_dimension_cache(),
+                         report=logger.error)
+    return SubmissionQueue(lambda submission: save_submission(db, submission), fallback=get_offline_journal())
+
+@st.cache_resource
+def get_offline_journal():
+    """Process-wide fallback of the submission queue when its file cannot be written"""
+    return OfflineJournal()
+
+INSERT_QUESTION_RESULTS = """
+    INSERT INTO question_results
+    (evaluation_id, question_number, question_id, question_type, is_correct,
+     answer_json, answer_code, correct_answer, score_points)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
 class DatabaseManager:
-    def __init__(self, config):
+    def __init__(self, config, pool=None, user_ids=None, dimension_ids=None, report=None):
         self.config = config
+        # Where database errors are shown: the page by default, a log outside a Streamlit run
+        self.report = report if report is not None else st.error
+        self.pool = pool if pool is not None else open_pool(config)
+        self.user_ids = user_ids if user_ids is not None else {}
+        self.dimension_ids = dimension_ids if dimension_ids is not None else {}
         self.connection = None
+        # Error of the last failed connect(), None once the server answers again
+        self.connect_error = None
     
     def connect(self):
-        """Establish database connection"""
+        """Check out a database connection from the pool"""
         try:
-            self.connection = mysql.connector.connect(**self.config)
+            self.connection = self.pool.get_connection()
+            self.connect_error = None
             return True
         except mysql.connector.Error as err:
-            st.error(f"Erreur de connexion à la base de données: {err}")
+            self.connect_error = err
+            self.report(f"Erreur de connexion à la base de données: {err}")
             return False
     
     def disconnect(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """Return the database connection to the pool"""
+        if self.connection is not None:
+            self.pool.release(self.connection)
+            self.connection = None
     
     def create_tables(self):
         """Create necessary tables if they don't exist"""
@@ -62,7 +136,28 @@ class DatabaseManager:
             username VARCHAR(255) NOT NULL,
             first_evaluation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             total_evaluations INT DEFAULT 0,
-            INDEX idx_username (username)
+            UNIQUE KEY unique_username (username)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+        
+        # Dimension tables synced from questions.json: the fact tables only carry their integer keys
+        create_items_table = """
+        CREATE TABLE IF NOT EXISTS items (
+            item_id SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            item_name VARCHAR(500) NOT NULL,
+            UNIQUE KEY unique_item_name (item_name)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+        
+        create_questions_table = """
+        CREATE TABLE IF NOT EXISTS questions (
+            question_id INT AUTO_INCREMENT PRIMARY KEY,
+            item_id SMALLINT UNSIGNED NOT NULL,
+            question_hash CHAR(16) NOT NULL,
+            question_text TEXT NOT NULL,
+            question_type VARCHAR(50) NOT NULL,
+            FOREIGN KEY (item_id) REFERENCES items(item_id),
+            UNIQUE KEY unique_item_question (item_id, question_hash)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
         """
         
@@ -71,15 +166,20 @@ class DatabaseManager:
         CREATE TABLE IF NOT EXISTS evaluations (
             evaluation_id INT AUTO_INCREMENT PRIMARY KEY,
             user_id INT NOT NULL,
-            item_name VARCHAR(500) NOT NULL,
+            item_id SMALLINT UNSIGNED NOT NULL,
             total_questions INT NOT NULL,
             correct_answers INT NOT NULL,
             score_percentage DECIMAL(5,2) NOT NULL,
             evaluation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             duration_minutes INT DEFAULT 0,
+            bank_version VARCHAR(16) NULL,
+            submission_id CHAR(36) NULL,
             FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-            INDEX idx_user_item (user_id, item_name),
-            INDEX idx_evaluation_date (evaluation_date)
+            FOREIGN KEY (item_id) REFERENCES items(item_id),
+            INDEX idx_user_item_date (user_id, item_id, evaluation_date, score_percentage),
+            INDEX idx_item_user_score (item_id, user_id, score_percentage),
+            INDEX idx_evaluation_date (evaluation_date),
+            UNIQUE KEY uq_submission (submission_id)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
         """
         
@@ -88,15 +188,19 @@ class DatabaseManager:
         CREATE TABLE IF NOT EXISTS question_results (
             result_id INT AUTO_INCREMENT PRIMARY KEY,
             evaluation_id INT NOT NULL,
+            question_id INT NOT NULL,
             question_number INT NOT NULL,
-            question_text TEXT NOT NULL,
             question_type VARCHAR(50) NOT NULL,
             is_correct BOOLEAN NOT NULL,
             user_answer TEXT,
+            answer_json JSON NULL,
+            answer_code SMALLINT NULL,
             correct_answer TEXT,
             score_points DECIMAL(3,2) NOT NULL,
             FOREIGN KEY (evaluation_id) REFERENCES evaluations(evaluation_id) ON DELETE CASCADE,
-            INDEX idx_evaluation_question (evaluation_id, question_number),
+            FOREIGN KEY (question_id) REFERENCES questions(question_id),
+            INDEX idx_evaluation_answers (evaluation_id, question_id, is_correct),
+            INDEX idx_question (question_id, is_correct),
             INDEX idx_question_type (question_type)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
         """
@@ -107,6 +211,7 @@ class DatabaseManager:
             stat_id INT AUTO_INCREMENT PRIMARY KEY,
             item_name VARCHAR(500) NOT NULL,
             total_attempts INT DEFAULT 0,
+            score_sum DECIMAL(14,2) DEFAULT 0,
             average_score DECIMAL(5,2) DEFAULT 0,
             total_correct_answers INT DEFAULT 0,
             total_questions_attempted INT DEFAULT 0,
@@ -115,57 +220,361 @@ class DatabaseManager:
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
         """
         
+        # Per-question counters for item analysis: difficulty and point-biserial discrimination
+        # are derived from these additive sums, see dashboard.py
+        create_question_stats_table = """
+        CREATE TABLE IF NOT EXISTS question_statistics (
+            question_id INT NOT NULL PRIMARY KEY,
+            attempts INT DEFAULT 0,
+            correct INT DEFAULT 0,
+            score_sum DOUBLE DEFAULT 0,
+            total_sum DOUBLE DEFAULT 0,
+            total_sq_sum DOUBLE DEFAULT 0,
+            correct_total_sum DOUBLE DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+        
+        # How often each option of a choice question was picked, for distractor analysis
+        create_option_selections_table = """
+        CREATE TABLE IF NOT EXISTS option_selections (
+            question_id INT NOT NULL,
+            option_number SMALLINT NOT NULL,
+            selections INT DEFAULT 0,
+            PRIMARY KEY (question_id, option_number)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+        
+        # Latest evaluation of each user on each item, maintained on save for the "Dernier Score" charts
+        create_latest_evaluations_table = """
+        CREATE TABLE IF NOT EXISTS latest_evaluations (
+            user_id INT NOT NULL,
+            item_id SMALLINT UNSIGNED NOT NULL,
+            evaluation_id INT NOT NULL,
+            score_percentage DECIMAL(5,2) NOT NULL,
+            evaluation_date TIMESTAMP NOT NULL,
+            PRIMARY KEY (user_id, item_id),
+            INDEX idx_item_score (item_id, score_percentage)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+        
+        # Daily rollups read by the dashboards instead of the raw fact tables
+        create_daily_user_item_table = """
+        CREATE TABLE IF NOT EXISTS daily_user_item_scores (
+            day DATE NOT NULL,
+            user_id INT NOT NULL,
+            item_id SMALLINT UNSIGNED NOT NULL,
+            attempts INT DEFAULT 0,
+            score_sum DECIMAL(14,2) DEFAULT 0,
+            correct_answers INT DEFAULT 0,
+            questions_attempted INT DEFAULT 0,
+            PRIMARY KEY (user_id, item_id, day),
+            INDEX idx_item_day (item_id, day)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+        
+        create_daily_question_table = """
+        CREATE TABLE IF NOT EXISTS daily_question_scores (
+            day DATE NOT NULL,
+            question_id INT NOT NULL,
+            attempts INT DEFAULT 0,
+            correct INT DEFAULT 0,
+            score_sum DOUBLE DEFAULT 0,
+            PRIMARY KEY (question_id, day),
+            INDEX idx_day (day)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+        
         try:
             cursor.execute(create_users_table)
+            
+            # Older users tables allowed duplicate usernames: merge them before adding the unique key
+            if not self.index_exists(cursor, 'users', 'unique_username'):
+                self.merge_duplicate_users(cursor)
+                cursor.execute("ALTER TABLE users ADD UNIQUE KEY unique_username (username)")
+                if self.index_exists(cursor, 'users', 'idx_username'):
+                    cursor.execute("ALTER TABLE users DROP INDEX idx_username")
+            
+            cursor.execute(create_items_table)
+            cursor.execute(create_questions_table)
             cursor.execute(create_evaluations_table)
+            self.add_missing_column(cursor, 'evaluations', 'bank_version', 'VARCHAR(16) NULL AFTER duration_minutes')
+            # Idempotency key of queued submissions, NULL for rows saved before the queue existed
+            if self.add_missing_column(cursor, 'evaluations', 'submission_id', 'CHAR(36) NULL AFTER bank_version'):
+                cursor.execute("ALTER TABLE evaluations ADD UNIQUE KEY uq_submission (submission_id)")
             cursor.execute(create_question_results_table)
+            # Fact tables from before the dimension tables repeated the item name and question text
+            self.migrate_to_dimension_keys(cursor)
+            # Covering indexes for the dashboard queries replace the narrower ones they extend
+            self.replace_index(cursor, 'evaluations', 'idx_user_item', 'idx_user_item_date',
+                               '(user_id, item_id, evaluation_date, score_percentage)')
+            self.replace_index(cursor, 'evaluations', 'idx_item_date', 'idx_item_user_score',
+                               '(item_id, user_id, score_percentage)')
+            self.replace_index(cursor, 'question_results', 'idx_evaluation_question', 'idx_evaluation_answers',
+                               '(evaluation_id, question_id, is_correct)')
+            # Rows saved before answers were structured only have the repr text in user_answer,
+            # see backfill_answer_json
+            self.add_missing_column(cursor, 'question_results', 'answer_json', 'JSON NULL AFTER user_answer')
+            self.add_missing_column(cursor, 'question_results', 'answer_code', 'SMALLINT NULL AFTER answer_json')
             cursor.execute(create_item_stats_table)
+            
+            # Tables created before the running sum existed are rebuilt once from evaluations
+            if self.add_missing_column(cursor, 'item_statistics', 'score_sum', 'DECIMAL(14,2) DEFAULT 0 AFTER total_attempts'):
+                self.rebuild_item_statistics_rows(cursor)
+            
+            # Derived tables keyed by item name or question hash are dropped and rebuilt by id
+            if self.column_exists(cursor, 'question_statistics', 'question_hash'):
+                cursor.execute("DROP TABLE question_statistics, option_selections")
+            if self.column_exists(cursor, 'daily_user_item_scores', 'item_name'):
+                cursor.execute("DROP TABLE daily_user_item_scores, daily_question_scores")
+            
+            # Analytics tables added to an existing database are filled once from history
+            analytics_missing = not self.table_exists(cursor, 'question_statistics')
+            cursor.execute(create_question_stats_table)
+            cursor.execute(create_option_selections_table)
+            if analytics_missing:
+                self.rebuild_question_analytics_rows(cursor)
+            
+            latest_missing = not self.table_exists(cursor, 'latest_evaluations')
+            cursor.execute(create_latest_evaluations_table)
+            if latest_missing:
+                self.rebuild_latest_evaluations_rows(cursor)
+            
+            rollups_missing = not self.table_exists(cursor, 'daily_user_item_scores')
+            cursor.execute(create_daily_user_item_table)
+            cursor.execute(create_daily_question_table)
+            if rollups_missing:
+                self.rebuild_daily_rollups_rows(cursor)
+            
             self.connection.commit()
             cursor.close()
             self.disconnect()
             return True
         except mysql.connector.Error as err:
-            st.error(f"Erreur lors de la création des tables: {err}")
+            self.report(f"Erreur lors de la création des tables: {err}")
             cursor.close()
             self.disconnect()
             return False
     
+    def add_missing_column(self, cursor, table, column, definition):
+        """Add a column to an existing table, returns True if it had to be added"""
+        if self.column_exists(cursor, table, column):
+            return False
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    
+    def column_exists(self, cursor, table, column):
+        """Check whether a table has a column"""
+        if self.pool.backend == 'sqlite':
+            cursor.execute("SELECT COUNT(*) FROM pragma_table_info(%s) WHERE name = %s", (table, column))
+            return cursor.fetchone()[0] > 0
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (table, column))
+        return cursor.fetchone()[0] > 0
+    
+    def migrate_to_dimension_keys(self, cursor):
+        """Replace evaluations.item_name and question_results.question_text by dimension keys"""
+        if self.column_exists(cursor, 'evaluations', 'item_name'):
+            self.add_missing_column(cursor, 'evaluations', 'item_id', 'SMALLINT UNSIGNED NULL AFTER user_id')
+            cursor.execute("INSERT IGNORE INTO items (item_name) SELECT DISTINCT item_name FROM evaluations")
+            cursor.execute("""
+                UPDATE evaluations e
+                JOIN items i ON e.item_name = i.item_name
+                SET e.item_id = i.item_id
+            """)
+            cursor.execute("""
+                ALTER TABLE evaluations
+                    MODIFY item_id SMALLINT UNSIGNED NOT NULL,
+                    ADD FOREIGN KEY (item_id) REFERENCES items(item_id),
+                    DROP INDEX idx_user_item,
+                    ADD INDEX idx_user_item (user_id, item_id),
+                    ADD INDEX idx_item_date (item_id, evaluation_date),
+                    DROP COLUMN item_name
+            """)
+        
+        if self.column_exists(cursor, 'question_results', 'question_text'):
+            self.add_missing_column(cursor, 'question_results', 'question_id', 'INT NULL AFTER evaluation_id')
+            # Same hash as question_bank.question_hash, so questions synced later match these rows
+            cursor.execute("""
+                INSERT IGNORE INTO questions (item_id, question_hash, question_text, question_type)
+                SELECT e.item_id, LEFT(SHA1(qr.question_text), 16), MIN(qr.question_text), MIN(qr.question_type)
+                FROM question_results qr
+                JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
+                GROUP BY e.item_id, LEFT(SHA1(qr.question_text), 16)
+            """)
+            cursor.execute("""
+                UPDATE question_results qr
+                JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
+                JOIN questions q ON q.item_id = e.item_id AND q.question_hash = LEFT(SHA1(qr.question_text), 16)
+                SET qr.question_id = q.question_id
+            """)
+            cursor.execute("""
+                ALTER TABLE question_results
+                    MODIFY question_id INT NOT NULL,
+                    ADD FOREIGN KEY (question_id) REFERENCES questions(question_id),
+                    ADD INDEX idx_question (question_id, is_correct),
+                    DROP COLUMN question_text
+            """)
+    
+    def table_exists(self, cursor, table):
+        """Check whether a table exists in the current database"""
+        if self.pool.backend == 'sqlite':
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+            return cursor.fetchone()[0] > 0
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+        return cursor.fetchone()[0] > 0
+    
+    def index_exists(self, cursor, table, index):
+        """Check whether an index exists on a table"""
+        if self.pool.backend == 'sqlite':
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                           (table, index))
+            return cursor.fetchone()[0] > 0
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """, (table, index))
+        return cursor.fetchone()[0] > 0
+    
+    def replace_index(self, cursor, table, old_index, new_index, columns):
+        """Add new_index and drop old_index in one ALTER, so foreign keys always keep an index"""
+        if self.index_exists(cursor, table, new_index):
+            return
+        drop_old = f", DROP INDEX {old_index}" if self.index_exists(cursor, table, old_index) else ""
+        cursor.execute(f"ALTER TABLE {table} ADD INDEX {new_index} {columns}{drop_old}")
+    
+    def merge_duplicate_users(self, cursor):
+        """Fold users sharing a username into the oldest user_id"""
+        duplicates = """
+            SELECT username, MIN(user_id) AS keep_id, SUM(total_evaluations) AS total,
+                   MIN(first_evaluation_date) AS first_date
+            FROM users GROUP BY username HAVING COUNT(*) > 1
+        """
+        cursor.execute(f"""
+            UPDATE evaluations e
+            JOIN users u ON e.user_id = u.user_id
+            JOIN ({duplicates}) d ON u.username = d.username
+            SET e.user_id = d.keep_id
+            WHERE u.user_id <> d.keep_id
+        """)
+        cursor.execute(f"""
+            UPDATE users u
+            JOIN ({duplicates}) d ON u.user_id = d.keep_id
+            SET u.total_evaluations = d.total, u.first_evaluation_date = d.first_date
+        """)
+        cursor.execute(f"""
+            DELETE u FROM users u
+            JOIN ({duplicates}) d ON u.username = d.username
+            WHERE u.user_id <> d.keep_id
+        """)
+    
     def get_or_create_user(self, username):
-        """Get user ID or create new user"""
+        """Get user ID or create new user, cached for the life of the process"""
+        user_id = self.user_ids.get(username)
+        if user_id is not None:
+            return user_id
+        
         if not self.connect():
             return None
         
         cursor = self.connection.cursor()
         
-        # Check if user exists
-        cursor.execute("SELECT user_id, total_evaluations FROM users WHERE username = %s", (username,))
-        result = cursor.fetchone()
-        
-        if result:
-            user_id, total_evals = result
-            # Update total evaluations count
-            cursor.execute("UPDATE users SET total_evaluations = %s WHERE user_id = %s", 
-                         (total_evals + 1, user_id))
-            self.connection.commit()
-        else:
-            # Create new user
-            cursor.execute("INSERT INTO users (username, total_evaluations) VALUES (%s, %s)", 
-                         (username, 1))
+        try:
+            # LAST_INSERT_ID(user_id) makes lastrowid return the existing id on a duplicate
+            cursor.execute("""
+                INSERT INTO users (username, total_evaluations) VALUES (%s, 0)
+                ON DUPLICATE KEY UPDATE user_id = LAST_INSERT_ID(user_id)
+            """, (username,))
             self.connection.commit()
             user_id = cursor.lastrowid
+        except mysql.connector.Error as err:
+            self.report(f"Erreur lors de la création de l'utilisateur: {err}")
+            return None
+        finally:
+            cursor.close()
+            self.disconnect()
         
-        cursor.close()
-        self.disconnect()
+        self.user_ids[username] = user_id
         return user_id
     
-    def save_evaluation_results(self, user_id, item_name, questions_data, user_answers, results):
-        """Save complete evaluation results to database"""
+    def sync_item_rows(self, cursor, item_name, questions_data):
+        """Upsert one item and its questions into the dimension tables, returns their keys"""
+        cursor.execute("""
+            INSERT INTO items (item_name) VALUES (%s)
+            ON DUPLICATE KEY UPDATE item_id = LAST_INSERT_ID(item_id)
+        """, (item_name,))
+        item_id = cursor.lastrowid
+        cursor.executemany("""
+            INSERT INTO questions (item_id, question_hash, question_text, question_type)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE question_text = VALUES(question_text), question_type = VALUES(question_type)
+        """, [(item_id, question_hash(q['question']), q['question'], q['type']) for q in questions_data])
+        cursor.execute("SELECT question_hash, question_id FROM questions WHERE item_id = %s", (item_id,))
+        return item_id, dict(cursor.fetchall())
+    
+    def sync_question_bank(self, bank):
+        """Make the items and questions tables match a loaded question bank"""
+        if not self.connect():
+            return False
+        
+        cursor = self.connection.cursor()
+        
+        try:
+            synced = {item['item']: self.sync_item_rows(cursor, item['item'], item['questions'])
+                      for item in bank.items}
+            self.connection.commit()
+            self.dimension_ids.update(synced)
+            return True
+        except mysql.connector.Error as err:
+            self.report(f"Erreur lors de la synchronisation des questions: {err}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+            self.disconnect()
+    
+    def dimension_keys(self, cursor, item_name, questions_data):
+        """item_id and the question_id of each question, synced on first use"""
+        hashes = [question_hash(q['question']) for q in questions_data]
+        keys = self.dimension_ids.get(item_name)
+        if keys is None or not all(h in keys[1] for h in hashes):
+            # Dimension rows are idempotent, so they are committed ahead of the evaluation
+            keys = self.sync_item_rows(cursor, item_name, questions_data)
+            self.connection.commit()
+            self.dimension_ids[item_name] = keys
+        item_id, question_ids = keys
+        return item_id, [question_ids[h] for h in hashes]
+    
+    def save_evaluation_results(self, user_id, item_name, questions_data, user_answers, results, bank_version=None,
+                                submission_id=None, submitted_at=None):
+        """Save complete evaluation results to database
+
+        With a submission_id the save is idempotent: a submission already stored is
+        reported as saved. submitted_at dates an evaluation saved after the fact.
+        """
         if not self.connect():
             return False
         
         cursor = self.connection.cursor()
         
         try:
+            item_id, question_ids = self.dimension_keys(cursor, item_name, questions_data)
+            
+            # Count the evaluation on the user in the same transaction as its results
+            cursor.execute("UPDATE users SET total_evaluations = total_evaluations + 1 WHERE user_id = %s",
+                           (user_id,))
+            if cursor.rowcount == 0:
+                # The cached user was deleted since it was looked up
+                for username, cached_id in list(self.user_ids.items()):
+                    if cached_id == user_id:
+                        del self.user_ids[username]
+                raise mysql.connector.errors.IntegrityError(f"Utilisateur {user_id} introuvable")
+            
             # Calculate overall statistics
             total_questions = len(questions_data)
             correct_count = sum(1 for r in results if r['correct'])
@@ -174,27 +583,27 @@ class DatabaseManager:
             
             # Insert evaluation record
             cursor.execute("""
-                INSERT INTO evaluations (user_id, item_name, total_questions, correct_answers, score_percentage)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (user_id, item_name, total_questions, correct_count, score_percentage))
+                INSERT INTO evaluations
+                (user_id, item_id, total_questions, correct_answers, score_percentage, bank_version,
+                 submission_id, evaluation_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, COALESCE(%s, CURRENT_TIMESTAMP))
+            """, (user_id, item_id, total_questions, correct_count, score_percentage, bank_version,
+                  submission_id, submitted_at))
             
             evaluation_id = cursor.lastrowid
+            self.update_latest_evaluation(cursor, evaluation_id)
             
-            # Insert detailed question results
-            for i, (question_data, result) in enumerate(zip(questions_data, results)):
-                user_answer_str = str(user_answers.get(i, "Non répondu"))
-                correct_answer_str = str(self.get_correct_answer_string(question_data))
-                
-                cursor.execute("""
-                    INSERT INTO question_results 
-                    (evaluation_id, question_number, question_text, question_type, is_correct, 
-                     user_answer, correct_answer, score_points)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (evaluation_id, i + 1, question_data['question'], question_data['type'],
-                     result['correct'], user_answer_str, correct_answer_str, result['score']))
+            # Insert detailed question results in a single multi-row statement,
+            # answers as canonical JSON plus a numeric code for single-choice types
+            cursor.executemany(INSERT_QUESTION_RESULTS,
+                               self.question_result_rows(evaluation_id, question_ids, questions_data,
+                                                         user_answers, results))
             
             # Update item statistics
             self.update_item_statistics(item_name, total_questions, correct_count, score_percentage)
+            self.update_question_analytics(cursor, question_ids, questions_data, user_answers, results, score_percentage)
+            self.update_daily_rollups(cursor, user_id, item_id, question_ids, results,
+                                      score_percentage, correct_count, total_questions, submitted_at)
             
             self.connection.commit()
             cursor.close()
@@ -202,12 +611,180 @@ class DatabaseManager:
             return True
             
         except mysql.connector.Error as err:
-            st.error(f"Erreur lors de la sauvegarde: {err}")
+            if submission_id is not None and err.errno == errorcode.ER_DUP_ENTRY:
+                # Saved by an earlier attempt whose acknowledgement was lost
+                self.connection.rollback()
+                cursor.close()
+                self.disconnect()
+                return True
+            self.report(f"Erreur lors de la sauvegarde: {err}")
             self.connection.rollback()
             cursor.close()
             self.disconnect()
             return False
     
+    def backfill_answer_json(self, chunk_size=50000):
+        """Convert the repr text of legacy user_answer rows into answer_json/answer_code,
+        and recode true_false answers stored with the old Faux = 0 code"""
+        if not self.connect():
+            return None
+        
+        cursor = self.connection.cursor()
+        converted = 0
+        
+        try:
+            cursor.execute("""
+                CREATE TEMPORARY TABLE answer_backfill (
+                    result_id INT PRIMARY KEY,
+                    answer_json JSON NULL,
+                    answer_code SMALLINT NULL
+                ) ENGINE=InnoDB
+            """)
+            
+            last_id = 0
+            while True:
+                cursor.execute("""
+                    SELECT result_id, question_type, user_answer
+                    FROM question_results
+                    WHERE result_id > %s AND answer_json IS NULL AND user_answer IS NOT NULL
+                    ORDER BY result_id
+                    LIMIT %s
+                """, (last_id, chunk_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                
+                converted_rows = []
+                for result_id, question_type, user_answer in rows:
+                    try:
+                        answer_json, answer_code = encode_answer(question_type, parse_stored_answer(user_answer))
+                    except (TypeError, ValueError, AttributeError):
+                        continue
+                    if answer_json is not None:
+                        converted_rows.append((result_id, answer_json, answer_code))
+                
+                if converted_rows:
+                    cursor.executemany(
+                        "INSERT INTO answer_backfill (result_id, answer_json, answer_code) VALUES (%s, %s, %s)",
+                        converted_rows
+                    )
+                    converted += len(converted_rows)
+            
+            cursor.execute("""
+                UPDATE question_results qr
+                JOIN answer_backfill b ON qr.result_id = b.result_id
+                SET qr.answer_json = b.answer_json, qr.answer_code = b.answer_code
+            """)
+            # Faux used to be stored as 0: use its option number like selected_options
+            cursor.execute("""
+                UPDATE question_results SET answer_code = 2
+                WHERE question_type = 'true_false' AND answer_code = 0
+            """)
+            self.connection.commit()
+            return converted
+        except mysql.connector.Error as err:
+            self.report(f"Erreur lors de la conversion des réponses: {err}")
+            self.connection.rollback()
+            return None
+        finally:
+            try:
+                cursor.execute("DROP TEMPORARY TABLE IF EXISTS answer_backfill")
+            except mysql.connector.Error:
+                pass
+            cursor.close()
+            self.disconnect()
+    
+    def question_result_rows(self, evaluation_id, question_ids, questions_data, user_answers, results):
+        """Parameter rows of INSERT_QUESTION_RESULTS for one evaluation"""
+        return [
+            (evaluation_id, i + 1, question_ids[i], question_data['type'],
+             result['correct'], *encode_answer(question_data['type'], user_answers.get(i)),
+             str(self.get_correct_answer_string(question_data)), result['score'])
+            for i, (question_data, result) in enumerate(zip(questions_data, results))
+        ]
+    
+    def bulk_load_submissions(self, submissions):
+        """Insert submission records in one transaction with multi-row statements,
+        skipping those whose submission_id is already saved.
+        
+        Returns the number inserted, None on error. The derived tables are not
+        updated; rebuild them once the whole load is done.
+        """
+        if not self.connect():
+            return None
+        
+        cursor = self.connection.cursor()
+        
+        try:
+            pending = {submission['submission_id']: submission for submission in submissions}
+            cursor.execute(f"""
+                SELECT submission_id FROM evaluations WHERE submission_id IN ({", ".join(["%s"] * len(pending))})
+            """, list(pending))
+            for (submission_id,) in cursor.fetchall():
+                del pending[submission_id]
+            if not pending:
+                return 0
+            
+            # Resolved before the fact rows, as dimension_keys commits the rows it creates
+            keys = {submission_id: self.dimension_keys(cursor, submission['item_name'], submission['questions'])
+                    for submission_id, submission in pending.items()}
+            usernames = sorted({submission['username'] for submission in pending.values()})
+            cursor.executemany("INSERT IGNORE INTO users (username, total_evaluations) VALUES (%s, 0)",
+                               [(username,) for username in usernames])
+            cursor.execute(f"""
+                SELECT username, user_id FROM users WHERE username IN ({", ".join(["%s"] * len(usernames))})
+            """, usernames)
+            user_ids = dict(cursor.fetchall())
+            
+            evaluation_rows = []
+            for submission_id, submission in pending.items():
+                results = submission['results']
+                total_questions = len(submission['questions'])
+                evaluation_rows.append((
+                    user_ids[submission['username']], keys[submission_id][0], total_questions,
+                    sum(1 for r in results if r['correct']),
+                    sum(r['score'] for r in results) / total_questions * 100,
+                    submission['bank_version'], submission_id, submission['submitted_at']
+                ))
+            cursor.executemany("""
+                INSERT INTO evaluations
+                (user_id, item_id, total_questions, correct_answers, score_percentage, bank_version,
+                 submission_id, evaluation_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, COALESCE(%s, CURRENT_TIMESTAMP))
+            """, evaluation_rows)
+            cursor.execute(f"""
+                SELECT submission_id, evaluation_id FROM evaluations
+                WHERE submission_id IN ({", ".join(["%s"] * len(pending))})
+            """, list(pending))
+            evaluation_ids = dict(cursor.fetchall())
+            
+            question_rows = []
+            for submission_id, submission in pending.items():
+                user_answers = {int(i): answer for i, answer in submission['answers'].items()}
+                question_rows.extend(self.question_result_rows(
+                    evaluation_ids[submission_id], keys[submission_id][1], submission['questions'],
+                    user_answers, submission['results']
+                ))
+            cursor.executemany(INSERT_QUESTION_RESULTS, question_rows)
+            
+            attempts = {}
+            for submission in pending.values():
+                user_id = user_ids[submission['username']]
+                attempts[user_id] = attempts.get(user_id, 0) + 1
+            cursor.executemany("UPDATE users SET total_evaluations = total_evaluations + %s WHERE user_id = %s",
+                               [(count, user_id) for user_id, count in attempts.items()])
+            
+            self.connection.commit()
+            return len(pending)
+        except mysql.connector.Error as err:
+            self.report(f"Erreur lors du chargement des soumissions: {err}")
+            self.connection.rollback()
+            return None
+        finally:
+            cursor.close()
+            self.disconnect()
+    
     def get_correct_answer_string(self, question_data):
         """Get correct answer as string for storage"""
         q_type = question_data['type']
@@ -226,67 +803,332 @@ class DatabaseManager:
             return "N/A"
     
     def update_item_statistics(self, item_name, total_questions, correct_count, score_percentage):
-        """Update aggregated statistics for an item"""
+        """Update aggregated statistics for an item with a running sum and count"""
+        cursor = self.connection.cursor()
+        
+        # average_score is assigned first, from the old sum and count: MySQL applies the assignments
+        # left to right while SQLite evaluates them all on the old row, this reads the same on both
+        cursor.execute("""
+            INSERT INTO item_statistics 
+            (item_name, total_attempts, score_sum, average_score, total_correct_answers, total_questions_attempted)
+            VALUES (%s, 1, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                average_score = (score_sum + VALUES(score_sum)) / (total_attempts + 1),
+                total_attempts = total_attempts + 1,
+                score_sum = score_sum + VALUES(score_sum),
+                total_correct_answers = total_correct_answers + VALUES(total_correct_answers),
+                total_questions_attempted = total_questions_attempted + VALUES(total_questions_attempted)
+        """, (item_name, score_percentage, score_percentage, correct_count, total_questions))
+        
+        cursor.close()
+    
+    def rebuild_item_statistics_rows(self, cursor):
+        """Recompute every item_statistics row from evaluations in one pass"""
+        cursor.execute("DELETE FROM item_statistics")
+        cursor.execute("""
+            INSERT INTO item_statistics 
+            (item_name, total_attempts, score_sum, average_score, total_correct_answers, total_questions_attempted)
+            SELECT i.item_name, COUNT(*), SUM(e.score_percentage), AVG(e.score_percentage),
+                   SUM(e.correct_answers), SUM(e.total_questions)
+            FROM evaluations e
+            JOIN items i ON e.item_id = i.item_id
+            GROUP BY i.item_id
+        """)
+    
+    def update_latest_evaluation(self, cursor, evaluation_id):
+        """Make an evaluation the latest of its user and item unless a later one is already recorded"""
+        # "Later" is (evaluation_date, evaluation_id), so equal timestamps are still ordered.
+        # Assignments run left to right: evaluation_id changes before evaluation_date is compared
+        # again, which keeps the condition true for the date exactly when the row was newer.
+        # SQLite evaluates every assignment on the old row, which gives the same result.
+        cursor.execute("""
+            INSERT INTO latest_evaluations (user_id, item_id, evaluation_id, score_percentage, evaluation_date)
+            SELECT user_id, item_id, evaluation_id, score_percentage, evaluation_date
+            FROM evaluations WHERE evaluation_id = %s
+            ON DUPLICATE KEY UPDATE
+                score_percentage = IF((VALUES(evaluation_date), VALUES(evaluation_id)) > (evaluation_date, evaluation_id),
+                                      VALUES(score_percentage), score_percentage),
+                evaluation_id = IF((VALUES(evaluation_date), VALUES(evaluation_id)) > (evaluation_date, evaluation_id),
+                                   VALUES(evaluation_id), evaluation_id),
+                evaluation_date = IF((VALUES(evaluation_date), VALUES(evaluation_id)) > (evaluation_date, evaluation_id),
+                                     VALUES(evaluation_date), evaluation_date)
+        """, (evaluation_id,))
+    
+    def rebuild_latest_evaluations_rows(self, cursor):
+        """Recompute latest_evaluations from evaluations"""
+        cursor.execute("DELETE FROM latest_evaluations")
+        cursor.execute("""
+            INSERT INTO latest_evaluations (user_id, item_id, evaluation_id, score_percentage, evaluation_date)
+            SELECT user_id, item_id, evaluation_id, score_percentage, evaluation_date
+            FROM (
+                SELECT user_id, item_id, evaluation_id, score_percentage, evaluation_date,
+                       ROW_NUMBER() OVER (PARTITION BY user_id, item_id
+                                          ORDER BY evaluation_date DESC, evaluation_id DESC) AS position
+                FROM evaluations
+            ) ranked
+            WHERE position = 1
+        """)
+    
+    def rebuild_latest_evaluations(self):
+        """Rebuild the latest_evaluations table from evaluations"""
+        if not self.connect():
+            return False
+        
         cursor = self.connection.cursor()
         
-        # Check if item statistics exist
-        cursor.execute("SELECT * FROM item_statistics WHERE item_name = %s", (item_name,))
-        result = cursor.fetchone()
+        try:
+            self.rebuild_latest_evaluations_rows(cursor)
+            self.connection.commit()
+            return True
+        except mysql.connector.Error as err:
+            self.report(f"Erreur lors de la reconstruction des dernières évaluations: {err}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+            self.disconnect()
+    
+    def update_question_analytics(self, cursor, question_ids, questions_data, user_answers, results, score_percentage):
+        """Add one attempt to question_statistics and option_selections"""
+        stats_rows = []
+        option_rows = []
+        for i, (question_data, result) in enumerate(zip(questions_data, results)):
+            correct = 1 if result['correct'] else 0
+            stats_rows.append((question_ids[i], correct, result['score'],
+                               score_percentage, score_percentage * score_percentage, correct * score_percentage))
+            for option_number in selected_options(question_data['type'], user_answers.get(i)):
+                option_rows.append((question_ids[i], option_number))
+        
+        cursor.executemany("""
+            INSERT INTO question_statistics 
+            (question_id, attempts, correct, score_sum, total_sum, total_sq_sum, correct_total_sum)
+            VALUES (%s, 1, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                attempts = attempts + 1,
+                correct = correct + VALUES(correct),
+                score_sum = score_sum + VALUES(score_sum),
+                total_sum = total_sum + VALUES(total_sum),
+                total_sq_sum = total_sq_sum + VALUES(total_sq_sum),
+                correct_total_sum = correct_total_sum + VALUES(correct_total_sum)
+        """, stats_rows)
+        if option_rows:
+            cursor.executemany("""
+                INSERT INTO option_selections (question_id, option_number, selections)
+                VALUES (%s, %s, 1)
+                ON DUPLICATE KEY UPDATE selections = selections + 1
+            """, option_rows)
+    
+    def rebuild_question_statistics_rows(self, cursor):
+        """Recompute question_statistics from question_results and evaluations"""
+        cursor.execute("DELETE FROM question_statistics")
+        cursor.execute("""
+            INSERT INTO question_statistics 
+            (question_id, attempts, correct, score_sum, total_sum, total_sq_sum, correct_total_sum)
+            SELECT qr.question_id, COUNT(*), SUM(qr.is_correct), SUM(qr.score_points),
+                   SUM(e.score_percentage), SUM(e.score_percentage * e.score_percentage),
+                   SUM(qr.is_correct * e.score_percentage)
+            FROM question_results qr
+            JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
+            GROUP BY qr.question_id
+        """)
+    
+    def rebuild_question_analytics_rows(self, cursor, chunk_size=50000):
+        """Recompute question_statistics and option_selections from the full history"""
+        self.rebuild_question_statistics_rows(cursor)
         
-        if result:
-            # Update existing statistics
+        # Selections live inside the stored answers, so they are counted in Python chunk by chunk
+        counts = {}
+        last_id = 0
+        while True:
             cursor.execute("""
-                UPDATE item_statistics 
-                SET total_attempts = total_attempts + 1,
-                    total_correct_answers = total_correct_answers + %s,
-                    total_questions_attempted = total_questions_attempted + %s,
-                    average_score = (
-                        SELECT AVG(score_percentage) 
-                        FROM evaluations 
-                        WHERE item_name = %s
-                    )
-                WHERE item_name = %s
-            """, (correct_count, total_questions, item_name, item_name))
-        else:
-            # Create new item statistics
+                SELECT result_id, question_id, question_type, COALESCE(answer_json, user_answer)
+                FROM question_results
+                WHERE result_id > %s AND question_type IN ('multiple_choice', 'multiple_select', 'true_false')
+                ORDER BY result_id
+                LIMIT %s
+            """, (last_id, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            for _, question_id, question_type, answer in rows:
+                try:
+                    options = selected_options(question_type, parse_stored_answer(answer))
+                except (TypeError, ValueError):
+                    continue
+                for option_number in options:
+                    key = (question_id, option_number)
+                    counts[key] = counts.get(key, 0) + 1
+        
+        cursor.execute("DELETE FROM option_selections")
+        if counts:
+            cursor.executemany("""
+                INSERT INTO option_selections (question_id, option_number, selections)
+                VALUES (%s, %s, %s)
+            """, [key + (count,) for key, count in counts.items()])
+    
+    def update_daily_rollups(self, cursor, user_id, item_id, question_ids, results,
+                             score_percentage, correct_count, total_questions, evaluation_date=None):
+        """Add one evaluation to the rows of its day (today by default) in the daily rollup tables"""
+        cursor.execute("""
+            INSERT INTO daily_user_item_scores 
+            (day, user_id, item_id, attempts, score_sum, correct_answers, questions_attempted)
+            VALUES (COALESCE(DATE(%s), CURRENT_DATE()), %s, %s, 1, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                attempts = attempts + 1,
+                score_sum = score_sum + VALUES(score_sum),
+                correct_answers = correct_answers + VALUES(correct_answers),
+                questions_attempted = questions_attempted + VALUES(questions_attempted)
+        """, (evaluation_date, user_id, item_id, score_percentage, correct_count, total_questions))
+        
+        cursor.executemany("""
+            INSERT INTO daily_question_scores (day, question_id, attempts, correct, score_sum)
+            VALUES (COALESCE(DATE(%s), CURRENT_DATE()), %s, 1, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                attempts = attempts + 1,
+                correct = correct + VALUES(correct),
+                score_sum = score_sum + VALUES(score_sum)
+        """, [
+            (evaluation_date, question_id, 1 if result['correct'] else 0, result['score'])
+            for question_id, result in zip(question_ids, results)
+        ])
+    
+    def rebuild_daily_rollups_rows(self, cursor):
+        """Recompute both daily rollup tables from evaluations and question_results"""
+        cursor.execute("DELETE FROM daily_user_item_scores")
+        cursor.execute("""
+            INSERT INTO daily_user_item_scores 
+            (day, user_id, item_id, attempts, score_sum, correct_answers, questions_attempted)
+            SELECT DATE(evaluation_date), user_id, item_id, COUNT(*), SUM(score_percentage),
+                   SUM(correct_answers), SUM(total_questions)
+            FROM evaluations
+            GROUP BY DATE(evaluation_date), user_id, item_id
+        """)
+        cursor.execute("DELETE FROM daily_question_scores")
+        cursor.execute("""
+            INSERT INTO daily_question_scores (day, question_id, attempts, correct, score_sum)
+            SELECT DATE(e.evaluation_date), qr.question_id, COUNT(*), SUM(qr.is_correct), SUM(qr.score_points)
+            FROM question_results qr
+            JOIN evaluations e ON qr.evaluation_id = e.evaluation_id
+            GROUP BY DATE(e.evaluation_date), qr.question_id
+        """)
+    
+    def rebuild_daily_rollups(self):
+        """Rebuild the daily rollup tables from the fact tables"""
+        if not self.connect():
+            return False
+        
+        cursor = self.connection.cursor()
+        
+        try:
+            self.rebuild_daily_rollups_rows(cursor)
+            self.connection.commit()
+            return True
+        except mysql.connector.Error as err:
+            self.report(f"Erreur lors de la reconstruction des agrégats: {err}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+            self.disconnect()
+    
+    def rebuild_question_analytics(self):
+        """Rebuild the item analysis tables from question_results"""
+        if not self.connect():
+            return False
+        
+        cursor = self.connection.cursor()
+        
+        try:
+            self.rebuild_question_analytics_rows(cursor)
+            self.connection.commit()
+            return True
+        except mysql.connector.Error as err:
+            self.report(f"Erreur lors de la reconstruction des analyses: {err}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+            self.disconnect()
+    
+    def rebuild_item_statistics(self):
+        """Rebuild the item_statistics table from evaluations"""
+        if not self.connect():
+            return False
+        
+        cursor = self.connection.cursor()
+        
+        try:
+            self.rebuild_item_statistics_rows(cursor)
+            self.connection.commit()
+            return True
+        except mysql.connector.Error as err:
+            self.report(f"Erreur lors de la reconstruction des statistiques: {err}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+            self.disconnect()
+    
+    def item_statistics_drift(self):
+        """Compare item_statistics with evaluations, returns the items that disagree"""
+        if not self.connect():
+            return None
+        
+        cursor = self.connection.cursor(dictionary=True)
+        
+        try:
             cursor.execute("""
-                INSERT INTO item_statistics 
-                (item_name, total_attempts, average_score, total_correct_answers, total_questions_attempted)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (item_name, 1, score_percentage, correct_count, total_questions))
+                SELECT i.item_name, COUNT(*) AS total_attempts, SUM(e.score_percentage) AS score_sum,
+                       SUM(e.correct_answers) AS total_correct_answers,
+                       SUM(e.total_questions) AS total_questions_attempted
+                FROM evaluations e
+                JOIN items i ON e.item_id = i.item_id
+                GROUP BY i.item_id
+            """)
+            expected = {row['item_name']: row for row in cursor.fetchall()}
+            cursor.execute("""
+                SELECT item_name, total_attempts, score_sum, total_correct_answers, total_questions_attempted
+                FROM item_statistics
+            """)
+            stored = {row['item_name']: row for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+            self.disconnect()
         
-        cursor.close()
+        fields = ('total_attempts', 'score_sum', 'total_correct_answers', 'total_questions_attempted')
+        drift = []
+        for item_name in sorted(set(expected) | set(stored)):
+            want = expected.get(item_name, {})
+            have = stored.get(item_name, {})
+            mismatches = {
+                field: (have.get(field, 0), want.get(field, 0))
+                for field in fields
+                if (have.get(field) or 0) != (want.get(field) or 0)
+            }
+            if mismatches:
+                drift.append({'item_name': item_name, 'mismatches': mismatches})
+        return drift
 
 class QuizApp:
     def __init__(self):
-        # Initialize session state variables
-        if 'user_name' not in st.session_state:
-            st.session_state.user_name = ""
-        if 'name_submitted' not in st.session_state:
-            st.session_state.name_submitted = False
-        if 'selected_item' not in st.session_state:
-            st.session_state.selected_item = None
-        if 'current_question' not in st.session_state:
-            st.session_state.current_question = 0
-        if 'user_answers' not in st.session_state:
-            st.session_state.user_answers = {}
-        if 'quiz_completed' not in st.session_state:
-            st.session_state.quiz_completed = False
-        if 'quiz_data' not in st.session_state:
-            st.session_state.quiz_data = SAMPLE_QUIZ_DATA
-        if 'evaluation_results' not in st.session_state:
-            st.session_state.evaluation_results = []
+        # Latest valid question bank, hot-reloaded when questions.json changes.
+        # Sessions only keep the selected item index and the bank version they started with.
+        self.bank = load_question_bank()
+        
+        # Quiz state of this session, in one slotted object (see quiz_session.py)
+        if 'quiz' not in st.session_state:
+            st.session_state.quiz = QuizSession()
+        self.session = st.session_state.quiz
         if 'db_manager' not in st.session_state:
-            st.session_state.db_manager = DatabaseManager(DB_CONFIG)
+            st.session_state.db_manager = DatabaseManager(DB_CONFIG, get_connection_pool(), get_user_id_cache(),
+                                                          get_dimension_cache())
         
         # Initialize database tables
         if 'db_initialized' not in st.session_state:
             st.session_state.db_manager.create_tables()
+            st.session_state.db_manager.sync_question_bank(self.bank)
             st.session_state.db_initialized = True
-        
-        # New: Initialize the list for completed quizzes
-        if 'completed_quizzes' not in st.session_state:
-            st.session_state.completed_quizzes = []
 
     def render_name_input(self):
         """Render the name input screen"""
@@ -321,8 +1163,7 @@ class QuizApp:
             
             if st.button("Commencer le Quiz", use_container_width=True, type="primary"):
                 if name:  # The condition now checks if a name has been selected (not None)
-                    st.session_state.user_name = name
-                    st.session_state.name_submitted = True
+                    self.session.user_name = name
                     st.rerun()
                 else:
                     st.error("Veuillez sélectionner votre nom pour continuer.")
@@ -331,20 +1172,18 @@ class QuizApp:
         """Render the item selection screen with images"""
         st.markdown(f"""
         <div style='text-align: center; padding: 1rem;'>
-            <h1 style='color: #1f77b4;'>Bonjour {st.session_state.user_name}! 👋</h1>
+            <h1 style='color: #1f77b4;'>Bonjour {self.session.user_name}! 👋</h1>
             <p style='font-size: 1.1rem; margin-bottom: 2rem;'>Choisissez un domaine d'évaluation :</p>
         </div>
         """, unsafe_allow_html=True)
 
         # Create a grid layout for items
-        quiz_data = st.session_state.quiz_data
+        quiz_data = self.bank.items
+        thumbnails = get_thumbnail_cache()
         
         # Display items in rows of 2 or 3 columns
         items_per_row = 3 if len(quiz_data) > 4 else 2
         
-        # Retrieve the list of completed quizzes from session state
-        completed_quizzes = st.session_state.get('completed_quizzes', [])
-        
         for i in range(0, len(quiz_data), items_per_row):
             cols = st.columns(items_per_row)
             
@@ -354,15 +1193,14 @@ class QuizApp:
                     item = quiz_data[item_index]
                     item_title = item["item"]
                     
-                    # Check if the item is in the list of completed quizzes
-                    is_completed = item_title in completed_quizzes
+                    is_completed = self.session.is_completed(item_title)
 
                     with col:
                         # Path to image inside your "images" folder
                         image_path = f"images/{DEFAULT_IMAGES[item_index % len(DEFAULT_IMAGES)]}"
                         
-                        # Display image with fixed width
-                        st.image(image_path, width=500)
+                        # Resized copy from memory: Streamlit serves it at a URL derived from its content
+                        st.image(thumbnails.get(image_path), width=500)
 
                         st.markdown(f"""
                         <h3 style="text-align:center;">{item_title}</h3>
@@ -379,11 +1217,7 @@ class QuizApp:
                             disabled=is_completed,  # Disable the button if the quiz is completed
                             type=button_type
                         ):
-                            st.session_state.selected_item = item_index
-                            st.session_state.current_question = 0
-                            st.session_state.user_answers = {}
-                            st.session_state.quiz_completed = False
-                            st.session_state.evaluation_results = []
+                            self.session.start(item_index, self.bank.version, len(item["questions"]))
                             st.rerun()
 
         # Add a logout button
@@ -391,10 +1225,7 @@ class QuizApp:
         col1, col2, col3 = st.columns([1, 1, 1])
         with col2:
             if st.button("🚪 Changer d'utilisateur", use_container_width=True):
-                # Reset all session state
-                for key in list(st.session_state.keys()):
-                    if key not in ['db_manager', 'db_initialized']:
-                        del st.session_state[key]
+                self.session.logout()
                 st.rerun()
 
     def render_multiple_choice(self, question_data: Dict, q_id: str) -> Any:
@@ -565,122 +1396,15 @@ class QuizApp:
         
         return answer
 
-    def calculate_score(self, question_data: Dict, user_answer: Any) -> Dict[str, Any]:
-        """Calculate score for a question based on its type and user answer"""
-        q_type = question_data['type']
-        
-        if q_type == 'multiple_choice':
-            correct = question_data['correct_option']
-            is_correct = user_answer == correct
-            return {
-                'correct': is_correct,
-                'score': 1 if is_correct else 0,
-                'feedback': f"Réponse correcte: Option {correct}" if not is_correct else "Correct!"
-            }
-        
-        elif q_type == 'multiple_select':
-            correct_options = set(question_data['correct_options'])
-            user_options = set(user_answer) if user_answer else set()
-            
-            if 'scoring' in question_data:
-                scoring = question_data['scoring']
-                score = 0
-                for option in correct_options:
-                    if option in user_options:
-                        score += scoring.get('correct_selection', 1)
-                    else:
-                        score += scoring.get('missed_selection', -0.5)
-                
-                for option in user_options:
-                    if option not in correct_options:
-                        score += scoring.get('wrong_selection', -1)
-                
-                score = max(0, score)  # Minimum score is 0
-            else:
-                score = 1 if user_options == correct_options else 0
-            
-            return {
-                'correct': user_options == correct_options,
-                'score': score,
-                'feedback': f"Réponses correctes: {sorted(list(correct_options))}"
-            }
-        
-        elif q_type == 'matching':
-            correct_answers = question_data['correct_answers']
-            if not user_answer:
-                return {'correct': False, 'score': 0, 'feedback': 'Aucune réponse fournie'}
-            
-            correct_count = sum(1 for item, cat in user_answer.items() 
-                              if correct_answers.get(item) == cat)
-            total_items = len(correct_answers)
-            score = correct_count / total_items
-            
-            return {
-                'correct': score == 1.0,
-                'score': score,
-                'feedback': f"Correct: {correct_count}/{total_items}"
-            }
-        
-        elif q_type == 'true_false':
-            correct = question_data['correct_answer']
-            is_correct = user_answer == correct
-            feedback = question_data.get('explanation', '')
-            
-            return {
-                'correct': is_correct,
-                'score': 1 if is_correct else 0,
-                'feedback': feedback if feedback else ("Correct!" if is_correct else f"Réponse correcte: {'Vrai' if correct else 'Faux'}")
-            }
-        
-        elif q_type == 'range_input':
-            correct_ranges = question_data['correct_ranges']
-            tolerance = question_data.get('tolerance', 5)
-            
-            if not user_answer:
-                return {'correct': False, 'score': 0, 'feedback': 'Aucune réponse fournie'}
-            
-            correct_count = 0
-            total_materials = len(correct_ranges)
-            
-            for material, correct_range in correct_ranges.items():
-                if material in user_answer:
-                    user_range = user_answer[material]
-                    min_ok = abs(user_range['min'] - correct_range['min']) <= tolerance
-                    max_ok = abs(user_range['max'] - correct_range['max']) <= tolerance
-                    if min_ok and max_ok:
-                        correct_count += 1
-            
-            score = correct_count / total_materials
-            return {
-                'correct': score == 1.0,
-                'score': score,
-                'feedback': f"Ranges corrects: {correct_count}/{total_materials}"
-            }
-        
-        elif q_type == 'calculation':
-            correct_answer = question_data['correct_answer']
-            tolerance_percent = question_data.get('tolerance_percent', 0)
-            
-            if user_answer is None:
-                return {'correct': False, 'score': 0, 'feedback': 'Aucune réponse fournie'}
-            
-            tolerance_value = correct_answer * (tolerance_percent / 100)
-            is_correct = abs(user_answer - correct_answer) <= tolerance_value
-            
-            return {
-                'correct': is_correct,
-                'score': 1 if is_correct else 0,
-                'feedback': f"Réponse correcte: {correct_answer} {question_data.get('unit', '')}"
-            }
-        
-        # Add other question type scoring logic here...
-        
-        return {'correct': False, 'score': 0, 'feedback': 'Type de question non supporté'}
+    def calculate_score(self, spec: GradingSpec, user_answer: Any) -> Dict[str, Any]:
+        """Calculate score for a question from its precompiled grading spec"""
+        return grade(spec, user_answer)
 
     def render_question(self, question_data: Dict, question_index: int) -> Any:
         """Render a question based on its type"""
         q_type = question_data['type']
-        q_id = f"q_{question_index}"
+        # Namespaced by attempt, so a reset needs no walk over st.session_state
+        q_id = self.session.widget_id(question_index)
         
         st.subheader(f"Question {question_index + 1}")
         st.write(question_data['question'])
@@ -707,61 +1431,72 @@ class QuizApp:
             st.error(f"Type de question non supporté: {q_type}")
             return None
 
+    def quiz_bank(self):
+        """Question bank the current quiz was started with"""
+        return get_question_bank(self.session.bank_version) or self.bank
+
+    def queue_submission(self, submission):
+        """Hand a submission to the write-behind queue, or to the offline journal if the queue cannot open"""
+        try:
+            submissions = get_submission_queue()
+        except (sqlite3.Error, OSError):
+            get_offline_journal().append(submission)
+            return
+        submissions.enqueue(submission)
+
     def save_to_database(self, questions, user_answers, results):
-        """Save evaluation results to database"""
+        """Save evaluation results to database, through the write-behind queue when enabled"""
+        bank = self.quiz_bank()
+        item_name = bank.items[self.session.item_index]["item"]
+        submission = make_submission(self.session.user_name, item_name, questions, user_answers, results,
+                                     bank.version)
+        if WRITE_BEHIND:
+            try:
+                # Durable once enqueued: the MySQL save happens in the background and is retried
+                self.queue_submission(submission)
+            except Exception as e:
+                st.error(f"❌ Erreur: {str(e)}")
+            return
+        
+        db = st.session_state.db_manager
         try:
-            # Get or create user
-            user_id = st.session_state.db_manager.get_or_create_user(st.session_state.user_name)
-            
-            if user_id:
-                # Get item name
-                quiz_data = st.session_state.quiz_data
-                selected_item = st.session_state.selected_item
-                item_name = quiz_data[selected_item]["item"]
-                
-                # Save to database
-                success = st.session_state.db_manager.save_evaluation_results(
-                    user_id, item_name, questions, user_answers, results
-                )
-                
-                if success:
-                    st.success("✅ Évaluation sauvegardée avec succès!")
-                else:
-                    st.error("❌ Erreur lors de la sauvegarde")
+            if save_submission(db, submission):
+                st.success("✅ Évaluation sauvegardée avec succès!")
+            elif db.connect_error is not None:
+                # MySQL unreachable: the queue saves it once the server answers again
+                self.queue_submission(submission)
+                st.warning("⚠️ Base de données injoignable, évaluation conservée localement.")
             else:
-                st.error("❌ Erreur lors de la création de l'utilisateur")
-                
+                st.error("❌ Erreur lors de la sauvegarde")
         except Exception as e:
             st.error(f"❌ Erreur: {str(e)}")
 
     def render_quiz(self):
         """Render the quiz for the selected item"""
-        quiz_data = st.session_state.quiz_data
-        selected_item = st.session_state.selected_item
-        current_item = quiz_data[selected_item]
+        # Mid-quiz sessions stay on the version they started with, even after a reload
+        bank = self.quiz_bank()
+        session = self.session
+        selected_item = session.item_index
+        current_item = bank.items[selected_item]
+        specs = bank.specs[selected_item]
         item_title = current_item["item"]
         questions = current_item["questions"]
-        
+        if len(session.answers) != len(questions):
+            # The version the quiz started with was evicted: go on with the latest one
+            session.answers = (session.answers + [None] * len(questions))[:len(questions)]
+
         # Header with item title and back button
         col1, col2 = st.columns([4, 1])
         with col1:
             st.title(f"📚 {item_title}")
-            st.markdown(f"**Étudiant:** {st.session_state.user_name}")
+            st.markdown(f"**Étudiant:** {session.user_name}")
         with col2:
             if st.button("🏠 Menu Principal"):
-                st.session_state.selected_item = None
-                st.session_state.current_question = 0
-                st.session_state.user_answers = {}
-                st.session_state.quiz_completed = False
-                st.session_state.evaluation_results = []
-                # Clear question-specific session state
-                for key in list(st.session_state.keys()):
-                    if key.startswith(('mc_', 'ms_', 'match_', 'tf_', 'range_', 'order_', 'blank_', 'pair_', 'calc_')):
-                        del st.session_state[key]
+                session.leave()
                 st.rerun()
 
-        if not st.session_state.quiz_completed:
-            current_q = st.session_state.current_question
+        if not session.finished:
+            current_q = session.current_question
             
             if current_q < len(questions):
                 question_data = questions[current_q]
@@ -778,47 +1513,40 @@ class QuizApp:
                 
                 with col1:
                     if st.button("⬅️ Précédent", disabled=current_q == 0):
-                        st.session_state.current_question = max(0, current_q - 1)
+                        session.current_question = max(0, current_q - 1)
                         st.rerun()
                 
                 with col2:
                     if current_q == len(questions) - 1:
                         if st.button("✅ Terminer l'Évaluation"):
                             if user_answer is not None:
-                                st.session_state.user_answers[current_q] = user_answer
+                                session.answers[current_q] = user_answer
                                 
                                 # Calculate all results
-                                results = []
-                                for i, q_data in enumerate(questions):
-                                    if i in st.session_state.user_answers:
-                                        user_ans = st.session_state.user_answers[i]
-                                        result = self.calculate_score(q_data, user_ans)
-                                        results.append(result)
-                                
-                                st.session_state.evaluation_results = results
-                                st.session_state.quiz_completed = True
+                                user_answers = session.answered()
+                                results = [self.calculate_score(specs[i], user_ans)
+                                           for i, user_ans in user_answers.items()]
+                                session.finished = True
                                 
                                 # Save to database
-                                self.save_to_database(questions, st.session_state.user_answers, results)
+                                self.save_to_database(questions, user_answers, results)
                                 st.rerun()
                     else:
                         if st.button("Suivant ➡️"):
                             if user_answer is not None:
-                                st.session_state.user_answers[current_q] = user_answer
-                                st.session_state.current_question = current_q + 1
+                                session.answers[current_q] = user_answer
+                                session.current_question = current_q + 1
                                 st.rerun()
                             else:
                                 st.warning("Veuillez répondre à la question avant de continuer.")
         
         # Show completion message (no detailed results)
-        if st.session_state.quiz_completed:
+        if session.finished:
             st.markdown("---")
             st.header("🎉 Évaluation Terminée!")
 
-            # Add the completed item to the session state list
             item_title = current_item["item"]
-            if item_title not in st.session_state.get('completed_quizzes', []):
-                st.session_state.completed_quizzes.append(item_title)
+            session.mark_completed(item_title)
             
             # Show only basic completion info
             total_questions = len(questions)
@@ -826,39 +1554,30 @@ class QuizApp:
             
             # Simple thank you message
             st.success("Merci pour votre participation! Vos réponses ont été enregistrées.")
+            if WRITE_BEHIND:
+                backlog = get_submission_queue().backlog()
+                if backlog['pending']:
+                    st.caption(f"{backlog['pending']} évaluation(s) en attente d'enregistrement dans la base "
+                               f"(la plus ancienne depuis {backlog['oldest_age_seconds']:.0f}s).")
             
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🔄 Refaire cette Évaluation", use_container_width=True):
                     # Reset quiz state but keep item selection
-                    for key in list(st.session_state.keys()):
-                        if key.startswith(('mc_', 'ms_', 'match_', 'tf_', 'range_', 'order_', 'blank_', 'pair_', 'calc_')):
-                            del st.session_state[key]
-                    st.session_state.current_question = 0
-                    st.session_state.user_answers = {}
-                    st.session_state.quiz_completed = False
-                    st.session_state.evaluation_results = []
+                    session.restart(len(questions))
                     st.rerun()
             
             with col2:
                 if st.button("🏠 Retour au Menu Principal", use_container_width=True):
-                    st.session_state.selected_item = None
-                    st.session_state.current_question = 0
-                    st.session_state.user_answers = {}
-                    st.session_state.quiz_completed = False
-                    st.session_state.evaluation_results = []
-                    # Clear question-specific session state
-                    for key in list(st.session_state.keys()):
-                        if key.startswith(('mc_', 'ms_', 'match_', 'tf_', 'range_', 'order_', 'blank_', 'pair_', 'calc_')):
-                            del st.session_state[key]
+                    session.leave()
                     st.rerun()
 
     def run(self):
         # Check if user has entered their name
-        if not st.session_state.name_submitted:
+        if not self.session.user_name:
             self.render_name_input()
         # Check if user has selected an item
-        elif st.session_state.selected_item is None:
+        elif self.session.item_index is None:
             self.render_item_selection()
         # Render the quiz for the selected item
         else:
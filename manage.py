@@ -0,0 +1,284 @@
+"""Maintenance commands for the quiz database.
+
+    python manage.py rebuild-item-stats [--check]
+    python manage.py regrade [--dry-run] [--item NAME] [--chunk-size N]
+    python manage.py backfill-answers [--chunk-size N]
+    python manage.py rebuild-analytics
+    python manage.py rebuild-rollups
+    python manage.py rebuild-latest
+    python manage.py sync-questions
+    python manage.py thumbnails
+    python manage.py flush-queue [--status]
+    python manage.py replay-journal [--batch-size N]
+    python manage.py export-parquet [--directory DIR] [--chunk-size N]
+"""
+import argparse
+import os
+import sys
+
+import mysql.connector
+
+from main_sql import DB_CONFIG, DEFAULT_IMAGES, DatabaseManager
+from offline_journal import OfflineJournal
+from question_bank import load_question_bank
+from submission_queue import SubmissionQueue, save_submission
+from thumbnails import ThumbnailCache
+
+
+def rebuild_item_stats(db, args):
+    """Report item_statistics drift and rebuild the table from evaluations"""
+    drift = db.item_statistics_drift()
+    if drift is None:
+        print("Impossible de se connecter à la base de données.")
+        return 1
+
+    for row in drift:
+        details = ", ".join(f"{field}: {have} != {want}" for field, (have, want) in row['mismatches'].items())
+        print(f"[drift] {row['item_name']}: {details}")
+    if not drift:
+        print("item_statistics est cohérent avec evaluations.")
+
+    if args.check:
+        return 1 if drift else 0
+
+    if not db.rebuild_item_statistics():
+        return 1
+    print("item_statistics reconstruit depuis evaluations.")
+    return 0
+
+
+def requires_mysql(db):
+    """True if the command can run; the bulk UPDATE ... JOIN rewrites only exist for MySQL"""
+    if db.pool.backend != 'mysql':
+        print(f"Cette commande nécessite MySQL (moteur configuré: {db.pool.backend}).")
+        return False
+    return True
+
+
+def regrade(db, args):
+    """Regrade stored answers against the current questions.json"""
+    if not requires_mysql(db):
+        return 1
+    # Imported here so the other commands do not need numpy/pandas
+    from regrade import regrade as run_regrade
+
+    bank = load_question_bank()
+    try:
+        summary = run_regrade(db, bank, chunk_size=args.chunk_size, item_name=args.item, dry_run=args.dry_run)
+    except mysql.connector.Error as err:
+        # Rolled back by run_regrade: nothing was rewritten
+        print(f"Erreur lors de la recorrection, aucune modification écrite: {err}")
+        return 1
+    if summary is None:
+        print("Impossible de se connecter à la base de données.")
+        return 1
+
+    print(f"Version {bank.version}: {summary['scanned']} réponses lues en {summary['seconds']}s, "
+          f"{summary['changed']} à corriger, {summary['unknown_questions']} sans question correspondante.")
+    if args.dry_run:
+        print("Mode --dry-run: aucune modification écrite.")
+    else:
+        print(f"{summary['evaluations']} évaluations recalculées, statistiques reconstruites.")
+    return 0
+
+
+def backfill_answers(db, args):
+    """Store legacy repr answers as answer_json/answer_code"""
+    if not requires_mysql(db):
+        return 1
+    converted = db.backfill_answer_json(chunk_size=args.chunk_size)
+    if converted is None:
+        return 1
+    print(f"{converted} réponses converties en JSON.")
+    return 0
+
+
+def rebuild_analytics(db, args):
+    """Rebuild question_statistics and option_selections from question_results"""
+    if not db.rebuild_question_analytics():
+        return 1
+    print("question_statistics et option_selections reconstruits.")
+    return 0
+
+
+def rebuild_rollups(db, args):
+    """Rebuild the daily rollup tables from evaluations and question_results"""
+    if not db.rebuild_daily_rollups():
+        return 1
+    print("daily_user_item_scores et daily_question_scores reconstruits.")
+    return 0
+
+
+def rebuild_latest(db, args):
+    """Rebuild latest_evaluations from evaluations"""
+    if not db.rebuild_latest_evaluations():
+        return 1
+    print("latest_evaluations reconstruit depuis evaluations.")
+    return 0
+
+
+def sync_questions(db, args):
+    """Upsert the items and questions of questions.json into the dimension tables"""
+    bank = load_question_bank()
+    if not db.sync_question_bank(bank):
+        return 1
+    print(f"Version {bank.version}: {len(bank.items)} domaines synchronisés.")
+    return 0
+
+
+def build_thumbnails(db, args):
+    """Pre-build the item image thumbnails, e.g. at deploy time"""
+    thumbnails = ThumbnailCache()
+    total = thumbnails.warm(f"images/{name}" for name in DEFAULT_IMAGES)
+    print(f"{len(DEFAULT_IMAGES)} miniatures {thumbnails.format} ({total // 1024} Ko) dans {thumbnails.directory}.")
+    return 0
+
+
+def flush_queue(db, args):
+    """Show the write-behind backlog and save what is pending now, ignoring retry backoffs"""
+    submissions = SubmissionQueue(lambda submission: save_submission(db, submission), worker=False)
+    try:
+        backlog = submissions.backlog()
+        print(f"{backlog['pending']} soumission(s) en attente, dont {backlog['retrying']} en nouvel essai "
+              f"(la plus ancienne depuis {backlog['oldest_age_seconds']:.0f}s).")
+        journaled = OfflineJournal().pending()
+        if journaled:
+            print(f"{journaled} soumission(s) dans le journal de secours, voir `manage.py replay-journal`.")
+        if args.status or not backlog['pending']:
+            return 0
+
+        # Saving needs the schema migrations the status report skips
+        if not db.create_tables():
+            return 1
+        submissions.retry_now()
+        flushed = 0
+        while True:
+            saved = submissions.flush()
+            flushed += saved
+            if saved < submissions.batch_size:
+                break
+        remaining = submissions.backlog()
+        print(f"{flushed} soumission(s) enregistrée(s), {remaining['pending']} restante(s).")
+        if remaining['last_error']:
+            print(f"Dernière erreur: {remaining['last_error']}")
+        return 1 if remaining['pending'] else 0
+    finally:
+        submissions.close()
+
+
+def replay_journal(db, args):
+    """Bulk-load the offline journal into MySQL, then rebuild the derived tables once"""
+    journal = OfflineJournal()
+    files = journal.replay_files()
+    if not files:
+        print("Aucune soumission dans le journal hors ligne.")
+        return 0
+
+    read = loaded = 0
+    failed = None
+    for path in files:
+        batch = []
+        for submission in journal.read(path):
+            batch.append(submission)
+            if len(batch) == args.batch_size:
+                count = db.bulk_load_submissions(batch)
+                if count is None:
+                    break
+                read, loaded, batch = read + len(batch), loaded + count, []
+        else:
+            count = db.bulk_load_submissions(batch) if batch else 0
+            if count is not None:
+                read, loaded = read + len(batch), loaded + count
+                os.remove(path)
+                continue
+        # Batches already loaded are skipped by submission_id on the next run
+        failed = path
+        break
+    print(f"{loaded} soumission(s) chargée(s), {read - loaded} déjà présente(s).")
+
+    # Evaluations were loaded without touching the derived tables
+    if loaded and not (db.rebuild_item_statistics() and db.rebuild_question_analytics()
+                       and db.rebuild_daily_rollups() and db.rebuild_latest_evaluations()):
+        return 1
+    if failed:
+        print(f"Échec du chargement de {failed}, le fichier est conservé.")
+        return 1
+    return 0
+
+
+def export_parquet(db, args):
+    """Append the evaluations saved since the last export to the Parquet snapshot"""
+    # Imported here so the other commands do not need pandas/pyarrow
+    from parquet_export import export_parquet as run_export
+
+    counts = run_export(db, directory=args.directory, chunk_size=args.chunk_size)
+    if counts is None:
+        if db.connect_error is not None:
+            print("Impossible de se connecter à la base de données.")
+        else:
+            print("Export interrompu, relancez la commande pour le reprendre.")
+        return 1
+    print(f"{counts['evaluations']} évaluations et {counts['question_results']} réponses exportées "
+          f"dans {counts['files']} fichiers sous {args.directory}.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance de la base du quiz")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = subparsers.add_parser('rebuild-item-stats', help="reconstruire item_statistics depuis evaluations")
+    rebuild.add_argument('--check', action='store_true', help="signaler les écarts sans rien réécrire")
+    rebuild.set_defaults(handler=rebuild_item_stats)
+
+    regrade_parser = subparsers.add_parser('regrade', help="recorriger l'historique avec le barème actuel")
+    regrade_parser.add_argument('--dry-run', action='store_true', help="compter les corrections sans les écrire")
+    regrade_parser.add_argument('--item', help="limiter à un domaine d'évaluation")
+    regrade_parser.add_argument('--chunk-size', type=int, default=100000)
+    regrade_parser.set_defaults(handler=regrade)
+
+    backfill = subparsers.add_parser('backfill-answers', help="convertir les anciennes réponses texte en JSON")
+    backfill.add_argument('--chunk-size', type=int, default=50000)
+    backfill.set_defaults(handler=backfill_answers)
+
+    analytics = subparsers.add_parser('rebuild-analytics', help="reconstruire les tables d'analyse des questions")
+    analytics.set_defaults(handler=rebuild_analytics)
+
+    rollups = subparsers.add_parser('rebuild-rollups', help="reconstruire les agrégats journaliers")
+    rollups.set_defaults(handler=rebuild_rollups)
+
+    latest = subparsers.add_parser('rebuild-latest', help="reconstruire la table des dernières évaluations")
+    latest.set_defaults(handler=rebuild_latest)
+
+    sync = subparsers.add_parser('sync-questions', help="synchroniser les tables items et questions avec questions.json")
+    sync.set_defaults(handler=sync_questions)
+
+    thumbnails = subparsers.add_parser('thumbnails', help="générer les miniatures des images des domaines")
+    thumbnails.set_defaults(handler=build_thumbnails, needs_db=False)
+
+    flush = subparsers.add_parser('flush-queue', help="enregistrer les soumissions en attente dans la file locale")
+    flush.add_argument('--status', action='store_true', help="afficher l'arriéré sans rien enregistrer")
+    flush.set_defaults(handler=flush_queue, needs_db=False)
+
+    replay = subparsers.add_parser('replay-journal',
+                                   help="charger dans la base le journal de secours de la file des soumissions")
+    replay.add_argument('--batch-size', type=int, default=500, help="soumissions par transaction")
+    replay.set_defaults(handler=replay_journal)
+
+    export = subparsers.add_parser('export-parquet', help="exporter l'historique en Parquet pour le tableau de bord")
+    export.add_argument('--directory', default=os.path.join('data', 'parquet'))
+    export.add_argument('--chunk-size', type=int, default=100000)
+    export.set_defaults(handler=export_parquet)
+
+    args = parser.parse_args()
+    # Database errors are printed: st.error shows nothing outside `streamlit run`
+    db = DatabaseManager(DB_CONFIG, report=print)
+    # Also applies pending schema migrations. Commands on local files skip it, so they
+    # still work while MySQL is down
+    if getattr(args, 'needs_db', True) and not db.create_tables():
+        return 1
+    return args.handler(db, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
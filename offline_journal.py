@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List
+
+JOURNAL_PATH = os.path.join("data", "offline_journal.jsonl")
+
+
+class OfflineJournal:
+    """Append-only JSON-lines file of submissions the write-behind queue could not store.
+
+    SubmissionQueue is the authoritative store of pending submissions; this file is only
+    its fallback when the queue's SQLite file cannot be written or opened.
+
+    Records are the dictionaries built by submission_queue.make_submission, one per
+    line, so a torn last line after a crash loses at most that line. A replay first
+    moves the file aside, so submissions journaled during the replay start a new file.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, submission: Dict[str, Any]):
+        """Write one submission and force it to disk before returning"""
+        line = (json.dumps(submission, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path, "a+b") as f:
+            # A line torn by a crash is terminated, so this record does not end up inside it
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay_files(self) -> List[str]:
+        """Move the live journal aside and list every file waiting for a replay, oldest first"""
+        if os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.{time.strftime('%Y%m%d%H%M%S')}.replay")
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.startswith(prefix) and name.endswith(".replay"))
+
+    @staticmethod
+    def read(path: str) -> Iterator[Dict[str, Any]]:
+        """Submissions of a journal file, skipping a line torn by a crash"""
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def pending(self) -> int:
+        """Number of journaled submissions not replayed yet"""
+        directory = os.path.dirname(self.path) or "."
+        if not os.path.isdir(directory):
+            return 0
+        prefix = os.path.basename(self.path)
+        total = 0
+        for name in os.listdir(directory):
+            if name == prefix or (name.startswith(prefix + ".") and name.endswith(".replay")):
+                total += sum(1 for _ in self.read(os.path.join(directory, name)))
+        return total
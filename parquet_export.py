@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+import mysql.connector
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+PARQUET_DIR = os.path.join("data", "parquet")
+STATE_FILE = "_state.json"
+DIMENSION_QUERIES = {
+    'users': "SELECT user_id, username FROM users",
+    'items': "SELECT item_id, item_name FROM items",
+    'questions': "SELECT question_id, item_id, question_hash, question_text FROM questions",
+}
+
+
+def read_state(directory: str = PARQUET_DIR) -> Dict:
+    """Export watermark: the last evaluation_id written, 0 before the first export"""
+    try:
+        with open(os.path.join(directory, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'last_evaluation_id': 0, 'exported_at': None}
+
+
+def write_state(directory: str, state: Dict):
+    """Replace the state file atomically, so a crash leaves the previous watermark"""
+    partial = os.path.join(directory, STATE_FILE + ".tmp")
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(partial, os.path.join(directory, STATE_FILE))
+
+
+def write_table(frame: pd.DataFrame, path: str):
+    """Write one Parquet file through a temporary name"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".tmp"
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), partial, compression="zstd")
+    os.replace(partial, path)
+
+
+def write_partitions(frame: pd.DataFrame, directory: str, table: str, first_id: int) -> int:
+    """Write a chunk of facts as one file per (month, item_id) partition, returns the files written.
+
+    Files are named after the first evaluation_id of the chunk, so a chunk exported again
+    after a crash overwrites its own files instead of duplicating them.
+    """
+    written = 0
+    for (month, item_id), part in frame.groupby(['month', 'item_id'], sort=False):
+        path = os.path.join(directory, table, f"month={month}", f"item_id={item_id}",
+                            f"part-{first_id:010d}.parquet")
+        write_table(part.drop(columns=['month', 'item_id']), path)
+        written += 1
+    return written
+
+
+def export_parquet(db, directory: str = PARQUET_DIR, chunk_size: int = 100000) -> Optional[Dict[str, int]]:
+    """Append the evaluations saved since the last export to a Parquet snapshot.
+
+    Fact tables are partitioned hive-style by month of the evaluation and item_id, so
+    readers prune whole directories on those filters. question_results rows carry the
+    user_id and the partition of their evaluation. The small dimension tables are
+    rewritten on every run. Returns row counts, or None if the database failed.
+
+    Rows changed in place (regrade, deleted users) are not picked up by the watermark,
+    nor is a save still in flight when the export starts that commits below the
+    high-water mark: delete the directory to export everything again.
+    """
+    state = read_state(directory)
+    last_id = state['last_evaluation_id']
+    counts = {'evaluations': 0, 'question_results': 0, 'files': 0}
+
+    if not db.connect():
+        return None
+    cursor = db.connection.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(evaluation_id), 0) FROM evaluations")
+        high_water = cursor.fetchone()[0]
+
+        while last_id < high_water:
+            cursor.execute("""
+                SELECT evaluation_id, user_id, item_id, total_questions, correct_answers,
+                       score_percentage, evaluation_date, bank_version
+                FROM evaluations
+                WHERE evaluation_id > %s AND evaluation_id <= %s
+                ORDER BY evaluation_id
+                LIMIT %s
+            """, (last_id, high_water, chunk_size))
+            evaluations = pd.DataFrame(cursor.fetchall(), columns=[c[0] for c in cursor.description])
+            if evaluations.empty:
+                break
+            first_id, chunk_last = last_id + 1, int(evaluations['evaluation_id'].iloc[-1])
+
+            cursor.execute("""
+                SELECT evaluation_id, question_id, is_correct, score_points
+                FROM question_results
+                WHERE evaluation_id > %s AND evaluation_id <= %s
+            """, (last_id, chunk_last))
+            answers = pd.DataFrame(cursor.fetchall(), columns=[c[0] for c in cursor.description])
+
+            evaluations = evaluations.astype({
+                'evaluation_id': 'int32', 'user_id': 'int32', 'item_id': 'int16',
+                'total_questions': 'int16', 'correct_answers': 'int16', 'score_percentage': 'float32'
+            })
+            evaluations['evaluation_date'] = pd.to_datetime(evaluations['evaluation_date'])
+            evaluations['month'] = evaluations['evaluation_date'].dt.strftime('%Y-%m')
+            answers = answers.astype({'evaluation_id': 'int32', 'question_id': 'int32',
+                                      'is_correct': 'int8', 'score_points': 'float32'})
+            answers = answers.merge(evaluations[['evaluation_id', 'user_id', 'item_id', 'month']],
+                                    on='evaluation_id')
+
+            counts['files'] += write_partitions(evaluations, directory, 'evaluations', first_id)
+            counts['files'] += write_partitions(answers, directory, 'question_results', first_id)
+            counts['evaluations'] += len(evaluations)
+            counts['question_results'] += len(answers)
+
+            # The watermark moves only once both fact tables of the chunk are on disk
+            last_id = chunk_last
+            write_state(directory, {'last_evaluation_id': last_id,
+                                    'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S')})
+
+        for table, query in DIMENSION_QUERIES.items():
+            cursor.execute(query)
+            frame = pd.DataFrame(cursor.fetchall(), columns=[c[0] for c in cursor.description])
+            write_table(frame, os.path.join(directory, f"{table}.parquet"))
+        if not os.path.exists(os.path.join(directory, STATE_FILE)):
+            write_state(directory, {'last_evaluation_id': last_id,
+                                    'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S')})
+        return counts
+    except mysql.connector.Error as err:
+        # The chunks already written are kept: the next run resumes from the saved watermark
+        logger.error("Erreur lors de l'export Parquet après l'évaluation %s: %s", last_id, err)
+        return None
+    finally:
+        cursor.close()
+        db.disconnect()
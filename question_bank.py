@@ -0,0 +1,408 @@
+import ast
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+QUESTIONS_PATH = "questions.json"
+
+EMPTY_MAPPING = MappingProxyType({})
+
+# Placeholder stored in question_results.user_answer before answers were saved as JSON
+UNANSWERED = "Non répondu"
+
+# Fields each question type must define, checked before a new bank is swapped in
+REQUIRED_FIELDS = {
+    'multiple_choice': ('option1', 'option2', 'option3', 'option4', 'correct_option'),
+    'multiple_select': ('options', 'correct_options'),
+    'matching': ('options', 'correct_answers'),
+    'true_false': ('correct_answer',),
+    'range_input': ('materials', 'correct_ranges'),
+    'ordering': ('items',),
+    'fill_blanks': ('blanks',),
+    'matching_pairs': ('pairs',),
+    'calculation': ('correct_answer',),
+}
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionBankError(ValueError):
+    """questions.json could not be parsed or failed validation"""
+
+
+@dataclass(frozen=True)
+class GradingSpec:
+    """Immutable answer key of one question, with everything grading needs precomputed"""
+    type: str
+    correct_option: Optional[int] = None
+    correct_options: frozenset = frozenset()
+    scoring: Optional[Mapping[str, float]] = None
+    correct_answers: Mapping[str, str] = field(default_factory=lambda: EMPTY_MAPPING)
+    correct_answer: Any = None
+    correct_ranges: Mapping[str, Tuple[float, float]] = field(default_factory=lambda: EMPTY_MAPPING)
+    tolerance: float = 0
+    unit: str = ''
+    explanation: str = ''
+
+
+@dataclass(frozen=True)
+class QuestionBank:
+    """Parsed questions.json shared read-only by every session of the process"""
+    items: Tuple[Dict[str, Any], ...]
+    specs: Tuple[Tuple[GradingSpec, ...], ...]
+    version: str
+    mtime_ns: int
+
+
+def compile_question(question_data: Dict) -> GradingSpec:
+    """Compile a question of questions.json into its grading spec"""
+    q_type = question_data['type']
+
+    if q_type == 'multiple_choice':
+        return GradingSpec(q_type, correct_option=question_data['correct_option'])
+
+    elif q_type == 'multiple_select':
+        scoring = question_data.get('scoring')
+        return GradingSpec(
+            q_type,
+            correct_options=frozenset(question_data['correct_options']),
+            scoring=MappingProxyType(dict(scoring)) if scoring is not None else None
+        )
+
+    elif q_type == 'matching':
+        return GradingSpec(q_type, correct_answers=MappingProxyType(dict(question_data['correct_answers'])))
+
+    elif q_type == 'true_false':
+        return GradingSpec(
+            q_type,
+            correct_answer=question_data['correct_answer'],
+            explanation=question_data.get('explanation', '')
+        )
+
+    elif q_type == 'range_input':
+        correct_ranges = {material: (r['min'], r['max']) for material, r in question_data['correct_ranges'].items()}
+        return GradingSpec(
+            q_type,
+            correct_ranges=MappingProxyType(correct_ranges),
+            tolerance=question_data.get('tolerance', 5)
+        )
+
+    elif q_type == 'calculation':
+        correct_answer = question_data['correct_answer']
+        return GradingSpec(
+            q_type,
+            correct_answer=correct_answer,
+            # Stored as an absolute value so grading is a single comparison
+            tolerance=abs(correct_answer * question_data.get('tolerance_percent', 0) / 100),
+            unit=question_data.get('unit', '')
+        )
+
+    return GradingSpec(q_type)
+
+
+def grade(spec: GradingSpec, user_answer: Any) -> Dict[str, Any]:
+    """Calculate score for a question based on its grading spec and user answer"""
+    q_type = spec.type
+
+    if q_type == 'multiple_choice':
+        correct = spec.correct_option
+        is_correct = user_answer == correct
+        return {
+            'correct': is_correct,
+            'score': 1 if is_correct else 0,
+            'feedback': f"Réponse correcte: Option {correct}" if not is_correct else "Correct!"
+        }
+
+    elif q_type == 'multiple_select':
+        correct_options = spec.correct_options
+        user_options = set(user_answer) if user_answer else set()
+
+        if spec.scoring is not None:
+            scoring = spec.scoring
+            hits = len(correct_options & user_options)
+            score = (hits * scoring.get('correct_selection', 1)
+                     + (len(correct_options) - hits) * scoring.get('missed_selection', -0.5)
+                     + len(user_options - correct_options) * scoring.get('wrong_selection', -1))
+            score = max(0, score)  # Minimum score is 0
+        else:
+            score = 1 if user_options == correct_options else 0
+
+        return {
+            'correct': user_options == correct_options,
+            'score': score,
+            'feedback': f"Réponses correctes: {sorted(correct_options)}"
+        }
+
+    elif q_type == 'matching':
+        correct_answers = spec.correct_answers
+        if not user_answer:
+            return {'correct': False, 'score': 0, 'feedback': 'Aucune réponse fournie'}
+
+        correct_count = sum(1 for item, cat in user_answer.items()
+                            if correct_answers.get(item) == cat)
+        total_items = len(correct_answers)
+        score = correct_count / total_items
+
+        return {
+            'correct': score == 1.0,
+            'score': score,
+            'feedback': f"Correct: {correct_count}/{total_items}"
+        }
+
+    elif q_type == 'true_false':
+        correct = spec.correct_answer
+        is_correct = user_answer == correct
+        feedback = spec.explanation
+
+        return {
+            'correct': is_correct,
+            'score': 1 if is_correct else 0,
+            'feedback': feedback if feedback else ("Correct!" if is_correct else f"Réponse correcte: {'Vrai' if correct else 'Faux'}")
+        }
+
+    elif q_type == 'range_input':
+        if not user_answer:
+            return {'correct': False, 'score': 0, 'feedback': 'Aucune réponse fournie'}
+
+        tolerance = spec.tolerance
+        correct_count = 0
+        total_materials = len(spec.correct_ranges)
+
+        for material, (correct_min, correct_max) in spec.correct_ranges.items():
+            user_range = user_answer.get(material)
+            if (user_range
+                    and abs(user_range['min'] - correct_min) <= tolerance
+                    and abs(user_range['max'] - correct_max) <= tolerance):
+                correct_count += 1
+
+        score = correct_count / total_materials
+        return {
+            'correct': score == 1.0,
+            'score': score,
+            'feedback': f"Ranges corrects: {correct_count}/{total_materials}"
+        }
+
+    elif q_type == 'calculation':
+        if user_answer is None:
+            return {'correct': False, 'score': 0, 'feedback': 'Aucune réponse fournie'}
+
+        is_correct = abs(user_answer - spec.correct_answer) <= spec.tolerance
+
+        return {
+            'correct': is_correct,
+            'score': 1 if is_correct else 0,
+            'feedback': f"Réponse correcte: {spec.correct_answer} {spec.unit}"
+        }
+
+    return {'correct': False, 'score': 0, 'feedback': 'Type de question non supporté'}
+
+
+def question_hash(question_text: str) -> str:
+    """Short key of a question, equal to LEFT(SHA1(question_text), 16) in MySQL"""
+    return hashlib.sha1(question_text.encode("utf-8")).hexdigest()[:16]
+
+
+def selected_options(q_type: str, answer: Any) -> Tuple[int, ...]:
+    """Option numbers picked in a single or multiple choice answer (Vrai = 1, Faux = 2)"""
+    if answer is None:
+        return ()
+    if q_type == 'multiple_choice':
+        return (int(answer),)
+    if q_type == 'true_false':
+        return (1 if answer else 2,)
+    if q_type == 'multiple_select':
+        return tuple(sorted({int(option) for option in answer}))
+    return ()
+
+
+def option_labels(question_data: Dict) -> Tuple[str, ...]:
+    """Labels of the options counted by selected_options, in option number order"""
+    q_type = question_data['type']
+    if q_type == 'multiple_choice':
+        return tuple(question_data.get(f'option{n}', '') for n in range(1, 5))
+    if q_type == 'true_false':
+        return ("Vrai", "Faux")
+    if q_type == 'multiple_select':
+        return tuple(question_data['options'])
+    return ()
+
+
+def correct_option_numbers(question_data: Dict) -> frozenset:
+    """Option numbers of option_labels that belong to the answer key"""
+    q_type = question_data['type']
+    if q_type == 'multiple_choice':
+        return frozenset({question_data['correct_option']})
+    if q_type == 'true_false':
+        return frozenset({1 if question_data['correct_answer'] else 2})
+    if q_type == 'multiple_select':
+        return frozenset(question_data['correct_options'])
+    return frozenset()
+
+
+def encode_answer(q_type: str, answer: Any) -> Tuple[Optional[str], Optional[int]]:
+    """Canonical JSON of a user answer, plus the option number of single-choice types (Vrai = 1, Faux = 2)"""
+    if answer is None:
+        return None, None
+
+    code = None
+    if q_type == 'multiple_choice':
+        value = code = int(answer)
+    elif q_type == 'true_false':
+        value = bool(answer)
+        code = 1 if value else 2
+    elif q_type == 'multiple_select':
+        value = sorted(int(option) for option in answer)
+    elif q_type == 'ordering':
+        value = [int(position) for position in answer]
+    elif q_type == 'range_input':
+        value = {material: {'min': float(r['min']), 'max': float(r['max'])} for material, r in answer.items()}
+    elif q_type == 'calculation':
+        value = float(answer)
+    else:
+        # matching / matching_pairs dicts and fill_blanks lists are already plain JSON
+        value = answer
+    return json.dumps(value, ensure_ascii=False, sort_keys=True), code
+
+
+def parse_stored_answer(raw: Any) -> Any:
+    """Decode a stored answer: JSON, or the repr text of rows saved before answer_json existed"""
+    if raw is None or raw == UNANSWERED:
+        return None
+    if isinstance(raw, (int, float)):
+        # A number read back from a SQLite JSON column created before it was declared TEXT
+        return raw
+    try:
+        return json.loads(raw)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        return None
+
+
+def validate_items(items: Any) -> None:
+    """Check the structure of a parsed questions.json, raising QuestionBankError on the first problem"""
+    if not isinstance(items, list) or not items:
+        raise QuestionBankError("questions.json doit contenir une liste non vide de domaines")
+
+    for item_index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('item'), str):
+            raise QuestionBankError(f"Domaine {item_index + 1}: champ 'item' manquant")
+        questions = item.get('questions')
+        if not isinstance(questions, list) or not questions:
+            raise QuestionBankError(f"{item['item']}: aucune question")
+
+        for q_index, question_data in enumerate(questions):
+            where = f"{item['item']}, question {q_index + 1}"
+            if not isinstance(question_data, dict) or not isinstance(question_data.get('question'), str):
+                raise QuestionBankError(f"{where}: champ 'question' manquant")
+            q_type = question_data.get('type')
+            if q_type not in REQUIRED_FIELDS:
+                raise QuestionBankError(f"{where}: type de question non supporté '{q_type}'")
+            missing = [key for key in REQUIRED_FIELDS[q_type] if key not in question_data]
+            if missing:
+                raise QuestionBankError(f"{where}: champs manquants {missing}")
+
+            if q_type == 'multiple_choice' and question_data['correct_option'] not in (1, 2, 3, 4):
+                raise QuestionBankError(f"{where}: correct_option doit être entre 1 et 4")
+            if q_type == 'multiple_select':
+                valid = range(1, len(question_data['options']) + 1)
+                if not all(option in valid for option in question_data['correct_options']):
+                    raise QuestionBankError(f"{where}: correct_options hors des options proposées")
+            if q_type == 'range_input':
+                for material, correct_range in question_data['correct_ranges'].items():
+                    if not {'min', 'max'} <= set(correct_range):
+                        raise QuestionBankError(f"{where}: plage incomplète pour {material}")
+            if q_type == 'calculation' and not isinstance(question_data['correct_answer'], (int, float)):
+                raise QuestionBankError(f"{where}: correct_answer doit être numérique")
+
+
+def parse_question_bank(path: str) -> QuestionBank:
+    """Read, validate and compile a questions.json file"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        items = json.loads(raw.decode("utf-8"))
+    except ValueError as err:
+        raise QuestionBankError(f"JSON invalide: {err}") from err
+    validate_items(items)
+    return QuestionBank(
+        items=tuple(items),
+        specs=tuple(tuple(compile_question(q) for q in item['questions']) for item in items),
+        version=hashlib.sha256(raw).hexdigest()[:16],
+        mtime_ns=mtime_ns
+    )
+
+
+class QuestionBankLoader:
+    """Polls a questions.json file and swaps in new versions once they validate"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.current: Optional[QuestionBank] = None
+        self.versions: Dict[str, QuestionBank] = {}
+        self.last_error: Optional[str] = None
+        self._rejected_mtime_ns: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> QuestionBank:
+        """Return the latest valid bank, reloading it if the file changed"""
+        current = self.current
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError as err:
+            if current is None:
+                raise
+            # Missing for a moment while an editor replaces it: keep the loaded bank
+            logger.warning("questions.json illisible, version %s conservée: %s", current.version, err)
+            return current
+        if current is not None and mtime_ns in (current.mtime_ns, self._rejected_mtime_ns):
+            return current
+
+        with self._lock:
+            current = self.current
+            if current is not None and mtime_ns in (current.mtime_ns, self._rejected_mtime_ns):
+                return current
+            try:
+                bank = parse_question_bank(self.path)
+            except (OSError, QuestionBankError) as err:
+                if current is None:
+                    raise
+                # Keep serving the previous bank until the file is fixed
+                logger.warning("questions.json rejeté, version %s conservée: %s", current.version, err)
+                self.last_error = str(err)
+                self._rejected_mtime_ns = mtime_ns
+                return current
+
+            # Touching the file without changing it keeps the already loaded version, with the new
+            # mtime so the next calls take the fast path instead of parsing the file again
+            bank = replace(self.versions.get(bank.version, bank), mtime_ns=bank.mtime_ns)
+            self.versions[bank.version] = bank
+            self.last_error = None
+            self._rejected_mtime_ns = None
+            self.current = bank
+            return bank
+
+    def version(self, version: Optional[str]) -> Optional[QuestionBank]:
+        """Return a previously loaded bank by version, for sessions pinned to it"""
+        return self.versions.get(version)
+
+
+_loader = QuestionBankLoader(QUESTIONS_PATH)
+
+
+def load_question_bank() -> QuestionBank:
+    """Return the current question bank, hot-reloaded when questions.json changes"""
+    return _loader.get()
+
+
+def get_question_bank(version: Optional[str]) -> Optional[QuestionBank]:
+    """Return the bank a session started with, or None if this process never loaded it"""
+    return _loader.version(version)
@@ -0,0 +1,66 @@
+from typing import Any, Dict, FrozenSet, List, Optional
+
+
+class QuizSession:
+    """State of one operator's session, stored as a single st.session_state entry.
+
+    Answers are a list indexed by question (None while unanswered) and the items already
+    taken are a frozenset of item names, so they survive items being added or reordered
+    in a new version of the question bank. Widget keys carry the
+    attempt number, so starting over only bumps it: the previous attempt's widgets are
+    never rendered again and Streamlit drops their state at the end of the run.
+    """
+    __slots__ = ('user_name', 'item_index', 'bank_version', 'current_question', 'answers', 'finished',
+                 'completed', 'attempt')
+
+    def __init__(self):
+        self.user_name: str = ""
+        self.item_index: Optional[int] = None
+        self.bank_version: Optional[str] = None
+        self.current_question: int = 0
+        self.answers: List[Any] = []
+        self.finished: bool = False
+        self.completed: FrozenSet[str] = frozenset()
+        self.attempt: int = 0
+
+    def start(self, item_index: int, bank_version: str, question_count: int):
+        """Select an item and start its quiz"""
+        self.item_index = item_index
+        self.bank_version = bank_version
+        self.restart(question_count)
+
+    def restart(self, question_count: int):
+        """Start the selected item over with blank widgets"""
+        self.current_question = 0
+        self.answers = [None] * question_count
+        self.finished = False
+        self.attempt += 1
+
+    def leave(self):
+        """Back to the item selection, keeping the user and the completed items"""
+        self.item_index = None
+        self.bank_version = None
+        self.current_question = 0
+        self.answers = []
+        self.finished = False
+        self.attempt += 1
+
+    def logout(self):
+        """Forget the user; the attempt counter keeps going so no widget key is reused"""
+        self.leave()
+        self.user_name = ""
+        self.completed = frozenset()
+
+    def widget_id(self, question_index: int) -> str:
+        """Prefix of the widget keys of a question in the current attempt"""
+        return f"a{self.attempt}_q_{question_index}"
+
+    def answered(self) -> Dict[int, Any]:
+        """Answers given so far, by question index"""
+        return {i: answer for i, answer in enumerate(self.answers) if answer is not None}
+
+    def mark_completed(self, item_name: str):
+        self.completed |= {item_name}
+
+    def is_completed(self, item_name: str) -> bool:
+        return item_name in self.completed
@@ -0,0 +1,252 @@
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+from question_bank import UNANSWERED, GradingSpec, QuestionBank, grade, parse_stored_answer
+
+
+def grade_uniques(spec: GradingSpec, uniques: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Grade every distinct stored answer of one question, returns (is_correct, score) arrays"""
+    q_type = spec.type
+
+    if q_type == 'calculation':
+        values = pd.to_numeric(pd.Series(uniques), errors='coerce').to_numpy(dtype=float)
+        is_correct = np.abs(values - spec.correct_answer) <= spec.tolerance
+        return is_correct, is_correct.astype(float)
+
+    parsed = [parse_stored_answer(raw) for raw in uniques]
+
+    if q_type == 'multiple_select':
+        # Selections as bitmasks: set comparisons become integer operations
+        masks = np.array([
+            sum(1 << (option - 1) for option in set(answer)) if isinstance(answer, (list, tuple)) else 0
+            for answer in parsed
+        ], dtype=np.int64)
+        correct_mask = sum(1 << (option - 1) for option in spec.correct_options)
+        is_correct = masks == correct_mask
+        if spec.scoring is None:
+            return is_correct, is_correct.astype(float)
+
+        width = max(int(masks.max(initial=0)).bit_length(), correct_mask.bit_length())
+        hits = popcount(masks & correct_mask, width)
+        wrong = popcount(masks & ~correct_mask, width)
+        scoring = spec.scoring
+        score = (hits * scoring.get('correct_selection', 1)
+                 + (len(spec.correct_options) - hits) * scoring.get('missed_selection', -0.5)
+                 + wrong * scoring.get('wrong_selection', -1))
+        return is_correct, np.maximum(0, score).astype(float)
+
+    if q_type == 'matching':
+        answers = [answer if isinstance(answer, dict) else {} for answer in parsed]
+        correct_count = np.zeros(len(answers), dtype=np.int64)
+        for option, category in spec.correct_answers.items():
+            correct_count += np.array([answer.get(option) == category for answer in answers])
+        score = correct_count / len(spec.correct_answers)
+        return score == 1.0, score
+
+    if q_type == 'range_input':
+        answers = [answer if isinstance(answer, dict) else {} for answer in parsed]
+        correct_count = np.zeros(len(answers), dtype=np.int64)
+        for material, (correct_min, correct_max) in spec.correct_ranges.items():
+            user_min = np.array([answer.get(material, {}).get('min', np.nan) for answer in answers], dtype=float)
+            user_max = np.array([answer.get(material, {}).get('max', np.nan) for answer in answers], dtype=float)
+            correct_count += ((np.abs(user_min - correct_min) <= spec.tolerance)
+                              & (np.abs(user_max - correct_max) <= spec.tolerance))
+        score = correct_count / len(spec.correct_ranges)
+        return score == 1.0, score
+
+    # Single choice and remaining types have few distinct answers: reuse the live grader
+    results = [grade(spec, answer) for answer in parsed]
+    return (np.array([r['correct'] for r in results], dtype=bool),
+            np.array([r['score'] for r in results], dtype=float))
+
+
+def popcount(masks: np.ndarray, width: int) -> np.ndarray:
+    """Number of set bits of each mask"""
+    counts = np.zeros(len(masks), dtype=np.int64)
+    for bit in range(width):
+        counts += (masks >> bit) & 1
+    return counts
+
+
+def grade_frame(df: pd.DataFrame, specs: Dict[Tuple[str, str], GradingSpec]) -> pd.DataFrame:
+    """Add new_correct/new_score columns to a chunk of question_results rows, and the unrounded exact_score"""
+    new_correct = np.zeros(len(df), dtype=bool)
+    new_score = np.zeros(len(df), dtype=float)
+    known = np.zeros(len(df), dtype=bool)
+
+    for key, positions in df.groupby(['item_name', 'question_text'], sort=False).indices.items():
+        spec = specs.get(key)
+        if spec is None:
+            continue
+        raw = df['user_answer'].iloc[positions].fillna(UNANSWERED)
+        codes, uniques = pd.factorize(raw)
+        correct_u, score_u = grade_uniques(spec, np.asarray(uniques, dtype=object))
+        new_correct[positions] = correct_u[codes]
+        new_score[positions] = score_u[codes]
+        known[positions] = True
+
+    df = df.assign(new_correct=new_correct, new_score=np.round(new_score, 2), exact_score=new_score, known=known)
+    return df
+
+
+def evaluation_scores(cursor, specs: Dict[Tuple[str, str], GradingSpec], evaluation_ids,
+                      batch_size: int = 1000):
+    """(evaluation_id, correct answers, total score) rows of regraded evaluations.
+
+    The total adds the unrounded question scores, like the live save does; score_points
+    only holds them rounded to 2 decimals. Questions no longer in the bank keep their
+    stored result.
+    """
+    evaluation_ids = sorted(evaluation_ids)
+    rows = []
+    for start in range(0, len(evaluation_ids), batch_size):
+        batch = evaluation_ids[start:start + batch_size]
+        cursor.execute(f"""
+            SELECT qr.evaluation_id, i.item_name, q.question_text,
+                   COALESCE(qr.answer_json, qr.user_answer) AS user_answer, qr.is_correct, qr.score_points
+            FROM question_results qr
+            JOIN questions q ON qr.question_id = q.question_id
+            JOIN items i ON q.item_id = i.item_id
+            WHERE qr.evaluation_id IN ({', '.join(['%s'] * len(batch))})
+        """, batch)
+        df = grade_frame(pd.DataFrame(cursor.fetchall(), columns=['evaluation_id', 'item_name', 'question_text',
+                                                                  'user_answer', 'is_correct', 'score_points']),
+                         specs)
+        df = df.assign(
+            correct=np.where(df['known'], df['new_correct'], df['is_correct'].astype(bool)).astype(int),
+            score=np.where(df['known'], df['exact_score'], df['score_points'].astype(float))
+        )
+        totals = df.groupby('evaluation_id')[['correct', 'score']].sum()
+        rows.extend(zip(totals.index.astype(int).tolist(), totals['correct'].astype(int).tolist(),
+                        totals['score'].tolist()))
+    return rows
+
+
+def regrade(db, bank: QuestionBank, chunk_size: int = 100000, item_name: Optional[str] = None,
+            dry_run: bool = False) -> Optional[Dict[str, Any]]:
+    """Regrade stored question_results against `bank` and rewrite scores in bulk"""
+    specs = {}
+    correct_strings = {}
+    for item, item_specs in zip(bank.items, bank.specs):
+        for question_data, spec in zip(item['questions'], item_specs):
+            specs[(item['item'], question_data['question'])] = spec
+            correct_strings[(item['item'], question_data['question'])] = str(db.get_correct_answer_string(question_data))
+
+    if not db.connect():
+        return None
+
+    start = time.perf_counter()
+    summary = {'scanned': 0, 'unknown_questions': 0, 'changed': 0, 'evaluations': 0}
+    # Evaluations with a question whose correctness or score changed, not only its answer text
+    rescored = set()
+    cursor = db.connection.cursor()
+
+    try:
+        if not dry_run:
+            cursor.execute("""
+                CREATE TEMPORARY TABLE regrade_scores (
+                    result_id INT PRIMARY KEY,
+                    is_correct BOOLEAN NOT NULL,
+                    score_points DECIMAL(3,2) NOT NULL,
+                    correct_answer TEXT
+                ) ENGINE=InnoDB
+            """)
+            cursor.execute("""
+                CREATE TEMPORARY TABLE regrade_evaluations (
+                    evaluation_id INT PRIMARY KEY,
+                    correct_answers INT NOT NULL,
+                    total_score DOUBLE NOT NULL
+                ) ENGINE=InnoDB
+            """)
+
+        item_filter = "AND i.item_name = %s" if item_name else ""
+        last_id = 0
+        while True:
+            params = (last_id, item_name, chunk_size) if item_name else (last_id, chunk_size)
+            # Keyset pagination keeps every chunk an index range read
+            cursor.execute(f"""
+                SELECT qr.result_id, qr.evaluation_id, i.item_name, q.question_text,
+                       COALESCE(qr.answer_json, qr.user_answer) AS user_answer,
+                       qr.is_correct, qr.score_points, qr.correct_answer
+                FROM question_results qr
+                JOIN questions q ON qr.question_id = q.question_id
+                JOIN items i ON q.item_id = i.item_id
+                WHERE qr.result_id > %s {item_filter}
+                ORDER BY qr.result_id
+                LIMIT %s
+            """, params)
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            df = pd.DataFrame(rows, columns=['result_id', 'evaluation_id', 'item_name', 'question_text',
+                                             'user_answer', 'is_correct', 'score_points', 'correct_answer'])
+            df = grade_frame(df, specs)
+            summary['scanned'] += len(df)
+            summary['unknown_questions'] += int((~df['known']).sum())
+
+            df = df[df['known']]
+            new_correct_answer = pd.Series(
+                [correct_strings[key] for key in zip(df['item_name'], df['question_text'])],
+                index=df.index, dtype=object
+            )
+            rescore = ((df['is_correct'].astype(bool) != df['new_correct'])
+                       | (np.abs(df['score_points'].astype(float) - df['new_score']) > 0.005))
+            changed = df[rescore | (df['correct_answer'] != new_correct_answer)]
+            summary['changed'] += len(changed)
+            rescored.update(df.loc[rescore, 'evaluation_id'].astype(int).tolist())
+
+            if not dry_run and len(changed):
+                cursor.executemany(
+                    "INSERT INTO regrade_scores (result_id, is_correct, score_points, correct_answer) VALUES (%s, %s, %s, %s)",
+                    list(zip(changed['result_id'].astype(int).tolist(), changed['new_correct'].tolist(),
+                             changed['new_score'].tolist(), new_correct_answer[changed.index].tolist()))
+                )
+
+        if not dry_run and summary['changed']:
+            cursor.execute("""
+                UPDATE question_results qr
+                JOIN regrade_scores r ON qr.result_id = r.result_id
+                SET qr.is_correct = r.is_correct,
+                    qr.score_points = r.score_points,
+                    qr.correct_answer = r.correct_answer
+            """)
+            if rescored:
+                cursor.executemany(
+                    "INSERT INTO regrade_evaluations (evaluation_id, correct_answers, total_score) VALUES (%s, %s, %s)",
+                    evaluation_scores(cursor, specs, rescored)
+                )
+                cursor.execute("""
+                    UPDATE evaluations e
+                    JOIN regrade_evaluations s ON e.evaluation_id = s.evaluation_id
+                    SET e.correct_answers = s.correct_answers,
+                        e.score_percentage = s.total_score / e.total_questions * 100
+                """)
+                summary['evaluations'] = cursor.rowcount
+            db.rebuild_item_statistics_rows(cursor)
+            db.rebuild_question_statistics_rows(cursor)
+            db.rebuild_daily_rollups_rows(cursor)
+            db.rebuild_latest_evaluations_rows(cursor)
+            db.connection.commit()
+
+        summary['seconds'] = round(time.perf_counter() - start, 2)
+        return summary
+
+    except mysql.connector.Error:
+        db.connection.rollback()
+        raise
+    finally:
+        # Pooled connections outlive this call, so the staging table must not
+        if not dry_run:
+            try:
+                cursor.execute("DROP TEMPORARY TABLE IF EXISTS regrade_scores")
+                cursor.execute("DROP TEMPORARY TABLE IF EXISTS regrade_evaluations")
+            except mysql.connector.Error:
+                pass
+        cursor.close()
+        db.disconnect()
@@ -0,0 +1,132 @@
+"""Synthetic quiz history for benchmarks and query-plan checks.
+
+Fills a scratch database with users, evaluations and question_results shaped
+like production data (every item of questions.json, several attempts per
+user, a year of dates), then rebuilds the derived tables. Never point it at
+quiz_db2.
+
+    python seed_data.py --evaluations 100000 --users 500 --database quiz_bench
+"""
+import argparse
+import time
+
+import mysql.connector
+import numpy as np
+
+from db_pool import STORAGE_KEYS
+from main_sql import DB_CONFIG, DatabaseManager
+from question_bank import load_question_bank, question_hash
+
+
+def scratch_database(name):
+    """DatabaseManager on a scratch database, created and migrated if needed"""
+    server_config = {k: v for k, v in DB_CONFIG.items()
+                     if not k.startswith('pool_') and k not in ('database', *STORAGE_KEYS)}
+    conn = mysql.connector.connect(**server_config)
+    conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{name}`")
+    conn.close()
+
+    db = DatabaseManager({**DB_CONFIG, 'database': name})
+    db.create_tables()
+    return db
+
+
+def seed(db, bank, evaluations, users=200, chunk_size=5000, days=365, random_seed=0):
+    """Append `evaluations` random evaluations spread over `users` users, returns rows written"""
+    rng = np.random.default_rng(random_seed)
+    db.sync_question_bank(bank)
+    # (item_id, question_ids, question_types) of every item, in questions.json order
+    items = []
+    for item in bank.items:
+        item_id, ids = db.dimension_ids[item['item']]
+        items.append((item_id, [ids[question_hash(q['question'])] for q in item['questions']],
+                      [q['type'] for q in item['questions']]))
+
+    db.connect()
+    cursor = db.connection.cursor()
+    written = {'evaluations': 0, 'question_results': 0}
+    try:
+        cursor.executemany(
+            "INSERT IGNORE INTO users (username, total_evaluations) VALUES (%s, 0)",
+            [(f"user{n:05d}",) for n in range(users)]
+        )
+        cursor.execute("SELECT user_id FROM users WHERE username LIKE 'user%%' ORDER BY user_id LIMIT %s", (users,))
+        user_ids = np.array([row[0] for row in cursor.fetchall()])
+        # Each user has a skill level, so scores per user are not uniform noise
+        skills = rng.beta(4, 2, size=len(user_ids))
+        cursor.execute("SELECT COALESCE(MAX(evaluation_id), 0) FROM evaluations")
+        next_id = cursor.fetchone()[0] + 1
+        now = int(time.time())
+
+        for start in range(0, evaluations, chunk_size):
+            count = min(chunk_size, evaluations - start)
+            users_idx = rng.integers(0, len(user_ids), size=count)
+            items_idx = rng.integers(0, len(items), size=count)
+            stamps = now - rng.integers(0, days * 86400, size=count)
+
+            evaluation_rows = []
+            result_rows = []
+            for n in range(count):
+                evaluation_id = next_id + start + n
+                item_id, question_ids, question_types = items[items_idx[n]]
+                correct = rng.random(len(question_ids)) < skills[users_idx[n]]
+                total = len(correct)
+                evaluation_rows.append((
+                    evaluation_id, int(user_ids[users_idx[n]]), item_id, total, int(correct.sum()),
+                    round(float(correct.mean()) * 100, 2),
+                    time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(int(stamps[n]))), bank.version
+                ))
+                result_rows.extend(
+                    (evaluation_id, q + 1, question_ids[q], question_types[q], bool(correct[q]), float(correct[q]))
+                    for q in range(total)
+                )
+
+            cursor.executemany("""
+                INSERT INTO evaluations
+                (evaluation_id, user_id, item_id, total_questions, correct_answers, score_percentage,
+                 evaluation_date, bank_version)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, evaluation_rows)
+            cursor.executemany("""
+                INSERT INTO question_results
+                (evaluation_id, question_number, question_id, question_type, is_correct, score_points)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, result_rows)
+            db.connection.commit()
+            written['evaluations'] += len(evaluation_rows)
+            written['question_results'] += len(result_rows)
+
+        cursor.execute("""
+            UPDATE users u
+            JOIN (SELECT user_id, COUNT(*) AS total FROM evaluations GROUP BY user_id) e ON u.user_id = e.user_id
+            SET u.total_evaluations = e.total
+        """)
+        db.rebuild_item_statistics_rows(cursor)
+        db.rebuild_question_analytics_rows(cursor)
+        db.rebuild_daily_rollups_rows(cursor)
+        db.rebuild_latest_evaluations_rows(cursor)
+        cursor.execute("ANALYZE TABLE evaluations, question_results")
+        cursor.fetchall()
+        db.connection.commit()
+        return written
+    finally:
+        cursor.close()
+        db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--evaluations', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--database', default='quiz_bench')
+    args = parser.parse_args()
+
+    db = scratch_database(args.database)
+    start = time.perf_counter()
+    written = seed(db, load_question_bank(), args.evaluations, users=args.users)
+    print(f"{written['evaluations']} évaluations et {written['question_results']} réponses écrites "
+          f"en {time.perf_counter() - start:.1f}s dans {args.database}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = os.path.join("data", "submission_queue.sqlite3")
+
+
+def make_submission(username: str, item_name: str, questions: List[Dict], user_answers: Dict[int, Any],
+                    results: List[Dict], bank_version: Optional[str]) -> Dict[str, Any]:
+    """Self-contained record of one finished quiz, with the idempotency key it is saved under"""
+    return {
+        'submission_id': str(uuid.uuid4()),
+        'submitted_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'username': username,
+        'item_name': item_name,
+        'bank_version': bank_version,
+        # The questions are kept so the record can be saved after questions.json has changed
+        'questions': questions,
+        'answers': {str(i): answer for i, answer in user_answers.items()},
+        'results': results,
+    }
+
+
+def save_submission(db, submission: Dict[str, Any]) -> bool:
+    """Save a submission record through DatabaseManager; True once it is stored, even by an earlier try"""
+    user_id = db.get_or_create_user(submission['username'])
+    if not user_id:
+        return False
+    user_answers = {int(i): answer for i, answer in submission['answers'].items()}
+    return db.save_evaluation_results(
+        user_id, submission['item_name'], submission['questions'], user_answers, submission['results'],
+        submission['bank_version'], submission_id=submission['submission_id'],
+        submitted_at=submission['submitted_at']
+    )
+
+
+class SubmissionQueue:
+    """Durable write-behind queue: submissions are committed to a local SQLite WAL journal,
+    acknowledged at once, and saved to MySQL by a background worker with retries.
+
+    Every submission carries a UUID stored in evaluations.submission_id, so a save that
+    succeeded but whose acknowledgement was lost is not stored twice.
+
+    This journal is the authoritative store of the submissions not yet in MySQL. When it
+    cannot be written (disk full, corrupt or locked file), enqueue appends the submission
+    to the fallback OfflineJournal instead, drained by `manage.py replay-journal`.
+    """
+
+    def __init__(self, save: Callable[[Dict[str, Any]], bool], path: str = QUEUE_PATH,
+                 batch_size: int = 50, flush_interval: float = 1.0, max_backoff: float = 300.0,
+                 worker: bool = True, fallback=None):
+        self.save = save
+        self.path = path
+        self.fallback = fallback
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.metrics = {'enqueued': 0, 'journaled': 0, 'flushed': 0, 'failures': 0, 'last_flush': None,
+                        'last_error': None}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # An acknowledged submission must survive a power cut, not only a crash of the process
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending_submissions (
+                submission_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        """)
+        self._worker = None
+        if worker:
+            self._worker = threading.Thread(target=self._run, name="submission-flush", daemon=True)
+            self._worker.start()
+
+    def enqueue(self, submission: Dict[str, Any]) -> str:
+        """Commit a submission to the local journal and wake the worker, returns its id"""
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO pending_submissions (submission_id, payload, enqueued_at) "
+                    "VALUES (?, ?, ?)",
+                    (submission['submission_id'], json.dumps(submission, ensure_ascii=False), time.time())
+                )
+            except sqlite3.Error as err:
+                if self.fallback is None:
+                    raise
+                logger.warning("File des soumissions inaccessible (%s), soumission %s journalisée",
+                               err, submission['submission_id'])
+                self.fallback.append(submission)
+                self.metrics['journaled'] += 1
+                return submission['submission_id']
+            self.metrics['enqueued'] += 1
+        self._wake.set()
+        return submission['submission_id']
+
+    def backlog(self) -> Dict[str, Any]:
+        """Submissions not yet in MySQL: count, how many are being retried, age of the oldest"""
+        with self._lock:
+            pending, retrying, oldest = self._conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(attempts > 0), 0), MIN(enqueued_at) FROM pending_submissions
+            """).fetchone()
+        return {
+            'pending': pending,
+            'retrying': retrying,
+            'oldest_age_seconds': round(time.time() - oldest, 1) if oldest is not None else 0.0,
+            **self.metrics,
+        }
+
+    def retry_now(self) -> int:
+        """Make every pending submission due again, returns how many were waiting on a backoff"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE pending_submissions SET next_attempt_at = 0 WHERE next_attempt_at > 0"
+            ).rowcount
+
+    def flush(self) -> int:
+        """Save the due submissions, oldest first, returns how many reached MySQL"""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT submission_id, payload, attempts FROM pending_submissions
+                WHERE next_attempt_at <= ? ORDER BY enqueued_at LIMIT ?
+            """, (time.time(), self.batch_size)).fetchall()
+
+        flushed = 0
+        for submission_id, payload, attempts in rows:
+            try:
+                saved = self.save(json.loads(payload))
+                error = None if saved else "sauvegarde refusée"
+            except Exception as err:
+                saved, error = False, str(err)
+
+            with self._lock:
+                if saved:
+                    self._conn.execute("DELETE FROM pending_submissions WHERE submission_id = ?", (submission_id,))
+                    self.metrics['flushed'] += 1
+                    self.metrics['last_flush'] = time.time()
+                    flushed += 1
+                else:
+                    # Exponential backoff, so an unreachable server is probed less and less often
+                    delay = min(self.max_backoff, self.flush_interval * 2 ** attempts)
+                    self._conn.execute("""
+                        UPDATE pending_submissions
+                        SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+                        WHERE submission_id = ?
+                    """, (time.time() + delay, error, submission_id))
+                    self.metrics['failures'] += 1
+                    self.metrics['last_error'] = error
+            if not saved:
+                logger.warning("Soumission %s non sauvegardée: %s", submission_id, error)
+                # The next rows would most likely fail the same way; retry them later
+                break
+        return flushed
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Erreur du vidage de la file des soumissions")
+
+    def close(self, timeout: float = 5.0):
+        """Stop the worker; pending submissions stay in the journal for the next start"""
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self._conn.close()
@@ -0,0 +1,187 @@
+"""The MySQL statements of main_sql.py, rewritten by embedded_db, run on an in-memory SQLite database."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("mysql.connector")
+
+from embedded_db import SQLitePool, sqlite_statements  # noqa: E402
+from question_bank import grade, parse_question_bank  # noqa: E402
+
+
+def test_placeholders_and_percent_signs():
+    assert sqlite_statements("SELECT * FROM users WHERE username LIKE 'a%%' AND user_id = %s") == \
+        ("SELECT * FROM users WHERE username LIKE 'a%' AND user_id = ?",)
+
+
+def test_insert_ignore():
+    assert sqlite_statements("INSERT IGNORE INTO t (a) VALUES (%s)") == ("INSERT OR IGNORE INTO t (a) VALUES (?)",)
+
+
+def test_upsert_returning_existing_id():
+    sql, = sqlite_statements("""
+        INSERT INTO users (username, total_evaluations) VALUES (%s, 0)
+        ON DUPLICATE KEY UPDATE user_id = LAST_INSERT_ID(user_id)
+    """)
+    assert sql.endswith("ON CONFLICT DO UPDATE SET user_id = user_id RETURNING user_id")
+
+
+def test_upsert_values_become_excluded():
+    sql, = sqlite_statements("""
+        INSERT INTO item_statistics (item_id, total_evaluations) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE total_evaluations = total_evaluations + VALUES(total_evaluations),
+                                best = IF(VALUES(best) > best, VALUES(best), best)
+    """)
+    assert "ON CONFLICT DO UPDATE SET total_evaluations = total_evaluations + excluded.total_evaluations" in sql
+    assert "best = IIF(excluded.best > best, excluded.best, best)" in sql
+
+
+def test_current_date_and_timestamp_are_local_time():
+    sql, = sqlite_statements("SELECT CURRENT_DATE(), CURRENT_TIMESTAMP")
+    assert sql == "SELECT date('now', 'localtime'), (datetime('now', 'localtime'))"
+
+
+def test_add_column_drops_after():
+    assert sqlite_statements("ALTER TABLE question_results ADD COLUMN answer_code SMALLINT NULL AFTER answer_json") \
+        == ("ALTER TABLE question_results ADD COLUMN answer_code SMALLINT NULL",)
+
+
+def test_json_columns_are_text():
+    # With NUMERIC affinity the stored answer "2" would come back as the integer 2
+    assert sqlite_statements("ALTER TABLE question_results ADD COLUMN answer_json JSON NULL AFTER user_answer") \
+        == ("ALTER TABLE question_results ADD COLUMN answer_json TEXT NULL",)
+
+
+def test_create_table_with_inline_indexes():
+    statements = sqlite_statements("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) NOT NULL,
+            updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_username (username),
+            INDEX idx_updated (updated)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    """)
+    assert "user_id INTEGER PRIMARY KEY AUTOINCREMENT" in statements[0]
+    assert "ENGINE" not in statements[0] and "ON UPDATE" not in statements[0] and "UNSIGNED" not in statements[0]
+    assert statements[1:] == (
+        "CREATE UNIQUE INDEX IF NOT EXISTS unique_username ON users (username)",
+        "CREATE INDEX IF NOT EXISTS idx_updated ON users (updated)",
+    )
+
+
+@pytest.fixture
+def db():
+    """DatabaseManager on a single in-memory connection, failing on any reported database error"""
+    pytest.importorskip("streamlit")
+    from main_sql import DatabaseManager
+
+    errors = []
+    # One connection, so every checkout sees the same in-memory database
+    pool = SQLitePool({'sqlite_path': ':memory:', 'pool_size': 1})
+    manager = DatabaseManager({'backend': 'sqlite'}, pool, report=errors.append)
+    assert manager.create_tables(), errors
+    yield manager
+    assert errors == []
+
+
+@pytest.fixture(scope='module')
+def bank():
+    return parse_question_bank(os.path.join(ROOT, "questions.json"))
+
+
+def answers_and_results(bank, item_index):
+    """Correct answers to the single and multiple choice questions of an item, the others left blank"""
+    questions = bank.items[item_index]['questions']
+    answers = {}
+    for i, question in enumerate(questions):
+        if question['type'] == 'multiple_choice':
+            answers[i] = question['correct_option']
+        elif question['type'] == 'true_false':
+            answers[i] = question['correct_answer']
+        elif question['type'] == 'multiple_select':
+            answers[i] = list(question['correct_options'])
+    results = [grade(spec, answers.get(i)) for i, spec in enumerate(bank.specs[item_index])]
+    return questions, answers, results
+
+
+def query(db, sql, params=()):
+    db.connect()
+    cursor = db.connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        db.disconnect()
+
+
+def test_create_tables_twice(db):
+    assert db.create_tables()
+
+
+def test_get_or_create_user_returns_the_existing_id(db):
+    user_id = db.get_or_create_user("alice")
+    db.user_ids.clear()
+    assert db.get_or_create_user("alice") == user_id
+    assert db.get_or_create_user("bob") != user_id
+
+
+def test_sync_question_bank_is_idempotent(db, bank):
+    assert db.sync_question_bank(bank)
+    assert db.sync_question_bank(bank)
+    count, = query(db, "SELECT COUNT(*) FROM questions")[0]
+    assert count == sum(len(item['questions']) for item in bank.items)
+
+
+def test_save_evaluation_updates_the_derived_tables(db, bank):
+    user_id = db.get_or_create_user("alice")
+    questions, answers, results = answers_and_results(bank, 0)
+    assert db.save_evaluation_results(user_id, bank.items[0]['item'], questions, answers, results, bank.version,
+                                      submission_id="00000000-0000-0000-0000-000000000001")
+    # Same submission again: reported as saved, stored once
+    assert db.save_evaluation_results(user_id, bank.items[0]['item'], questions, answers, results, bank.version,
+                                      submission_id="00000000-0000-0000-0000-000000000001")
+    assert query(db, "SELECT COUNT(*) FROM evaluations")[0][0] == 1
+    assert query(db, "SELECT COUNT(*) FROM question_results")[0][0] == len(questions)
+    assert query(db, "SELECT total_evaluations FROM users WHERE user_id = %s", (user_id,))[0][0] == 1
+    assert query(db, "SELECT COUNT(*) FROM latest_evaluations")[0][0] == 1
+    assert db.item_statistics_drift() == []
+
+
+def test_rebuilds_match_the_incremental_updates(db, bank):
+    user_id = db.get_or_create_user("alice")
+    for item_index in (0, 1, 0):
+        questions, answers, results = answers_and_results(bank, item_index)
+        assert db.save_evaluation_results(user_id, bank.items[item_index]['item'], questions, answers, results,
+                                          bank.version)
+    tables = ("item_statistics", "question_statistics", "option_selections", "daily_user_item_scores",
+              "daily_question_scores", "latest_evaluations")
+    incremental = {table: sorted(query(db, f"SELECT * FROM {table}")) for table in tables}
+
+    assert db.rebuild_item_statistics()
+    assert db.rebuild_question_analytics()
+    assert db.rebuild_daily_rollups()
+    assert db.rebuild_latest_evaluations()
+    for table in tables:
+        rebuilt = sorted(query(db, f"SELECT * FROM {table}"))
+        if table == "item_statistics":
+            # The rebuild gives new surrogate ids, and last_updated is the time of the rebuild
+            rebuilt, incremental[table] = ([row[1:-1] for row in rows] for rows in (rebuilt, incremental[table]))
+        assert rebuilt == incremental[table], table
+
+
+def test_bulk_load_skips_stored_submissions(db, bank):
+    from submission_queue import make_submission
+
+    questions, answers, results = answers_and_results(bank, 0)
+    submissions = [make_submission(name, bank.items[0]['item'], questions, answers, results, bank.version)
+                   for name in ("alice", "bob")]
+    assert db.bulk_load_submissions(submissions) == 2
+    assert db.bulk_load_submissions(submissions) == 0
+    assert query(db, "SELECT COUNT(*) FROM evaluations")[0][0] == 2
+    assert query(db, "SELECT COUNT(*) FROM question_results")[0][0] == 2 * len(questions)
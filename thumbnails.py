@@ -0,0 +1,89 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from typing import Dict, Iterable
+
+from PIL import Image, features
+
+THUMBNAIL_DIR = os.path.join("images", ".thumbnails")
+DISPLAY_WIDTH = 500
+QUALITY = 80
+
+logger = logging.getLogger(__name__)
+
+
+def thumbnail_format() -> str:
+    """WEBP when Pillow was built with it, JPEG otherwise"""
+    return "WEBP" if features.check("webp") else "JPEG"
+
+
+def thumbnail_name(source_bytes: bytes, stem: str, width: int, fmt: str) -> str:
+    """File name of a thumbnail: changes whenever the source image or the target size changes"""
+    digest = hashlib.sha256(source_bytes).hexdigest()[:12]
+    extension = "webp" if fmt == "WEBP" else "jpg"
+    return f"{stem}-{width}w-{digest}.{extension}"
+
+
+def render_thumbnail(source_bytes: bytes, width: int, fmt: str) -> bytes:
+    """Resize an image to `width` pixels wide and encode it"""
+    with Image.open(io.BytesIO(source_bytes)) as image:
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS)
+        if fmt == "JPEG" or image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB" if fmt == "JPEG" else "RGBA")
+        out = io.BytesIO()
+        if fmt == "WEBP":
+            image.save(out, "WEBP", quality=QUALITY, method=6)
+        else:
+            image.save(out, "JPEG", quality=QUALITY, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+class ThumbnailCache:
+    """Resized copies of the item images, in memory and on disk under content-hashed names"""
+
+    def __init__(self, directory: str = THUMBNAIL_DIR, width: int = DISPLAY_WIDTH):
+        self.directory = directory
+        self.width = width
+        self.format = thumbnail_format()
+        self._images: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> bytes:
+        """Thumbnail bytes of an image, built on first use; the original if it cannot be resized"""
+        with self._lock:
+            cached = self._images.get(path)
+        if cached is not None:
+            return cached
+
+        with open(path, "rb") as f:
+            source_bytes = f.read()
+        stem = os.path.splitext(os.path.basename(path))[0]
+        target = os.path.join(self.directory, thumbnail_name(source_bytes, stem, self.width, self.format))
+
+        if os.path.exists(target):
+            with open(target, "rb") as f:
+                data = f.read()
+        else:
+            try:
+                data = render_thumbnail(source_bytes, self.width, self.format)
+            except OSError as err:
+                logger.warning("Miniature impossible pour %s: %s", path, err)
+                return source_bytes
+            os.makedirs(self.directory, exist_ok=True)
+            # Written under a temporary name so a concurrent reader never sees a partial file
+            partial = f"{target}.{os.getpid()}.tmp"
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, target)
+
+        with self._lock:
+            self._images[path] = data
+        return data
+
+    def warm(self, paths: Iterable[str]) -> int:
+        """Build every thumbnail up front, returns the number of bytes kept in memory"""
+        return sum(len(self.get(path)) for path in paths)